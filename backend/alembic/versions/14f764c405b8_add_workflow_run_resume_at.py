@@ -0,0 +1,28 @@
+"""Add workflow run resume_at
+
+Revision ID: 14f764c405b8
+Revises: 8584eeafe9a7
+Create Date: 2026-10-18 15:48:51.702336
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '14f764c405b8'
+down_revision: Union[str, Sequence[str], None] = '8584eeafe9a7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('workflow_runs', sa.Column('resume_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('workflow_runs', 'resume_at')
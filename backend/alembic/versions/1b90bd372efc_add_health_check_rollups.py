@@ -0,0 +1,55 @@
+"""Add health check rollup tables
+
+Revision ID: 1b90bd372efc
+Revises: c0ffccb0741b
+Create Date: 2026-10-18 19:42:11.503218
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1b90bd372efc'
+down_revision: Union[str, Sequence[str], None] = 'c0ffccb0741b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ROLLUPS = [('health_check_rollups_1m', 'minute'), ('health_check_rollups_1h', 'hour')]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table, unit in ROLLUPS:
+        op.create_table(table,
+        sa.Column('endpoint_id', sa.Integer(), nullable=False),
+        sa.Column('bucket_start', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.Column('failures', sa.Integer(), nullable=False),
+        sa.Column('latency_min', sa.Float(), nullable=True),
+        sa.Column('latency_max', sa.Float(), nullable=True),
+        sa.Column('latency_sum', sa.Float(), nullable=False),
+        sa.Column('latency_sketch', sa.JSON(), nullable=True),
+        sa.ForeignKeyConstraint(['endpoint_id'], ['endpoints.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('endpoint_id', 'bucket_start')
+        )
+        # Existing history; these rows have no sketch, so percentiles only cover new checks.
+        # Buckets are UTC like the ones ingestion writes, whatever the session timezone.
+        bucket = f"date_trunc('{unit}', timestamp AT TIME ZONE 'UTC') AT TIME ZONE 'UTC'"
+        op.execute(f"""
+            INSERT INTO {table} (endpoint_id, bucket_start, count, failures, latency_min, latency_max, latency_sum)
+            SELECT endpoint_id, {bucket}, count(*),
+                   sum(CASE WHEN success THEN 0 ELSE 1 END),
+                   min(latency_ms), max(latency_ms), coalesce(sum(latency_ms), 0)
+            FROM health_check_results
+            WHERE timestamp IS NOT NULL
+            GROUP BY endpoint_id, {bucket}
+        """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table, _ in reversed(ROLLUPS):
+        op.drop_table(table)
@@ -0,0 +1,32 @@
+"""Add workflow run input and batch id
+
+Revision ID: 25aac6a6420f
+Revises: fb60d3d8b0d0
+Create Date: 2026-10-18 10:48:55.204417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '25aac6a6420f'
+down_revision: Union[str, Sequence[str], None] = 'fb60d3d8b0d0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('workflow_runs', sa.Column('input', sa.JSON(), nullable=True))
+    op.add_column('workflow_runs', sa.Column('batch_id', sa.String(), nullable=True))
+    op.create_index(op.f('ix_workflow_runs_batch_id'), 'workflow_runs', ['batch_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_workflow_runs_batch_id'), table_name='workflow_runs')
+    op.drop_column('workflow_runs', 'batch_id')
+    op.drop_column('workflow_runs', 'input')
@@ -0,0 +1,108 @@
+"""Partition health check results by day
+
+Revision ID: 614034d82524
+Revises: 1b90bd372efc
+Create Date: 2026-10-18 21:14:52.380617
+
+"""
+from datetime import datetime, time, timedelta, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '614034d82524'
+down_revision: Union[str, Sequence[str], None] = '1b90bd372efc'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The existing rows become one "legacy" partition running up to the end of
+    # today; it is dropped like any daily partition once all of it is past
+    # retention. The renames are catalog changes, but SET NOT NULL and ATTACH
+    # each scan the old rows to prove them, unless a valid CHECK constraint
+    # already does. So one CHECK covering both is validated (a single scan) and
+    # dropped again once the partition is attached. Attaching still builds the
+    # (id, timestamp) primary key index over the old rows.
+    legacy_end = datetime.combine(datetime.now(timezone.utc).date() + timedelta(days=1), time.min, tzinfo=timezone.utc)
+    op.execute("UPDATE health_check_results SET timestamp = now() WHERE timestamp IS NULL")
+    op.execute("ALTER TABLE health_check_results RENAME TO health_check_results_legacy")
+    op.execute("ALTER TABLE health_check_results_legacy RENAME CONSTRAINT health_check_results_pkey TO health_check_results_legacy_pkey")
+    op.execute("ALTER INDEX ix_health_check_results_id RENAME TO ix_health_check_results_legacy_id")
+    op.execute(f"""
+        ALTER TABLE health_check_results_legacy ADD CONSTRAINT health_check_results_legacy_bound
+        CHECK (timestamp IS NOT NULL AND timestamp < '{legacy_end.isoformat()}') NOT VALID
+    """)
+    op.execute("ALTER TABLE health_check_results_legacy VALIDATE CONSTRAINT health_check_results_legacy_bound")
+    op.execute("ALTER TABLE health_check_results_legacy ALTER COLUMN timestamp SET NOT NULL")
+
+    # The primary key of a partitioned table must include the partition key
+    op.execute("""
+        CREATE TABLE health_check_results (
+            id INTEGER NOT NULL DEFAULT nextval('health_check_results_id_seq'),
+            endpoint_id INTEGER NOT NULL REFERENCES endpoints (id),
+            status_code INTEGER,
+            latency_ms DOUBLE PRECISION,
+            success BOOLEAN NOT NULL,
+            error_message TEXT,
+            timestamp TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+            PRIMARY KEY (id, timestamp)
+        ) PARTITION BY RANGE (timestamp)
+    """)
+    # Otherwise dropping the legacy partition would drop the id sequence with it
+    op.execute("ALTER SEQUENCE health_check_results_id_seq OWNED BY health_check_results.id")
+    op.create_index('ix_health_check_results_endpoint_id_timestamp', 'health_check_results', ['endpoint_id', 'timestamp'], unique=False)
+
+    op.execute(f"""
+        ALTER TABLE health_check_results ATTACH PARTITION health_check_results_legacy
+        FOR VALUES FROM (MINVALUE) TO ('{legacy_end.isoformat()}')
+    """)
+    op.execute("ALTER TABLE health_check_results_legacy DROP CONSTRAINT health_check_results_legacy_bound")
+    # Catches rows outside every daily partition (clock skew, or the maintenance
+    # task not running) so inserts never fail
+    op.execute("CREATE TABLE health_check_results_default PARTITION OF health_check_results DEFAULT")
+    # The first week of daily partitions; the maintenance task keeps it topped up
+    op.execute("""
+        DO $$
+        DECLARE
+            day date;
+        BEGIN
+            FOR offset_days IN 1..7 LOOP
+                day := (now() AT TIME ZONE 'UTC')::date + offset_days;
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF health_check_results FOR VALUES FROM (%L) TO (%L)',
+                    'health_check_results_p' || to_char(day, 'YYYYMMDD'),
+                    day::timestamp AT TIME ZONE 'UTC',
+                    (day + 1)::timestamp AT TIME ZONE 'UTC'
+                );
+            END LOOP;
+        END
+        $$
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("ALTER SEQUENCE health_check_results_id_seq OWNED BY NONE")
+    op.execute("ALTER TABLE health_check_results RENAME TO health_check_results_partitioned")
+    op.execute("""
+        CREATE TABLE health_check_results (
+            id INTEGER NOT NULL DEFAULT nextval('health_check_results_id_seq'),
+            endpoint_id INTEGER NOT NULL REFERENCES endpoints (id),
+            status_code INTEGER,
+            latency_ms DOUBLE PRECISION,
+            success BOOLEAN NOT NULL,
+            error_message TEXT,
+            timestamp TIMESTAMP WITH TIME ZONE DEFAULT now(),
+            PRIMARY KEY (id)
+        )
+    """)
+    op.execute("INSERT INTO health_check_results SELECT * FROM health_check_results_partitioned")
+    # Drops every partition, the legacy one included
+    op.execute("DROP TABLE health_check_results_partitioned")
+    op.execute("ALTER SEQUENCE health_check_results_id_seq OWNED BY health_check_results.id")
+    op.create_index(op.f('ix_health_check_results_id'), 'health_check_results', ['id'], unique=False)
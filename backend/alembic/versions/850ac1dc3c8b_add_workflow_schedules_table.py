@@ -0,0 +1,49 @@
+"""Add workflow schedules table
+
+Revision ID: 850ac1dc3c8b
+Revises: 8b9f3c4e5006
+Create Date: 2026-10-18 11:41:09.662017
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '850ac1dc3c8b'
+down_revision: Union[str, Sequence[str], None] = '8b9f3c4e5006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('workflow_schedules',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('workflow_id', sa.Integer(), nullable=False),
+    sa.Column('cron', sa.String(), nullable=True),
+    sa.Column('interval_seconds', sa.Integer(), nullable=True),
+    sa.Column('input', sa.JSON(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=False),
+    sa.Column('next_run_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('last_run_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['workflow_id'], ['workflows.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_workflow_schedules_id'), 'workflow_schedules', ['id'], unique=False)
+    op.create_index(op.f('ix_workflow_schedules_workflow_id'), 'workflow_schedules', ['workflow_id'], unique=False)
+    op.create_index(op.f('ix_workflow_schedules_updated_at'), 'workflow_schedules', ['updated_at'], unique=False)
+    op.create_index('ix_workflow_schedules_active_next', 'workflow_schedules', ['is_active', 'next_run_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_workflow_schedules_active_next', table_name='workflow_schedules')
+    op.drop_index(op.f('ix_workflow_schedules_updated_at'), table_name='workflow_schedules')
+    op.drop_index(op.f('ix_workflow_schedules_workflow_id'), table_name='workflow_schedules')
+    op.drop_index(op.f('ix_workflow_schedules_id'), table_name='workflow_schedules')
+    op.drop_table('workflow_schedules')
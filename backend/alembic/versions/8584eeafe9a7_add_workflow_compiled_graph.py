@@ -0,0 +1,28 @@
+"""Add workflow compiled graph
+
+Revision ID: 8584eeafe9a7
+Revises: 850ac1dc3c8b
+Create Date: 2026-10-18 14:27:09.415263
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8584eeafe9a7'
+down_revision: Union[str, Sequence[str], None] = '850ac1dc3c8b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('workflows', sa.Column('compiled_graph', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('workflows', 'compiled_graph')
@@ -0,0 +1,30 @@
+"""Add workflow webhook token
+
+Revision ID: 8b9f3c4e5006
+Revises: 25aac6a6420f
+Create Date: 2026-10-18 11:02:43.218840
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b9f3c4e5006'
+down_revision: Union[str, Sequence[str], None] = '25aac6a6420f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('workflows', sa.Column('webhook_token', sa.String(), nullable=True))
+    op.create_index(op.f('ix_workflows_webhook_token'), 'workflows', ['webhook_token'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_workflows_webhook_token'), table_name='workflows')
+    op.drop_column('workflows', 'webhook_token')
@@ -0,0 +1,68 @@
+"""Add workflow versions table
+
+Revision ID: c0ffccb0741b
+Revises: 14f764c405b8
+Create Date: 2026-10-18 17:05:36.128470
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c0ffccb0741b'
+down_revision: Union[str, Sequence[str], None] = '14f764c405b8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('workflow_versions',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('workflow_id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('steps', sa.JSON(), nullable=False),
+    sa.Column('compiled_graph', sa.JSON(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['workflow_id'], ['workflows.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('workflow_id', 'version', name='uq_workflow_versions_workflow_version')
+    )
+    op.create_index(op.f('ix_workflow_versions_id'), 'workflow_versions', ['id'], unique=False)
+    op.create_index(op.f('ix_workflow_versions_workflow_id'), 'workflow_versions', ['workflow_id'], unique=False)
+    op.add_column('workflows', sa.Column('current_version_id', sa.Integer(), nullable=True))
+    op.create_foreign_key('fk_workflows_current_version_id', 'workflows', 'workflow_versions', ['current_version_id'], ['id'])
+    op.add_column('workflow_runs', sa.Column('version_id', sa.Integer(), nullable=True))
+    op.create_foreign_key('fk_workflow_runs_version_id', 'workflow_runs', 'workflow_versions', ['version_id'], ['id'])
+
+    # Every existing workflow becomes version 1 of itself
+    op.execute("""
+        INSERT INTO workflow_versions (workflow_id, version, steps, compiled_graph)
+        SELECT id, 1, steps, compiled_graph FROM workflows
+    """)
+    op.execute("""
+        UPDATE workflows SET current_version_id = (
+            SELECT workflow_versions.id FROM workflow_versions WHERE workflow_versions.workflow_id = workflows.id
+        )
+    """)
+    op.drop_column('workflows', 'compiled_graph')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.add_column('workflows', sa.Column('compiled_graph', sa.JSON(), nullable=True))
+    op.execute("""
+        UPDATE workflows SET compiled_graph = (
+            SELECT workflow_versions.compiled_graph FROM workflow_versions WHERE workflow_versions.id = workflows.current_version_id
+        )
+    """)
+    op.drop_constraint('fk_workflow_runs_version_id', 'workflow_runs', type_='foreignkey')
+    op.drop_column('workflow_runs', 'version_id')
+    op.drop_constraint('fk_workflows_current_version_id', 'workflows', type_='foreignkey')
+    op.drop_column('workflows', 'current_version_id')
+    op.drop_index(op.f('ix_workflow_versions_workflow_id'), table_name='workflow_versions')
+    op.drop_index(op.f('ix_workflow_versions_id'), table_name='workflow_versions')
+    op.drop_table('workflow_versions')
@@ -0,0 +1,63 @@
+"""Add workflow run and step run tables
+
+Revision ID: dcc4a83de24d
+Revises: 6811f28a53e2
+Create Date: 2026-10-18 09:12:40.118230
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'dcc4a83de24d'
+down_revision: Union[str, Sequence[str], None] = '6811f28a53e2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('workflow_runs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('workflow_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['workflow_id'], ['workflows.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_workflow_runs_id'), 'workflow_runs', ['id'], unique=False)
+    op.create_index(op.f('ix_workflow_runs_workflow_id'), 'workflow_runs', ['workflow_id'], unique=False)
+    op.create_table('step_runs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('run_id', sa.Integer(), nullable=False),
+    sa.Column('node_id', sa.String(), nullable=False),
+    sa.Column('step_index', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('result_handle', sa.String(), nullable=True),
+    sa.Column('result', sa.JSON(), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['run_id'], ['workflow_runs.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('run_id', 'node_id', name='uq_step_runs_run_node')
+    )
+    op.create_index(op.f('ix_step_runs_id'), 'step_runs', ['id'], unique=False)
+    op.create_index(op.f('ix_step_runs_run_id'), 'step_runs', ['run_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_step_runs_run_id'), table_name='step_runs')
+    op.drop_index(op.f('ix_step_runs_id'), table_name='step_runs')
+    op.drop_table('step_runs')
+    op.drop_index(op.f('ix_workflow_runs_workflow_id'), table_name='workflow_runs')
+    op.drop_index(op.f('ix_workflow_runs_id'), table_name='workflow_runs')
+    op.drop_table('workflow_runs')
@@ -0,0 +1,36 @@
+"""Add workflow run history columns and index
+
+Revision ID: fb60d3d8b0d0
+Revises: dcc4a83de24d
+Create Date: 2026-10-18 10:02:17.530114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'fb60d3d8b0d0'
+down_revision: Union[str, Sequence[str], None] = 'dcc4a83de24d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('workflow_runs', sa.Column('duration_ms', sa.Integer(), nullable=True))
+    op.add_column('workflow_runs', sa.Column('result_summary', sa.JSON(), nullable=True))
+    # started_at now records when the run was triggered
+    op.execute("UPDATE workflow_runs SET started_at = created_at WHERE started_at IS NULL")
+    op.alter_column('workflow_runs', 'started_at', existing_type=sa.DateTime(timezone=True), nullable=False)
+    op.create_index('ix_workflow_runs_workflow_started', 'workflow_runs', ['workflow_id', 'started_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_workflow_runs_workflow_started', table_name='workflow_runs')
+    op.alter_column('workflow_runs', 'started_at', existing_type=sa.DateTime(timezone=True), nullable=True)
+    op.drop_column('workflow_runs', 'result_summary')
+    op.drop_column('workflow_runs', 'duration_ms')
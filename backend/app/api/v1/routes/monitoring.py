@@ -1,10 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+from datetime import datetime, timedelta, timezone
 from app.db.session import get_db
 from app.api.deps import get_current_user
 from app.domain.user.models import User
-from app.domain.monitoring.schemas import MonitoredServiceCreate, MonitoredServiceResponse, EndpointCreate, EndpointResponse
+from app.domain.monitoring.schemas import MonitoredServiceCreate, MonitoredServiceResponse, EndpointCreate, EndpointResponse, EndpointStats
+from app.domain.monitoring.models import Endpoint
 from app.domain.monitoring.service import MonitoringService
 
 router = APIRouter(prefix="/monitoring", tags=["monitoring"])
@@ -49,6 +51,24 @@ def add_endpoint(
     # For now direct call
     return service.create_endpoint(db, endpoint_in, service_id)
 
+@router.get("/endpoints/{endpoint_id}/stats", response_model=EndpointStats)
+def get_endpoint_stats(
+    endpoint_id: int,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    # Defaults to the last 24 hours; naive times are taken as UTC
+    end = end or datetime.now(timezone.utc)
+    start = start or end - timedelta(hours=24)
+    start, end = [t.replace(tzinfo=timezone.utc) if t.tzinfo is None else t for t in (start, end)]
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    if not db.query(Endpoint.id).filter(Endpoint.id == endpoint_id).first():
+        raise HTTPException(status_code=404, detail="Endpoint not found")
+    return service.get_endpoint_stats(db, endpoint_id, start, end)
+
 @router.post("/run-checks")
 def trigger_health_checks(
     sync: bool = False,
@@ -1,6 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 from typing import List
 from datetime import datetime, timedelta
 from app.db.session import get_db
@@ -8,7 +7,8 @@ from app.api.deps import get_current_user
 from app.domain.user.models import User
 from app.domain.reliability.models import SLO
 from app.domain.reliability.schemas import SLOCreate, SLOResponse
-from app.domain.monitoring.models import MonitoredService, HealthCheckResult, Endpoint
+from app.domain.monitoring.models import MonitoredService, Endpoint
+from app.services.health_rollups import summarize
 
 router = APIRouter(prefix="/reliability", tags=["reliability"])
 
@@ -62,17 +62,11 @@ def calculate_slo_status(db: Session, slo: SLO):
         return
 
     # 3. Count total checks vs failed checks in window
-    # Optimized aggregate query
-    stats = db.query(
-        func.count(HealthCheckResult.id).label("total"),
-        func.sum(case((HealthCheckResult.success == False, 1), else_=0)).label("failures")
-    ).filter(
-        HealthCheckResult.endpoint_id.in_(endpoint_ids),
-        HealthCheckResult.timestamp >= window_start
-    ).first()
+    # Read from the hourly rollups (minute rollups at the edges), not raw checks
+    stats = summarize(db, endpoint_ids, window_start, now)
     
-    total_checks = stats.total or 0
-    failures = stats.failures or 0
+    total_checks = stats.count
+    failures = stats.failures
     
     if total_checks == 0:
         slo.current_availability = 100.0
@@ -96,5 +90,3 @@ def calculate_slo_status(db: Session, slo: SLO):
     actual_downtime_minutes = failures 
     
     slo.error_budget_remaining_minutes = allowed_downtime_minutes - actual_downtime_minutes
-
-from sqlalchemy import case
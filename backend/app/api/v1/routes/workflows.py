@@ -1,10 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from app.worker.tasks import execute_workflow_task
+import json
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from app.services.workflow_dispatch import get_dispatcher
+from app.services.workflow_inline import get_inline_executor
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from app.db.session import get_db
 from app.api.deps import get_current_user
-from app.schemas.workflow import WorkflowCreate, WorkflowUpdate, WorkflowResponse
+from app.schemas.workflow import (
+    WorkflowCreate, WorkflowUpdate, WorkflowResponse, WorkflowRunPage, WorkflowRunDetail,
+    BulkRunRequest, BulkRunResponse, BatchStatus, WebhookTokenResponse, WebhookRunResponse,
+    ScheduleCreate, ScheduleResponse, WorkflowVersionResponse
+)
 from app.services.workflow_service import WorkflowService
 from app.domain.user.models import User
 
@@ -17,7 +23,10 @@ def create_workflow(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    return service.create_workflow(db, workflow_in, current_user.id)
+    try:
+        return service.create_workflow(db, workflow_in, current_user.id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/", response_model=List[WorkflowResponse])
 def read_workflows(
@@ -48,7 +57,10 @@ def update_workflow(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    workflow = service.update_workflow(db, workflow_id, workflow_in, current_user.id)
+    try:
+        workflow = service.update_workflow(db, workflow_id, workflow_in, current_user.id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     if not workflow:
          # Check if it exists but belongs to someone else, or doesn't exist at all
          # For simplicity, returning 404/403 based on service return being None is ambiguous without more logic, 
@@ -87,6 +99,149 @@ def run_workflow(
     if workflow.owner_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to run this workflow")
     
-    # Trigger Celery Task
-    execute_workflow_task.delay(workflow_id)
-    return {"message": "Workflow execution started"}
+    # Persist the run first so a redelivered task can resume it
+    run = service.create_run(db, workflow_id)
+    # Queued behind the owner's and the workflow's concurrency caps
+    dispatcher = get_dispatcher()
+    dispatcher.enqueue(current_user.id, [(workflow_id, run.id)], current_user.plan)
+    dispatcher.dispatch()
+    return {"message": "Workflow execution started", "run_id": run.id}
+
+def _get_owned_workflow(db: Session, workflow_id: int, current_user: User):
+    workflow = service.get_workflow(db, workflow_id)
+    if not workflow:
+        raise HTTPException(status_code=404, detail="Workflow not found")
+    if workflow.owner_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not authorized to access this workflow")
+    return workflow
+
+@router.get("/{workflow_id}/versions", response_model=List[WorkflowVersionResponse])
+def list_workflow_versions(
+    workflow_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    _get_owned_workflow(db, workflow_id, current_user)
+    return service.get_versions(db, workflow_id)
+
+@router.get("/{workflow_id}/runs", response_model=WorkflowRunPage)
+def list_workflow_runs(
+    workflow_id: int,
+    limit: int = Query(50, ge=1, le=500),
+    before: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    _get_owned_workflow(db, workflow_id, current_user)
+    runs = service.get_runs(db, workflow_id, limit, before)
+    next_cursor = runs[-1].id if len(runs) == limit else None
+    return {"items": runs, "next_cursor": next_cursor}
+
+@router.get("/{workflow_id}/runs/{run_id}", response_model=WorkflowRunDetail)
+def read_workflow_run(
+    workflow_id: int,
+    run_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    _get_owned_workflow(db, workflow_id, current_user)
+    run = service.get_run(db, workflow_id, run_id)
+    if not run:
+        raise HTTPException(status_code=404, detail="Run not found")
+    return run
+
+@router.post("/bulk-run", response_model=BulkRunResponse)
+def bulk_run_workflows(
+    request: BulkRunRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    workflow_ids = {item.workflow_id for item in request.runs}
+    unowned = service.get_unowned_workflow_ids(db, workflow_ids, current_user.id)
+    if unowned:
+        raise HTTPException(status_code=403, detail=f"Not authorized to run workflows: {sorted(unowned)}")
+
+    batch_id, runs = service.create_bulk_runs(db, [(item.workflow_id, item.input) for item in request.runs])
+    # One Redis round trip to queue the batch; whatever fits under the caps goes
+    # out as a single Celery group, the rest as earlier runs finish
+    dispatcher = get_dispatcher()
+    dispatcher.enqueue(current_user.id, [(run.workflow_id, run.id) for run in runs], current_user.plan)
+    dispatcher.dispatch()
+    return {"batch_id": batch_id, "run_ids": [run.id for run in runs]}
+
+@router.get("/batches/{batch_id}", response_model=BatchStatus)
+def read_batch_status(
+    batch_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    batch = service.get_batch_status(db, batch_id, current_user.id)
+    if not batch:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return batch
+
+@router.post("/{workflow_id}/webhook-token", response_model=WebhookTokenResponse)
+def rotate_webhook_token(
+    workflow_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    workflow = _get_owned_workflow(db, workflow_id, current_user)
+    token = service.rotate_webhook_token(db, workflow)
+    return {"workflow_id": workflow.id, "webhook_url": f"/api/v1/workflows/hooks/{token}"}
+
+@router.post("/{workflow_id}/schedules", response_model=ScheduleResponse)
+def create_schedule(
+    workflow_id: int,
+    schedule_in: ScheduleCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    workflow = _get_owned_workflow(db, workflow_id, current_user)
+    try:
+        return service.create_schedule(db, workflow, schedule_in)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/{workflow_id}/schedules", response_model=List[ScheduleResponse])
+def list_schedules(
+    workflow_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    _get_owned_workflow(db, workflow_id, current_user)
+    return service.get_schedules(db, workflow_id)
+
+@router.delete("/{workflow_id}/schedules/{schedule_id}", response_model=ScheduleResponse)
+def delete_schedule(
+    workflow_id: int,
+    schedule_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    _get_owned_workflow(db, workflow_id, current_user)
+    schedule = service.delete_schedule(db, workflow_id, schedule_id)
+    if not schedule:
+        raise HTTPException(status_code=404, detail="Schedule not found")
+    return schedule
+
+@router.post("/hooks/{token}", response_model=WebhookRunResponse)
+async def trigger_workflow_webhook(
+    token: str,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db)
+):
+    # The token in the URL is the credential; no user session needed
+    body = await request.body()
+    try:
+        payload = json.loads(body) if body else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Webhook body must be JSON")
+
+    result = await get_inline_executor().trigger(db, token, payload)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Webhook not found")
+    if result["mode"] != "inline":
+        response.status_code = status.HTTP_202_ACCEPTED
+    return result
@@ -1,4 +1,5 @@
 from celery import Celery
+from celery.schedules import crontab
 import os
 
 # Default to localhost for local dev, override with 'redis' in Docker via env vars
@@ -14,4 +15,28 @@ celery_app.conf.update(
     timezone="UTC",
     enable_utc=True,
     task_track_started=True,
+    # Requires a beat process: `celery -A app.core.celery_app beat` (or worker -B in dev)
+    beat_schedule={
+        "prune-workflow-runs": {
+            "task": "app.worker.tasks.prune_workflow_runs",
+            "schedule": crontab(hour=3, minute=0),
+        },
+        # Keeps a week of empty daily partitions ahead; hourly so a missed run
+        # never leaves inserts falling into the default partition
+        "maintain-health-check-partitions": {
+            "task": "app.worker.tasks.maintain_health_check_partitions",
+            "schedule": crontab(minute=20),
+        },
+        # Finished runs trigger dispatch themselves; this picks up expired leases
+        # and anything left behind while another dispatcher held the lock
+        "dispatch-workflow-runs": {
+            "task": "app.worker.tasks.dispatch_workflow_runs",
+            "schedule": 5.0,
+        },
+        # Runs parked on a delay node come back through here
+        "resume-waiting-runs": {
+            "task": "app.worker.tasks.resume_waiting_runs",
+            "schedule": 2.0,
+        },
+    },
 )
@@ -15,6 +15,53 @@ class Settings(BaseSettings):
     DOMAIN: str = "http://localhost:3000"
     OPENAI_API_KEY: Optional[str] = None
 
+    # Workflow Engine
+    WORKFLOW_MAX_CONCURRENCY: int = 8 # Max steps in flight per workflow run
+    WORKFLOW_PLAN_CACHE_SIZE: int = 256 # Compiled graphs kept per worker process
+    WORKFLOW_HTTP_MAX_CONNECTIONS: int = 100 # Shared pool used by http-request/slack actions
+    WORKFLOW_HTTP_MAX_KEEPALIVE: int = 20
+    WORKFLOW_HTTP_PER_HOST_LIMIT: int = 10 # Concurrent requests per host
+    WORKFLOW_HTTP2: bool = False # Requires the optional 'h2' package
+    WORKFLOW_HTTP_TIMEOUT: float = 10.0 # Default; nodes can override with data.timeout
+    WORKFLOW_CIRCUIT_FAILURE_THRESHOLD: int = 5 # Consecutive failures before a host's circuit opens
+    WORKFLOW_CIRCUIT_COOLDOWN: float = 30.0 # Seconds a host fails fast before a trial request
+    WORKFLOW_EVENT_VERBOSITY: str = "full" # full | summary (no step_start) | final (workflow_finish only)
+    WORKFLOW_EVENT_BATCH_SIZE: int = 50 # Events per pipelined publish
+    WORKFLOW_EVENT_FLUSH_INTERVAL: float = 0.25 # Max seconds an event waits in the buffer
+    WORKFLOW_RUN_RETENTION_DAYS: int = 30 # Finished run history older than this is pruned daily
+    WORKFLOW_MAX_RUNS_PER_OWNER: int = 10 # Runs executing at once per user; the rest wait in Redis
+    WORKFLOW_MAX_RUNS_PER_WORKFLOW: int = 5 # Runs executing at once per workflow
+    WORKFLOW_RUN_LEASE_SECONDS: int = 3600 # Slot held by a lost worker is reclaimed after this
+    WORKFLOW_CONTEXT_INLINE_BYTES: int = 65536 # Step outputs larger than this spill out of worker memory
+    WORKFLOW_CONTEXT_MAX_BYTES: int = 10485760 # Outputs larger than this are dropped (scalar fields kept)
+    WORKFLOW_CONTEXT_SPILL: str = "file" # file (per-run temp dir) | redis (survives worker loss)
+    WORKFLOW_CONTEXT_TTL: int = 86400 # Seconds spilled outputs live in Redis
+    WORKFLOW_MAP_MAX_CONCURRENCY: int = 50 # Items a map node runs at once (nodes may ask for fewer)
+    WORKFLOW_MAP_MAX_ITEMS: int = 1000 # Larger lists fail the map step
+    WORKFLOW_INLINE_MAX_NODES: int = 10 # Webhook runs of bigger graphs always go through Celery
+    WORKFLOW_INLINE_TIME_BUDGET: float = 2.0 # Seconds a webhook run may execute inside the API process
+    WORKFLOW_INLINE_WORKERS: int = 4 # Inline runs at once per API process; extra ones are queued
+    WORKFLOW_SCHEDULER_SYNC_INTERVAL: float = 5.0 # Seconds between the scheduler's checks for changed schedules
+    WORKFLOW_SCHEDULER_LEASE_SECONDS: float = 15.0 # Leader lease; a standby scheduler takes over after this
+    WORKFLOW_SCHEDULE_MIN_INTERVAL: int = 60 # Shortest allowed interval schedule, in seconds
+    WORKFLOW_DELAY_MAX_SECONDS: int = 604800 # Longest a delay node may park a run (7 days)
+    WORKFLOW_DELAY_INLINE_MAX_SECONDS: int = 60 # Delays inside map items can't park and sleep on the thread instead
+
+    # Health checks
+    HEALTH_PROBER_MAX_CONNECTIONS: int = 500 # Probes in flight at once per prober process
+    HEALTH_PROBER_PER_HOST_LIMIT: int = 20 # Probes in flight against a single host
+    HEALTH_PROBER_TIMEOUT: float = 10.0
+    HEALTH_PROBER_BATCH_SIZE: int = 500 # Results handed to ingestion at a time
+    HEALTH_PROBER_SHARDS: int = 1 # Prober processes splitting the endpoints between them (by id)
+    HEALTH_PROBER_SHARD: int = 0 # Which shard this process probes, 0 .. HEALTH_PROBER_SHARDS - 1
+    HEALTH_CHECK_TICK_SECONDS: float = 1.0 # How often the prober looks for due endpoints
+    HEALTH_CHECK_SYNC_SECONDS: float = 30.0 # How often it re-reads its shard's endpoints and intervals
+    HEALTH_CHECK_MIN_INTERVAL: int = 10 # Shorter check_interval values are rounded up to this
+    HEALTH_INGEST_BATCH_SIZE: int = 1000 # Check results written per transaction
+    HEALTH_INGEST_FLUSH_INTERVAL: float = 2.0 # Max seconds a result waits in the buffer
+    HEALTH_RESULTS_PARTITIONS_AHEAD: int = 7 # Daily partitions of raw check results created in advance
+    HEALTH_RESULTS_RETENTION_DAYS: int = 14 # Raw results older than this are dropped a day at a time; rollups stay
+
     model_config = SettingsConfigDict(
         env_file="../.env",
         extra="ignore"
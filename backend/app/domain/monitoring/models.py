@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, Float, Text
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, Float, Text, JSON, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.db.base import Base
@@ -46,3 +46,27 @@ class HealthCheckResult(Base):
     timestamp = Column(DateTime(timezone=True), server_default=func.now())
 
     endpoint = relationship("Endpoint", back_populates="results")
+
+    # On Postgres the table is range-partitioned by day on timestamp, with primary
+    # key (id, timestamp); see the partitioning migration and health_partitions
+    __table_args__ = (
+        Index("ix_health_check_results_endpoint_id_timestamp", "endpoint_id", "timestamp"),
+    )
+
+
+class CheckRollupMixin:
+    """Per-endpoint aggregate of the checks in one time bucket (see app.services.health_rollups)."""
+    endpoint_id = Column(Integer, ForeignKey("endpoints.id", ondelete="CASCADE"), primary_key=True)
+    bucket_start = Column(DateTime(timezone=True), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    failures = Column(Integer, nullable=False, default=0)
+    latency_min = Column(Float, nullable=True)
+    latency_max = Column(Float, nullable=True)
+    latency_sum = Column(Float, nullable=False, default=0.0)
+    latency_sketch = Column(JSON, nullable=True) # LatencySketch.to_dict(); mergeable percentiles
+
+class HealthCheckRollupMinute(CheckRollupMixin, Base):
+    __tablename__ = "health_check_rollups_1m"
+
+class HealthCheckRollupHour(CheckRollupMixin, Base):
+    __tablename__ = "health_check_rollups_1h"
@@ -36,3 +36,26 @@ class MonitoredServiceResponse(MonitoredServiceBase):
 
     class Config:
         from_attributes = True
+
+class CheckStatsBucket(BaseModel):
+    bucket_start: datetime
+    count: int
+    failures: int
+    latency_avg: Optional[float] = None
+    latency_p95: Optional[float] = None
+
+class EndpointStats(BaseModel):
+    endpoint_id: int
+    start: datetime
+    end: datetime
+    resolution_seconds: int # Bucket size of the series
+    count: int
+    failures: int
+    availability: Optional[float] = None # Percent of checks that passed
+    latency_min: Optional[float] = None
+    latency_max: Optional[float] = None
+    latency_avg: Optional[float] = None
+    latency_p50: Optional[float] = None
+    latency_p95: Optional[float] = None
+    latency_p99: Optional[float] = None
+    series: List[CheckStatsBucket] = []
@@ -1,3 +1,5 @@
+from datetime import datetime, timezone
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 from app.domain.monitoring.models import MonitoredService, Endpoint
 from app.domain.monitoring.schemas import MonitoredServiceCreate, EndpointCreate
@@ -70,6 +72,8 @@ class MonitoringService:
     ):
         from app.domain.monitoring.models import HealthCheckResult, Endpoint
         from app.domain.incidents.models import Incident
+        from app.services.health_prober import CheckResult
+        from app.services.health_rollups import apply_results
         
         # 1. Save Result
         result = HealthCheckResult(
@@ -80,6 +84,7 @@ class MonitoringService:
             error_message=error_message
         )
         db.add(result)
+        apply_results(db, [CheckResult(endpoint_id, success, latency_ms)])
         
         # 2. Update Endpoint/Service Status (Simplified)
         endpoint = db.query(Endpoint).filter(Endpoint.id == endpoint_id).first()
@@ -146,6 +151,157 @@ class MonitoringService:
 
         return result
 
+    def get_probe_targets(self, db: Session, shard: int = 0, shard_count: int = 1):
+        """(id, url, method, check_interval) of the active endpoints in this prober's shard (split by id)."""
+        query = db.query(Endpoint.id, Endpoint.url, Endpoint.method, Endpoint.check_interval).filter(Endpoint.is_active == True)
+        if shard_count > 1:
+            query = query.filter(Endpoint.id % shard_count == shard)
+        return query.all()
+
+    def record_check_results(self, db: Session, results):
+        """
+        Writes a batch of prober results in one transaction: one multi-row insert,
+        the minute/hour rollup updates, one endpoint lookup, one status update per
+        outcome, and one query for open incidents, however many results the batch
+        holds. A service is marked down if the latest result in the batch for any
+        of its endpoints failed, and healthy otherwise.
+        """
+        from app.domain.monitoring.models import HealthCheckResult
+        from app.domain.incidents.models import Incident
+        from app.services.health_rollups import apply_results
+
+        if not results:
+            return 0
+        now = datetime.now(timezone.utc)
+        # Core insert on the table: every row keeps the same columns, so the batch
+        # goes out as one multi-row INSERT instead of being split up around NULLs
+        db.execute(insert(HealthCheckResult.__table__), [
+            {
+                "endpoint_id": result.endpoint_id,
+                "success": result.success,
+                "latency_ms": result.latency_ms,
+                "status_code": result.status_code,
+                "error_message": result.error_message,
+                "timestamp": result.checked_at or now,
+            }
+            for result in results
+        ])
+        apply_results(db, results, now)
+
+        latest = {}
+        for result in results:
+            latest[result.endpoint_id] = result
+        endpoints = (
+            db.query(Endpoint.id, Endpoint.name, Endpoint.url, Endpoint.service_id)
+            .filter(Endpoint.id.in_(latest.keys()))
+            .all()
+        )
+        failing = {} # service_id -> (endpoint, result) of its first failing endpoint
+        passing = set()
+        for endpoint in endpoints:
+            result = latest[endpoint.id]
+            if not result.success:
+                failing.setdefault(endpoint.service_id, (endpoint, result))
+            else:
+                passing.add(endpoint.service_id)
+        passing -= failing.keys()
+
+        if passing:
+            db.query(MonitoredService).filter(
+                MonitoredService.id.in_(passing), MonitoredService.status != "healthy"
+            ).update({"status": "healthy"}, synchronize_session=False)
+        if failing:
+            db.query(MonitoredService).filter(
+                MonitoredService.id.in_(failing.keys()), MonitoredService.status != "down"
+            ).update({"status": "down"}, synchronize_session=False)
+
+            # Auto-create an incident for each failing service without an open one
+            with_open_incident = {
+                row.service_id for row in db.query(Incident.service_id).filter(
+                    Incident.service_id.in_(failing.keys()), Incident.status != "resolved"
+                ).distinct()
+            }
+            needs_incident = [service_id for service_id in failing if service_id not in with_open_incident]
+            if needs_incident:
+                services = db.query(MonitoredService.id, MonitoredService.name, MonitoredService.owner_team_id).filter(
+                    MonitoredService.id.in_(needs_incident)
+                )
+                incidents = []
+                for service in services:
+                    endpoint, result = failing[service.id]
+                    incidents.append(Incident(
+                        title=f"Service Down: {service.name}",
+                        description=f"Endpoint {endpoint.name} ({endpoint.url}) failed check. Error: {result.error_message}",
+                        severity="high",
+                        status="open",
+                        service_id=service.id,
+                        owner_team_id=service.owner_team_id # Auto-assign to owning team
+                    ))
+                db.add_all(incidents)
+        db.commit()
+
+        service_of = {endpoint.id: endpoint.service_id for endpoint in endpoints}
+        self._publish_check_events([
+            {
+                "type": "check_result",
+                "service_id": service_of[result.endpoint_id],
+                "endpoint_id": result.endpoint_id,
+                "success": False,
+                "latency_ms": result.latency_ms,
+                "status": "down"
+            }
+            for result in results if not result.success and result.endpoint_id in service_of
+        ])
+        return len(results)
+
+    def _publish_check_events(self, events):
+        # Failures only, as record_check_result does, but in one pipelined round trip
+        if not events:
+            return
+        try:
+            import redis
+            import json
+            from app.core.config import settings
+            r = redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+            pipe = r.pipeline(transaction=False)
+            for event in events:
+                pipe.publish("events", json.dumps(event))
+            pipe.execute()
+        except Exception as e:
+            print(f"Failed to publish {len(events)} redis events: {e}")
+
+    def get_endpoint_stats(self, db: Session, endpoint_id: int, start: datetime, end: datetime):
+        """Availability and latency over [start, end), read from the check rollups."""
+        from app.services.health_rollups import pick_resolution, series, summarize
+
+        totals = summarize(db, [endpoint_id], start, end)
+        resolution = pick_resolution(start, end)
+        return {
+            "endpoint_id": endpoint_id,
+            "start": start,
+            "end": end,
+            "resolution_seconds": resolution,
+            "count": totals.count,
+            "failures": totals.failures,
+            "availability": totals.availability,
+            "latency_min": totals.latency_min,
+            "latency_max": totals.latency_max,
+            "latency_avg": totals.latency_avg,
+            "latency_p50": totals.sketch.quantile(0.5),
+            "latency_p95": totals.sketch.quantile(0.95),
+            "latency_p99": totals.sketch.quantile(0.99),
+            "series": [
+                {
+                    "bucket_start": bucket,
+                    "count": aggregate.count,
+                    "failures": aggregate.failures,
+                    "latency_avg": aggregate.latency_avg,
+                    "latency_p95": aggregate.sketch.quantile(0.95),
+                }
+                for bucket, aggregate in series(db, [endpoint_id], start, end, resolution)
+            ],
+        }
+
     def delete_service(self, db: Session, service_id: int):
         from app.domain.incidents.models import Incident
         
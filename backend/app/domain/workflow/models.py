@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON, Text, UniqueConstraint, Index, Boolean
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db.base import Base
+import enum
 
 class Workflow(Base):
     __tablename__ = "workflows"
@@ -10,10 +11,96 @@ class Workflow(Base):
     name = Column(String, index=True, nullable=False)
     description = Column(String, nullable=True)
     steps = Column(JSON, default=[], nullable=False)  # Stores the workflow graph/nodes
+    # Version new runs are pinned to; every save of steps creates a new one
+    current_version_id = Column(Integer, ForeignKey("workflow_versions.id", use_alter=True, name="fk_workflows_current_version_id"), nullable=True)
     owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     is_active = Column(Integer, default=1)
+    webhook_token = Column(String, unique=True, index=True, nullable=True) # Secret part of the inbound webhook URL
     
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     owner = relationship("app.domain.user.models.User", backref="workflows")
+
+class WorkflowVersion(Base):
+    """Immutable snapshot of a workflow graph. Never updated once written."""
+    __tablename__ = "workflow_versions"
+    __table_args__ = (UniqueConstraint("workflow_id", "version", name="uq_workflow_versions_workflow_version"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    workflow_id = Column(Integer, ForeignKey("workflows.id", ondelete="CASCADE"), nullable=False, index=True)
+    version = Column(Integer, nullable=False) # 1, 2, ... per workflow
+    steps = Column(JSON, nullable=False)
+    compiled_graph = Column(JSON, nullable=True) # Validated execution plan (see workflow_plan.plan_to_dict)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class WorkflowRunStatus(str, enum.Enum):
+    queued = "queued"
+    running = "running"
+    succeeded = "succeeded"
+    failed = "failed"
+    waiting = "waiting"
+
+class WorkflowRun(Base):
+    """One execution of a workflow. Progress is checkpointed in StepRun rows."""
+    __tablename__ = "workflow_runs"
+    # Run history is listed newest-first per workflow with keyset pagination on (started_at, id)
+    __table_args__ = (Index("ix_workflow_runs_workflow_started", "workflow_id", "started_at", "id"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    workflow_id = Column(Integer, ForeignKey("workflows.id", ondelete="CASCADE"), nullable=False, index=True)
+    version_id = Column(Integer, ForeignKey("workflow_versions.id"), nullable=True) # Graph this run executes, fixed at creation
+    status = Column(String, default=WorkflowRunStatus.queued.value, nullable=False) # queued, running, waiting, succeeded, failed
+    attempts = Column(Integer, default=0, nullable=False) # > 1 means the run was resumed
+    error = Column(Text, nullable=True)
+    duration_ms = Column(Integer, nullable=True) # From trigger to finish
+    input = Column(JSON, nullable=True) # Exposed to expressions as `input`
+    batch_id = Column(String, nullable=True, index=True) # Set for runs started through bulk-run
+    result_summary = Column(JSON, nullable=True) # e.g. {"steps": 4, "success": 3, "error": 1}
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=False) # When the run was triggered
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    resume_at = Column(DateTime(timezone=True), nullable=True) # Set while parked on a delay node
+
+    steps = relationship("StepRun", back_populates="run", cascade="all, delete-orphan", order_by="StepRun.step_index")
+
+class StepRun(Base):
+    """Checkpoint for one executed node. A node with a StepRun is never re-executed on resume."""
+    __tablename__ = "step_runs"
+    __table_args__ = (UniqueConstraint("run_id", "node_id", name="uq_step_runs_run_node"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    run_id = Column(Integer, ForeignKey("workflow_runs.id", ondelete="CASCADE"), nullable=False, index=True)
+    node_id = Column(String, nullable=False)
+    step_index = Column(Integer, nullable=False)
+    status = Column(String, nullable=False) # success, error, waiting (delay node not yet elapsed)
+    result_handle = Column(String, nullable=True) # Branch taken, e.g. "true"/"false" for conditions
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    run = relationship("WorkflowRun", back_populates="steps")
+
+class WorkflowSchedule(Base):
+    """Cron or fixed-interval trigger for a workflow, fired by the scheduler process."""
+    __tablename__ = "workflow_schedules"
+    # The scheduler loads (is_active, next_run_at) on startup and then only rows changed since its last sync
+    __table_args__ = (Index("ix_workflow_schedules_active_next", "is_active", "next_run_at"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    workflow_id = Column(Integer, ForeignKey("workflows.id", ondelete="CASCADE"), nullable=False, index=True)
+    cron = Column(String, nullable=True) # e.g. "*/5 * * * *" (UTC); either cron or interval_seconds
+    interval_seconds = Column(Integer, nullable=True)
+    input = Column(JSON, nullable=True) # Input for every run this schedule starts
+    is_active = Column(Boolean, default=True, nullable=False)
+    next_run_at = Column(DateTime(timezone=True), nullable=False)
+    last_run_at = Column(DateTime(timezone=True), nullable=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), index=True)
+
+    workflow = relationship("Workflow")
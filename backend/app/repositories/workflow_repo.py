@@ -1,10 +1,12 @@
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from app.domain.workflow.models import Workflow
+from app.domain.workflow.models import Workflow, WorkflowVersion
 from app.schemas.workflow import WorkflowCreate, WorkflowUpdate
+from app.services.workflow_plan import invalidate_workflow_plans
 from typing import List, Optional
 
 class WorkflowRepository:
-    def create(self, db: Session, obj_in: WorkflowCreate, owner_id: int) -> Workflow:
+    def create(self, db: Session, obj_in: WorkflowCreate, owner_id: int, compiled_graph: Optional[dict] = None) -> Workflow:
         db_obj = Workflow(
             name=obj_in.name,
             description=obj_in.description,
@@ -13,6 +15,8 @@ class WorkflowRepository:
             is_active=obj_in.is_active
         )
         db.add(db_obj)
+        db.flush()
+        self._add_version(db, db_obj, compiled_graph)
         db.commit()
         db.refresh(db_obj)
         return db_obj
@@ -20,21 +24,58 @@ class WorkflowRepository:
     def get(self, db: Session, id: int) -> Optional[Workflow]:
         return db.query(Workflow).filter(Workflow.id == id).first()
 
+    def get_by_webhook_token(self, db: Session, token: str) -> Optional[Workflow]:
+        return db.query(Workflow).filter(Workflow.webhook_token == token).first()
+
+    def set_webhook_token(self, db: Session, db_obj: Workflow, token: str) -> Workflow:
+        db_obj.webhook_token = token
+        db.add(db_obj)
+        db.commit()
+        db.refresh(db_obj)
+        return db_obj
+
     def get_multi_by_owner(self, db: Session, owner_id: int, skip: int = 0, limit: int = 100) -> List[Workflow]:
         return db.query(Workflow).filter(Workflow.owner_id == owner_id).offset(skip).limit(limit).all()
 
-    def update(self, db: Session, db_obj: Workflow, obj_in: WorkflowUpdate) -> Workflow:
+    def update(self, db: Session, db_obj: Workflow, obj_in: WorkflowUpdate, compiled_graph: Optional[dict] = None) -> Workflow:
+        """Pass compiled_graph when steps changed: the new graph becomes a new version."""
         update_data = obj_in.dict(exclude_unset=True)
         for field, value in update_data.items():
             setattr(db_obj, field, value)
         
         db.add(db_obj)
+        if compiled_graph is not None:
+            self._add_version(db, db_obj, compiled_graph)
         db.commit()
         db.refresh(db_obj)
+        # No plan invalidation: cached plans are keyed by version, and a version never changes
         return db_obj
 
+    def _add_version(self, db: Session, db_obj: Workflow, compiled_graph: Optional[dict]) -> WorkflowVersion:
+        # Runs already queued or in flight keep the version they were created with
+        latest = db.query(func.max(WorkflowVersion.version)).filter(WorkflowVersion.workflow_id == db_obj.id).scalar()
+        version = WorkflowVersion(
+            workflow_id=db_obj.id,
+            version=(latest or 0) + 1,
+            steps=db_obj.steps,
+            compiled_graph=compiled_graph,
+        )
+        db.add(version)
+        db.flush()
+        db_obj.current_version_id = version.id
+        return version
+
+    def get_versions(self, db: Session, workflow_id: int) -> List[WorkflowVersion]:
+        return (
+            db.query(WorkflowVersion)
+            .filter(WorkflowVersion.workflow_id == workflow_id)
+            .order_by(WorkflowVersion.version.desc())
+            .all()
+        )
+
     def remove(self, db: Session, id: int) -> Workflow:
         obj = db.query(Workflow).get(id)
         db.delete(obj)
         db.commit()
+        invalidate_workflow_plans(id)
         return obj
@@ -0,0 +1,183 @@
+from datetime import datetime, timezone
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.orm import Session
+from app.domain.user.models import User
+from app.domain.workflow.models import Workflow, WorkflowRun, StepRun, WorkflowRunStatus
+from typing import Dict, List, Optional, Tuple
+
+FINISHED_STATUSES = (WorkflowRunStatus.succeeded.value, WorkflowRunStatus.failed.value)
+
+def current_version_of(workflow_id: int):
+    """Pins a new run to the workflow's current version inside the INSERT itself."""
+    return select(Workflow.current_version_id).where(Workflow.id == workflow_id).scalar_subquery()
+
+class WorkflowRunRepository:
+    def create(self, db: Session, workflow_id: int, input: Optional[dict] = None) -> WorkflowRun:
+        db_obj = WorkflowRun(
+            workflow_id=workflow_id,
+            version_id=current_version_of(workflow_id),
+            status=WorkflowRunStatus.queued.value,
+            input=input,
+            started_at=datetime.now(timezone.utc)
+        )
+        db.add(db_obj)
+        db.commit()
+        db.refresh(db_obj)
+        return db_obj
+
+    def create_many(self, db: Session, items: List[Tuple[int, Optional[dict]]], batch_id: str) -> List[WorkflowRun]:
+        """Creates one queued run per (workflow_id, input) pair in a single transaction."""
+        now = datetime.now(timezone.utc)
+        versions = dict(
+            db.query(Workflow.id, Workflow.current_version_id)
+            .filter(Workflow.id.in_({workflow_id for workflow_id, _ in items}))
+            .all()
+        )
+        runs = [
+            WorkflowRun(
+                workflow_id=workflow_id,
+                version_id=versions.get(workflow_id),
+                status=WorkflowRunStatus.queued.value,
+                input=input,
+                batch_id=batch_id,
+                started_at=now
+            )
+            for workflow_id, input in items
+        ]
+        db.add_all(runs)
+        db.commit()
+        return runs
+
+    def get_batch_counts(self, db: Session, batch_id: str, owner_id: int) -> Dict[str, int]:
+        """Run counts by status for a batch, restricted to the owner's workflows."""
+        rows = (
+            db.query(WorkflowRun.status, func.count(WorkflowRun.id))
+            .join(Workflow, Workflow.id == WorkflowRun.workflow_id)
+            .filter(WorkflowRun.batch_id == batch_id, Workflow.owner_id == owner_id)
+            .group_by(WorkflowRun.status)
+            .all()
+        )
+        return dict(rows)
+
+    def get(self, db: Session, id: int) -> Optional[WorkflowRun]:
+        return db.query(WorkflowRun).filter(WorkflowRun.id == id).first()
+
+    def get_multi_by_workflow(
+        self, db: Session, workflow_id: int, limit: int = 50, before: Optional[WorkflowRun] = None
+    ) -> List[WorkflowRun]:
+        """Newest first. Pass the last run of the previous page as `before` to continue (keyset)."""
+        query = db.query(WorkflowRun).filter(WorkflowRun.workflow_id == workflow_id)
+        if before is not None:
+            query = query.filter(or_(
+                WorkflowRun.started_at < before.started_at,
+                and_(WorkflowRun.started_at == before.started_at, WorkflowRun.id < before.id)
+            ))
+        return query.order_by(WorkflowRun.started_at.desc(), WorkflowRun.id.desc()).limit(limit).all()
+
+    def delete_older_than(self, db: Session, cutoff: datetime, batch_size: int = 1000) -> int:
+        """Deletes finished runs (and their steps) started before cutoff, in batches."""
+        deleted = 0
+        while True:
+            ids = [row.id for row in db.query(WorkflowRun.id).filter(
+                WorkflowRun.started_at < cutoff,
+                WorkflowRun.status.in_(FINISHED_STATUSES)
+            ).limit(batch_size).all()]
+            if not ids:
+                return deleted
+            db.query(StepRun).filter(StepRun.run_id.in_(ids)).delete(synchronize_session=False)
+            db.query(WorkflowRun).filter(WorkflowRun.id.in_(ids)).delete(synchronize_session=False)
+            db.commit()
+            deleted += len(ids)
+
+    def get_completed_steps(self, db: Session, run_id: int) -> Dict[str, StepRun]:
+        steps = db.query(StepRun).filter(StepRun.run_id == run_id).all()
+        return {step.node_id: step for step in steps}
+
+    def mark_running(self, db: Session, run: WorkflowRun) -> WorkflowRun:
+        run.status = WorkflowRunStatus.running.value
+        run.attempts = (run.attempts or 0) + 1
+        run.resume_at = None
+        db.commit()
+        return run
+
+    def mark_waiting(self, db: Session, run: WorkflowRun, resume_at: datetime) -> WorkflowRun:
+        run.status = WorkflowRunStatus.waiting.value
+        run.resume_at = resume_at
+        db.commit()
+        return run
+
+    def get_resumable(self, db: Session, run_ids: List[int]) -> List[tuple]:
+        """(run_id, workflow_id, owner_id, plan) for the waiting runs among run_ids."""
+        return (
+            db.query(WorkflowRun.id, WorkflowRun.workflow_id, Workflow.owner_id, User.plan)
+            .join(Workflow, Workflow.id == WorkflowRun.workflow_id)
+            .outerjoin(User, User.id == Workflow.owner_id)
+            .filter(WorkflowRun.id.in_(run_ids), WorkflowRun.status == WorkflowRunStatus.waiting.value)
+            .all()
+        )
+
+    def add_step(
+        self,
+        db: Session,
+        run_id: int,
+        node_id: str,
+        step_index: int,
+        status: str,
+        result_handle: Optional[str] = None,
+        result: Optional[dict] = None,
+        error: Optional[str] = None,
+        started_at: Optional[datetime] = None,
+        finished_at: Optional[datetime] = None,
+    ) -> StepRun:
+        # Committed immediately: this is the checkpoint a resumed run starts from
+        step = StepRun(
+            run_id=run_id,
+            node_id=node_id,
+            step_index=step_index,
+            status=status,
+            result_handle=result_handle,
+            result=result,
+            error=error,
+            started_at=started_at,
+            finished_at=finished_at,
+        )
+        db.add(step)
+        db.commit()
+        return step
+
+    def complete_step(
+        self,
+        db: Session,
+        run_id: int,
+        node_id: str,
+        status: str,
+        result_handle: Optional[str] = None,
+        result: Optional[dict] = None,
+        error: Optional[str] = None,
+        finished_at: Optional[datetime] = None,
+    ) -> None:
+        """Finishes a step checkpointed earlier as waiting (a delay node)."""
+        db.query(StepRun).filter(StepRun.run_id == run_id, StepRun.node_id == node_id).update(
+            {"status": status, "result_handle": result_handle, "result": result, "error": error, "finished_at": finished_at},
+            synchronize_session=False,
+        )
+        db.commit()
+
+    def finish(self, db: Session, run: WorkflowRun, status: str, error: Optional[str] = None) -> WorkflowRun:
+        counts = dict(
+            db.query(StepRun.status, func.count(StepRun.id))
+            .filter(StepRun.run_id == run.id)
+            .group_by(StepRun.status)
+            .all()
+        )
+        run.status = status
+        run.error = error
+        run.finished_at = datetime.now(timezone.utc)
+        started_at = run.started_at
+        if started_at.tzinfo is None:
+            # SQLite hands back naive datetimes
+            started_at = started_at.replace(tzinfo=timezone.utc)
+        run.duration_ms = int((run.finished_at - started_at).total_seconds() * 1000)
+        run.result_summary = {"steps": sum(counts.values()), **counts}
+        db.commit()
+        return run
@@ -0,0 +1,90 @@
+from datetime import datetime
+from sqlalchemy.orm import Session
+from app.domain.user.models import User
+from app.domain.workflow.models import Workflow, WorkflowRun, WorkflowRunStatus, WorkflowSchedule
+from app.repositories.workflow_run_repo import current_version_of
+from typing import List, Optional
+
+class WorkflowScheduleRepository:
+    def create(
+        self,
+        db: Session,
+        workflow_id: int,
+        next_run_at: datetime,
+        cron: Optional[str] = None,
+        interval_seconds: Optional[int] = None,
+        input: Optional[dict] = None,
+        is_active: bool = True,
+    ) -> WorkflowSchedule:
+        db_obj = WorkflowSchedule(
+            workflow_id=workflow_id,
+            cron=cron,
+            interval_seconds=interval_seconds,
+            input=input,
+            is_active=is_active,
+            next_run_at=next_run_at,
+        )
+        db.add(db_obj)
+        db.commit()
+        db.refresh(db_obj)
+        return db_obj
+
+    def get(self, db: Session, id: int) -> Optional[WorkflowSchedule]:
+        return db.query(WorkflowSchedule).filter(WorkflowSchedule.id == id).first()
+
+    def get_multi_by_workflow(self, db: Session, workflow_id: int) -> List[WorkflowSchedule]:
+        return db.query(WorkflowSchedule).filter(WorkflowSchedule.workflow_id == workflow_id).order_by(WorkflowSchedule.id).all()
+
+    def remove(self, db: Session, schedule: WorkflowSchedule) -> WorkflowSchedule:
+        db.delete(schedule)
+        db.commit()
+        return schedule
+
+    def get_active_next_runs(self, db: Session) -> List[tuple]:
+        """(id, next_run_at) for every active schedule; what the scheduler's heap is built from."""
+        return db.query(WorkflowSchedule.id, WorkflowSchedule.next_run_at).filter(WorkflowSchedule.is_active == True).all()
+
+    def get_changed_since(self, db: Session, since: datetime) -> List[tuple]:
+        """(id, is_active, next_run_at) for schedules created or modified after since."""
+        return (
+            db.query(WorkflowSchedule.id, WorkflowSchedule.is_active, WorkflowSchedule.next_run_at)
+            .filter(WorkflowSchedule.updated_at >= since)
+            .all()
+        )
+
+    def get_due(self, db: Session, ids: List[int]) -> List[tuple]:
+        """Schedules to fire, with what is needed to queue their runs, in one query."""
+        return (
+            db.query(WorkflowSchedule, Workflow.owner_id, Workflow.is_active, User.plan)
+            .join(Workflow, Workflow.id == WorkflowSchedule.workflow_id)
+            .outerjoin(User, User.id == Workflow.owner_id)
+            .filter(WorkflowSchedule.id.in_(ids))
+            .all()
+        )
+
+    def claim_and_create_run(
+        self, db: Session, schedule: WorkflowSchedule, expected_next: datetime, new_next: datetime, now: datetime
+    ) -> Optional[WorkflowRun]:
+        """
+        Moves next_run_at forward and creates the run in one transaction, but only if
+        next_run_at is still what this scheduler saw. If another scheduler already
+        fired this occurrence, nothing is written and None is returned.
+        """
+        claimed = (
+            db.query(WorkflowSchedule)
+            .filter(WorkflowSchedule.id == schedule.id, WorkflowSchedule.next_run_at == expected_next)
+            .update({"next_run_at": new_next, "last_run_at": now}, synchronize_session=False)
+        )
+        if not claimed:
+            db.rollback()
+            return None
+        run = WorkflowRun(
+            workflow_id=schedule.workflow_id,
+            version_id=current_version_of(schedule.workflow_id),
+            status=WorkflowRunStatus.queued.value,
+            input=schedule.input,
+            started_at=now,
+        )
+        db.add(run)
+        db.commit()
+        return run
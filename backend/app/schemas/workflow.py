@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional, Any, Dict
 from datetime import datetime
 
@@ -17,8 +17,99 @@ class WorkflowUpdate(WorkflowBase):
 class WorkflowResponse(WorkflowBase):
     id: int
     owner_id: int
+    current_version_id: Optional[int] = None # Version new runs execute
     created_at: datetime
     updated_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
+
+class StepRunResponse(BaseModel):
+    node_id: str
+    step_index: int
+    status: str
+    result_handle: Optional[str] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class WorkflowRunResponse(BaseModel):
+    id: int
+    workflow_id: int
+    version_id: Optional[int] = None # Workflow version this run executes
+    status: str
+    attempts: int
+    error: Optional[str] = None
+    duration_ms: Optional[int] = None
+    result_summary: Optional[Dict[str, Any]] = None
+    started_at: datetime
+    finished_at: Optional[datetime] = None
+    resume_at: Optional[datetime] = None # When a waiting run continues
+
+    class Config:
+        from_attributes = True
+
+class WorkflowRunDetail(WorkflowRunResponse):
+    steps: List[StepRunResponse] = []
+
+class WorkflowRunPage(BaseModel):
+    items: List[WorkflowRunResponse]
+    next_cursor: Optional[int] = None # Pass as ?before=<cursor> to get the next page
+
+class BulkRunItem(BaseModel):
+    workflow_id: int
+    input: Optional[Dict[str, Any]] = None
+
+class BulkRunRequest(BaseModel):
+    runs: List[BulkRunItem] = Field(..., min_length=1, max_length=1000)
+
+class BulkRunResponse(BaseModel):
+    batch_id: str
+    run_ids: List[int]
+
+class BatchStatus(BaseModel):
+    batch_id: str
+    total: int
+    counts: Dict[str, int] # Runs per status
+    finished: bool
+
+class WebhookTokenResponse(BaseModel):
+    workflow_id: int
+    webhook_url: str # POST a JSON body here; it becomes the run's input
+
+class WebhookRunResponse(BaseModel):
+    run_id: int
+    status: str
+    mode: str # inline (finished in the API), handed_off (over budget, resumed by a worker) or queued
+
+class ScheduleCreate(BaseModel):
+    cron: Optional[str] = None # 5-field cron in UTC, e.g. "*/15 * * * *" or "@daily"
+    interval_seconds: Optional[int] = None # Alternative to cron: fire every N seconds
+    input: Optional[Dict[str, Any]] = None # Passed to each scheduled run
+
+class ScheduleResponse(BaseModel):
+    id: int
+    workflow_id: int
+    cron: Optional[str] = None
+    interval_seconds: Optional[int] = None
+    input: Optional[Dict[str, Any]] = None
+    is_active: bool
+    next_run_at: datetime
+    last_run_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class WorkflowVersionResponse(BaseModel):
+    id: int
+    workflow_id: int
+    version: int
+    steps: List[Dict[str, Any]]
+    created_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,56 @@
+import threading
+from typing import Callable, Iterable, List
+
+from app.services.health_prober import CheckResult
+
+
+class CheckResultBuffer:
+    """
+    Collects check results from the prober and writes them in bulk.
+
+    With checks spread over each interval, every tick only finishes a handful of
+    probes; writing those straight away would mean a transaction per tick. The
+    buffer instead hands write() up to batch_size results at once, or whatever has
+    collected after flush_interval seconds (via a one-shot timer, like the
+    workflow EventBatcher), so database writes track batches, not checks.
+    """
+    def __init__(self, write: Callable[[List[CheckResult]], None], batch_size: int = 1000, flush_interval: float = 2.0):
+        self.write = write
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._buffer: List[CheckResult] = []
+        self._lock = threading.Lock()
+        # One write at a time: the timer and a full buffer may flush together, and
+        # two of our own transactions would only queue on the same rollup row locks
+        self._write_lock = threading.Lock()
+        self._timer = None
+
+    def add(self, results: Iterable[CheckResult]):
+        with self._lock:
+            self._buffer.extend(results)
+            if len(self._buffer) < self.batch_size:
+                if self._buffer and self._timer is None and self.flush_interval > 0:
+                    self._timer = threading.Timer(self.flush_interval, self.flush)
+                    self._timer.daemon = True
+                    self._timer.start()
+                return
+        self.flush()
+
+    def flush(self):
+        # Taken before the buffer is swapped, so batches are written in the order
+        # they were cut and an older batch can't overwrite a newer endpoint status
+        with self._write_lock:
+            with self._lock:
+                pending, self._buffer = self._buffer, []
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+            for start in range(0, len(pending), self.batch_size):
+                batch = pending[start:start + self.batch_size]
+                try:
+                    self.write(batch)
+                except Exception as e:
+                    print(f"[Prober] Failed to write {len(batch)} check results: {e}")
+
+    def __len__(self):
+        return len(self._buffer)
@@ -0,0 +1,244 @@
+import re
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta, timezone
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.services.health_rollups import sketch_sql
+
+TABLE = "health_check_results"
+ROLLUPS = [("health_check_rollups_1m", "minute"), ("health_check_rollups_1h", "hour")]
+
+_TIMESTAMP = re.compile(r"(\d{4}-\d{2}-\d{2})[ T](\d{2}:\d{2}:\d{2})(?:\.(\d+))?(?:([+-]\d{2}):?(\d{2})?)?$")
+_BOUND = re.compile(r"FROM \((?:'([^']+)'|MINVALUE)\) TO \((?:'([^']+)'|MAXVALUE)\)")
+
+
+@dataclass
+class Partition:
+    name: str
+    start: Optional[datetime] # None for MINVALUE
+    end: Optional[datetime] # None for MAXVALUE
+
+
+def partition_name(day: date) -> str:
+    return f"{TABLE}_p{day:%Y%m%d}"
+
+
+def _parse_timestamp(value: str) -> datetime:
+    # Postgres prints bounds like '2026-10-18 00:00:00+00' (or +05:30, or with
+    # trimmed fractional seconds); before Python 3.11 fromisoformat only takes
+    # +HH:MM offsets and 3 or 6 fraction digits, so normalize first
+    match = _TIMESTAMP.match(value.strip())
+    if match:
+        day, clock, fraction, hours, minutes = match.groups()
+        value = f"{day} {clock}.{(fraction or '').ljust(6, '0')[:6]}"
+        if hours:
+            value += f"{hours}:{minutes or '00'}"
+    moment = datetime.fromisoformat(value)
+    return moment.replace(tzinfo=timezone.utc) if moment.tzinfo is None else moment.astimezone(timezone.utc)
+
+
+def parse_bound(name: str, bound: str) -> Optional[Partition]:
+    """Partition from pg_get_expr(relpartbound); None for the DEFAULT partition."""
+    match = _BOUND.search(bound)
+    if not match:
+        return None
+    start, end = match.groups()
+    return Partition(name, _parse_timestamp(start) if start else None, _parse_timestamp(end) if end else None)
+
+
+def days_to_create(partitions: List[Partition], today: date, days_ahead: int) -> List[date]:
+    """Days from today to today + days_ahead that no existing partition covers yet."""
+    missing = []
+    for offset in range(days_ahead + 1):
+        day = today + timedelta(days=offset)
+        start = datetime.combine(day, time.min, tzinfo=timezone.utc)
+        end = start + timedelta(days=1)
+        covered = any(
+            (p.start is None or p.start < end) and (p.end is None or p.end > start)
+            for p in partitions
+        )
+        if not covered:
+            missing.append(day)
+    return missing
+
+
+def expired(partitions: List[Partition], cutoff: datetime) -> List[Partition]:
+    """Partitions whose whole range is older than cutoff."""
+    return [p for p in partitions if p.end is not None and p.end <= cutoff]
+
+
+class ResultPartitions:
+    """
+    Daily partitions of health_check_results (Postgres range partitioning on
+    timestamp, see the partitioning migration). Partitions are created some days
+    ahead, so inserts always land in a real partition and range queries on
+    timestamp only touch the days they ask for. Raw results past retention go
+    away a whole partition at a time: detach, then DROP TABLE, with no bulk
+    DELETE and nothing left for vacuum. Rollups keep their history.
+
+    Rows for a day without a partition land in the DEFAULT partition. They move
+    into the day's partition when it is created, expire with the same retention,
+    and whatever remains is reported by maintain_partitions.
+
+    On databases without partitioning (SQLite in tests, or a schema made by
+    create_all instead of the migrations) every operation is a no-op.
+    """
+    def is_partitioned(self, db: Session) -> bool:
+        if db.bind.dialect.name != "postgresql":
+            return False
+        return db.execute(
+            text("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:table)"),
+            {"table": TABLE},
+        ).first() is not None
+
+    def list(self, db: Session) -> List[Partition]:
+        partitions = [parse_bound(name, bound) for name, bound in self._children(db)]
+        return sorted((p for p in partitions if p), key=lambda p: p.start or datetime.min.replace(tzinfo=timezone.utc))
+
+    def default(self, db: Session) -> Optional[str]:
+        """Name of the DEFAULT partition, if there is one."""
+        return next((name for name, bound in self._children(db) if bound == "DEFAULT"), None)
+
+    def _children(self, db: Session):
+        return db.execute(text(
+            "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) "
+            "FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass(:table)"
+        ), {"table": TABLE}).all()
+
+    def default_rows(self, db: Session, default: str) -> int:
+        return db.execute(text(f"SELECT count(*) FROM {default}")).scalar()
+
+    def create_ahead(self, db: Session, today: date, days_ahead: int) -> List[str]:
+        created = []
+        default = self.default(db)
+        for day in days_to_create(self.list(db), today, days_ahead):
+            start = datetime.combine(day, time.min, tzinfo=timezone.utc)
+            bounds = {"start": start, "end": start + timedelta(days=1)}
+            name = partition_name(day)
+            try:
+                # Postgres refuses a new partition while the default one holds rows
+                # for its range, so those rows move over: detach the default, create
+                # the day, move its rows, attach the default back. One transaction,
+                # and a no-op beyond the CREATE when the default has nothing for the day.
+                stranded = default is not None and db.execute(text(
+                    f"SELECT 1 FROM {default} WHERE timestamp >= :start AND timestamp < :end LIMIT 1"
+                ), bounds).first() is not None
+                if stranded:
+                    db.execute(text(f"ALTER TABLE {TABLE} DETACH PARTITION {default}"))
+                db.execute(text(
+                    f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {TABLE} "
+                    f"FOR VALUES FROM ('{start.isoformat()}') TO ('{bounds['end'].isoformat()}')"
+                ))
+                if stranded:
+                    where = "timestamp >= :start AND timestamp < :end"
+                    db.execute(text(f"INSERT INTO {name} SELECT * FROM {default} WHERE {where}"), bounds)
+                    db.execute(text(f"DELETE FROM {default} WHERE {where}"), bounds)
+                    db.execute(text(f"ALTER TABLE {TABLE} ATTACH PARTITION {default} DEFAULT"))
+                db.commit()
+                created.append(name)
+            except Exception as e:
+                db.rollback()
+                print(f"[Partitions] ERROR: failed to create {name}: {e}")
+        return created
+
+    def fold_into_rollups(self, db: Session, table: str, before: Optional[datetime] = None):
+        """
+        Makes sure every check in the partition is counted in the rollups before it
+        is dropped. Rollups are kept up to date on ingest, so normally nothing
+        changes; buckets that saw fewer checks than the raw rows hold (results
+        written before rollups existed, or by something that bypassed ingestion)
+        are rebuilt from the raw rows, latency sketch included. With before,
+        only rows older than it are folded.
+        """
+        where = "WHERE timestamp < :before" if before is not None else ""
+        sketch = sketch_sql("latency_ms")
+        for rollup, unit in ROLLUPS:
+            db.execute(text(f"""
+                WITH raw AS (
+                    SELECT endpoint_id, date_trunc('{unit}', timestamp AT TIME ZONE 'UTC') AT TIME ZONE 'UTC' AS bucket_start,
+                           success, latency_ms, {sketch["bin"]} AS bin
+                    FROM {table}
+                    {where}
+                ), bins AS (
+                    SELECT endpoint_id, bucket_start, json_object_agg(bin::text, n) AS bins
+                    FROM (
+                        SELECT endpoint_id, bucket_start, bin, count(*) AS n
+                        FROM raw WHERE bin IS NOT NULL
+                        GROUP BY endpoint_id, bucket_start, bin
+                    ) per_bin
+                    GROUP BY endpoint_id, bucket_start
+                ), totals AS (
+                    SELECT endpoint_id, bucket_start, count(*) AS count, sum(CASE WHEN success THEN 0 ELSE 1 END) AS failures,
+                           min(latency_ms) AS latency_min, max(latency_ms) AS latency_max,
+                           coalesce(sum(latency_ms), 0) AS latency_sum, count(*) FILTER (WHERE {sketch["zero"]}) AS zeros
+                    FROM raw
+                    GROUP BY endpoint_id, bucket_start
+                )
+                INSERT INTO {rollup} (endpoint_id, bucket_start, count, failures, latency_min, latency_max, latency_sum, latency_sketch)
+                SELECT endpoint_id, bucket_start, count, failures, latency_min, latency_max, latency_sum,
+                       json_build_object('zeros', zeros, 'bins', coalesce(bins, '{{}}'::json))
+                FROM totals LEFT JOIN bins USING (endpoint_id, bucket_start)
+                ON CONFLICT (endpoint_id, bucket_start) DO UPDATE SET
+                    count = EXCLUDED.count,
+                    failures = EXCLUDED.failures,
+                    latency_min = EXCLUDED.latency_min,
+                    latency_max = EXCLUDED.latency_max,
+                    latency_sum = EXCLUDED.latency_sum,
+                    latency_sketch = EXCLUDED.latency_sketch
+                WHERE {rollup}.count < EXCLUDED.count
+            """), {"before": before} if before is not None else {})
+
+    def drop_expired(self, db: Session, cutoff: datetime) -> List[str]:
+        dropped = []
+        for partition in expired(self.list(db), cutoff):
+            # Fold, detach and drop in one transaction: if anything fails the
+            # partition stays attached and the next run tries again
+            try:
+                self.fold_into_rollups(db, partition.name)
+                db.execute(text(f"ALTER TABLE {TABLE} DETACH PARTITION {partition.name}"))
+                db.execute(text(f"DROP TABLE {partition.name}"))
+                db.commit()
+                dropped.append(partition.name)
+            except Exception as e:
+                db.rollback()
+                print(f"[Partitions] Failed to drop {partition.name}: {e}")
+        return dropped
+
+    def expire_default(self, db: Session, default: str, cutoff: datetime) -> int:
+        """Folds and deletes default-partition rows past retention; the partition itself stays."""
+        try:
+            self.fold_into_rollups(db, default, before=cutoff)
+            deleted = db.execute(text(f"DELETE FROM {default} WHERE timestamp < :before"), {"before": cutoff}).rowcount
+            db.commit()
+            return deleted
+        except Exception as e:
+            db.rollback()
+            print(f"[Partitions] Failed to expire rows in {default}: {e}")
+            return 0
+
+
+def maintain_partitions(db: Session, days_ahead: int, retention_days: int, now: Optional[datetime] = None) -> dict:
+    """
+    Creates the coming days' partitions and drops the ones past retention.
+    default_rows is what is left in the DEFAULT partition afterwards; it should be
+    0, anything else means rows arrived for days without a partition.
+    """
+    today = (now or datetime.now(timezone.utc)).astimezone(timezone.utc).date()
+    partitions = ResultPartitions()
+    if not partitions.is_partitioned(db):
+        return {"partitioned": False, "created": [], "dropped": [], "default_rows": 0}
+    created = partitions.create_ahead(db, today, days_ahead)
+    cutoff = datetime.combine(today, time.min, tzinfo=timezone.utc) - timedelta(days=retention_days)
+    dropped = partitions.drop_expired(db, cutoff)
+    default_rows = 0
+    default = partitions.default(db)
+    if default is not None:
+        partitions.expire_default(db, default, cutoff)
+        default_rows = partitions.default_rows(db, default)
+        if default_rows:
+            print(f"[Partitions] ERROR: {default_rows} rows in {default} fall outside every daily partition")
+    return {"partitioned": True, "created": created, "dropped": dropped, "default_rows": default_rows}
@@ -0,0 +1,155 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, Optional
+from urllib.parse import urlsplit
+
+import httpx
+from app.core.config import settings
+
+
+@dataclass(frozen=True)
+class ProbeTarget:
+    endpoint_id: int
+    url: str
+    method: str = "GET"
+    check_interval: int = 60
+
+
+@dataclass
+class CheckResult:
+    endpoint_id: int
+    success: bool
+    latency_ms: float
+    status_code: Optional[int] = None
+    error_message: Optional[str] = None
+    checked_at: Optional[datetime] = None
+
+
+def is_healthy(status_code: int) -> bool:
+    # Simple success criteria: 2xx or 3xx (same as the per-check Celery task)
+    return 200 <= status_code < 400
+
+
+class HealthProber:
+    """
+    Probes many endpoints at once from a single event loop.
+
+    All probes share one pooled AsyncClient (kept alive between rounds), at most
+    max_connections are in flight overall and at most per_host_limit against any
+    one host, so a shard full of endpoints on the same API doesn't hammer it or
+    starve everyone else of connections. Results are handed to on_batch in lists
+    of batch_size, on a worker thread so a slow database write doesn't stall the
+    probes still running; batches are ingested one at a time, in order.
+    """
+    def __init__(
+        self,
+        max_connections: int = 500,
+        per_host_limit: int = 20,
+        timeout: float = 10.0,
+        batch_size: int = 500,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.max_connections = max_connections
+        self.per_host_limit = per_host_limit
+        self.timeout = timeout
+        self.batch_size = batch_size
+        self._transport = transport
+        self._client = None
+        self._host_slots: Dict[str, asyncio.Semaphore] = {}
+        self._slots = None
+
+    @classmethod
+    def from_settings(cls) -> "HealthProber":
+        return cls(
+            max_connections=settings.HEALTH_PROBER_MAX_CONNECTIONS,
+            per_host_limit=settings.HEALTH_PROBER_PER_HOST_LIMIT,
+            timeout=settings.HEALTH_PROBER_TIMEOUT,
+            batch_size=settings.HEALTH_PROBER_BATCH_SIZE,
+        )
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            limits = httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections)
+            kwargs = {"limits": limits, "timeout": self.timeout}
+            if self._transport is not None:
+                kwargs["transport"] = self._transport
+            self._client = httpx.AsyncClient(**kwargs)
+        return self._client
+
+    def _host_slot(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc
+        slot = self._host_slots.get(host)
+        if slot is None:
+            slot = self._host_slots[host] = asyncio.Semaphore(self.per_host_limit)
+        return slot
+
+    async def probe(self, targets: Iterable[ProbeTarget], on_batch: Callable[[List[CheckResult]], None]) -> int:
+        """Probes every target once and ingests the results. Returns how many were probed."""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_connections)
+        batches = asyncio.Queue()
+        ingesting = asyncio.create_task(self._ingest(batches, on_batch))
+        pending: List[CheckResult] = []
+        probed = 0
+
+        async def run(target: ProbeTarget):
+            nonlocal pending
+            result = await self._probe_one(target)
+            pending.append(result)
+            if len(pending) >= self.batch_size:
+                batches.put_nowait(pending)
+                pending = []
+
+        try:
+            tasks = [asyncio.create_task(run(target)) for target in targets]
+            probed = len(tasks)
+            if tasks:
+                await asyncio.gather(*tasks)
+            if pending:
+                batches.put_nowait(pending)
+        finally:
+            batches.put_nowait(None)
+            await ingesting
+        return probed
+
+    async def _probe_one(self, target: ProbeTarget) -> CheckResult:
+        # Wait for the host first so probes queued behind a busy host don't hold
+        # connections other hosts could use
+        async with self._host_slot(target.url):
+            async with self._slots:
+                start = time.perf_counter()
+                try:
+                    response = await self.client.request(target.method or "GET", target.url)
+                except Exception as e:
+                    return CheckResult(
+                        endpoint_id=target.endpoint_id,
+                        success=False,
+                        latency_ms=(time.perf_counter() - start) * 1000,
+                        error_message=str(e) or type(e).__name__,
+                        checked_at=datetime.now(timezone.utc),
+                    )
+                return CheckResult(
+                    endpoint_id=target.endpoint_id,
+                    success=is_healthy(response.status_code),
+                    latency_ms=(time.perf_counter() - start) * 1000,
+                    status_code=response.status_code,
+                    checked_at=datetime.now(timezone.utc),
+                )
+
+    async def _ingest(self, batches: asyncio.Queue, on_batch):
+        while True:
+            batch = await batches.get()
+            if batch is None:
+                return
+            try:
+                await asyncio.to_thread(on_batch, batch)
+            except Exception as e:
+                print(f"[Prober] Failed to ingest {len(batch)} results: {e}")
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
@@ -0,0 +1,304 @@
+import math
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import bindparam, select, tuple_, update
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.domain.monitoring.models import HealthCheckRollupHour, HealthCheckRollupMinute
+
+# Coarsest last
+RESOLUTIONS = [(60, HealthCheckRollupMinute), (3600, HealthCheckRollupHour)]
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+SKETCH_ACCURACY = 0.02 # Quantiles are within 2% of the true latency
+_GAMMA = (1 + SKETCH_ACCURACY) / (1 - SKETCH_ACCURACY)
+_LOG_GAMMA = math.log(_GAMMA)
+_MIN_LATENCY = 0.01 # ms; anything faster counts as zero
+
+
+class LatencySketch:
+    """
+    Mergeable latency distribution (DDSketch-style): latencies are counted in
+    logarithmic bins, each (1 ± SKETCH_ACCURACY) wide, so any quantile read back
+    is within that relative error. Two sketches merge by adding bin counts, which
+    is what lets minute rollups add up to an hour, or hours to thirty days,
+    without keeping the raw checks. 1ms-60s fits in about 275 bins; a typical
+    endpoint uses a few dozen.
+    """
+    def __init__(self, bins: Optional[Dict[int, int]] = None, zeros: int = 0):
+        self.bins = bins or {}
+        self.zeros = zeros
+
+    def add(self, latency_ms: float, count: int = 1):
+        if latency_ms is None:
+            return
+        if latency_ms < _MIN_LATENCY:
+            self.zeros += count
+            return
+        key = math.ceil(math.log(latency_ms) / _LOG_GAMMA)
+        self.bins[key] = self.bins.get(key, 0) + count
+
+    def merge(self, other: "LatencySketch"):
+        for key, count in other.bins.items():
+            self.bins[key] = self.bins.get(key, 0) + count
+        self.zeros += other.zeros
+
+    @property
+    def count(self) -> int:
+        return self.zeros + sum(self.bins.values())
+
+    def quantile(self, q: float) -> Optional[float]:
+        total = self.count
+        if not total:
+            return None
+        rank = q * (total - 1)
+        seen = self.zeros
+        if rank < seen:
+            return 0.0
+        for key in sorted(self.bins):
+            seen += self.bins[key]
+            if rank < seen:
+                # Midpoint of the bin, in relative terms
+                return 2 * _GAMMA ** key / (_GAMMA + 1)
+        return 2 * _GAMMA ** max(self.bins) / (_GAMMA + 1)
+
+    def to_dict(self) -> dict:
+        # JSON object keys are strings
+        return {"zeros": self.zeros, "bins": {str(key): count for key, count in self.bins.items()}}
+
+    @classmethod
+    def from_dict(cls, data: Optional[dict]) -> "LatencySketch":
+        if not data:
+            return cls()
+        return cls({int(key): count for key, count in data.get("bins", {}).items()}, data.get("zeros", 0))
+
+
+def sketch_sql(column: str) -> Dict[str, str]:
+    """
+    SQL expressions that put a latency column into LatencySketch bins, for
+    rebuilding sketches from raw rows in the database: "bin" is the bin key
+    (NULL for zeros and missing latencies), "zero" is true for a zero.
+    """
+    return {
+        "bin": f"CASE WHEN {column} >= {_MIN_LATENCY} THEN ceil(ln({column}) / {_LOG_GAMMA!r})::int END",
+        "zero": f"{column} < {_MIN_LATENCY}",
+    }
+
+
+@dataclass
+class CheckAggregate:
+    """Counts and latency stats over a set of checks; what a rollup row holds."""
+    count: int = 0
+    failures: int = 0
+    latency_min: Optional[float] = None
+    latency_max: Optional[float] = None
+    latency_sum: float = 0.0
+    sketch: LatencySketch = field(default_factory=LatencySketch)
+
+    def add(self, success: bool, latency_ms: Optional[float]):
+        self.count += 1
+        self.failures += 0 if success else 1
+        if latency_ms is not None:
+            self.latency_min = latency_ms if self.latency_min is None else min(self.latency_min, latency_ms)
+            self.latency_max = latency_ms if self.latency_max is None else max(self.latency_max, latency_ms)
+            self.latency_sum += latency_ms
+            self.sketch.add(latency_ms)
+
+    def merge_row(self, row):
+        self.count += row.count
+        self.failures += row.failures
+        if row.latency_min is not None:
+            self.latency_min = row.latency_min if self.latency_min is None else min(self.latency_min, row.latency_min)
+        if row.latency_max is not None:
+            self.latency_max = row.latency_max if self.latency_max is None else max(self.latency_max, row.latency_max)
+        self.latency_sum += row.latency_sum or 0.0
+        self.sketch.merge(LatencySketch.from_dict(row.latency_sketch))
+
+    @property
+    def availability(self) -> Optional[float]:
+        return (self.count - self.failures) / self.count * 100.0 if self.count else None
+
+    @property
+    def latency_avg(self) -> Optional[float]:
+        return self.latency_sum / self.count if self.count else None
+
+
+def _as_utc(moment: datetime) -> datetime:
+    # SQLite hands back naive datetimes
+    return moment.replace(tzinfo=timezone.utc) if moment.tzinfo is None else moment.astimezone(timezone.utc)
+
+
+def bucket_start(moment: datetime, seconds: int) -> datetime:
+    offset = int((_as_utc(moment) - _EPOCH).total_seconds()) // seconds * seconds
+    return _EPOCH + timedelta(seconds=offset)
+
+
+def _insert(db: Session, model):
+    if db.bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(model.__table__)
+
+
+def apply_results(db: Session, results: Iterable, now: Optional[datetime] = None) -> None:
+    """
+    Folds check results (anything with endpoint_id, success, latency_ms and
+    checked_at) into the minute and hour rollups. Runs inside the caller's
+    transaction.
+
+    The prober's buffer and the Celery check tasks write concurrently, so the
+    read-modify-write is made safe first: empty rows are created for any missing
+    buckets (ON CONFLICT DO NOTHING, so two writers never collide on a new
+    bucket), then the rows are locked with SELECT ... FOR UPDATE before merging.
+    Keys are always taken in the same order, so writers queue instead of
+    deadlocking.
+    """
+    results = list(results)
+    if not results:
+        return
+    now = now or datetime.now(timezone.utc)
+    for seconds, model in RESOLUTIONS:
+        groups: Dict[tuple, CheckAggregate] = {}
+        for result in results:
+            key = (result.endpoint_id, bucket_start(result.checked_at or now, seconds))
+            groups.setdefault(key, CheckAggregate()).add(result.success, result.latency_ms)
+
+        keys = sorted(groups)
+        db.execute(_insert(db, model).values([
+            {"endpoint_id": endpoint_id, "bucket_start": bucket, "count": 0, "failures": 0, "latency_sum": 0.0}
+            for endpoint_id, bucket in keys
+        ]).on_conflict_do_nothing(index_elements=["endpoint_id", "bucket_start"]))
+
+        table = model.__table__
+        rows = db.execute(
+            select(table)
+            .where(tuple_(table.c.endpoint_id, table.c.bucket_start).in_(keys))
+            .order_by(table.c.endpoint_id, table.c.bucket_start)
+            .with_for_update()
+        )
+        updates = []
+        for row in rows:
+            aggregate = groups[(row.endpoint_id, _as_utc(row.bucket_start))]
+            aggregate.merge_row(row)
+            updates.append({
+                "b_endpoint_id": row.endpoint_id,
+                "b_bucket_start": row.bucket_start,
+                "count": aggregate.count,
+                "failures": aggregate.failures,
+                "latency_min": aggregate.latency_min,
+                "latency_max": aggregate.latency_max,
+                "latency_sum": aggregate.latency_sum,
+                "latency_sketch": aggregate.sketch.to_dict(),
+            })
+        db.execute(
+            update(table).where(
+                table.c.endpoint_id == bindparam("b_endpoint_id"),
+                table.c.bucket_start == bindparam("b_bucket_start"),
+            ),
+            updates,
+        )
+
+
+def minute_cutoff(now: Optional[datetime] = None) -> datetime:
+    """
+    Start of the first hour that still has minute rollups: minute rows are kept
+    for HEALTH_RESULTS_RETENTION_DAYS, like the raw results. Readers use hourly
+    rows for anything before it.
+    """
+    now = _as_utc(now or datetime.now(timezone.utc))
+    return _ceil(now - timedelta(days=settings.HEALTH_RESULTS_RETENTION_DAYS), 3600)
+
+
+def prune_minute_rollups(db: Session, cutoff: Optional[datetime] = None) -> int:
+    """
+    Deletes minute rollups older than cutoff (minute_cutoff() by default). Past
+    that, summaries only need whole hours, and the minute table would otherwise
+    grow by a row per endpoint per minute forever. Hourly rollups are kept.
+    """
+    deleted = (
+        db.query(HealthCheckRollupMinute)
+        .filter(HealthCheckRollupMinute.bucket_start < (cutoff or minute_cutoff()))
+        .delete(synchronize_session=False)
+    )
+    db.commit()
+    return deleted
+
+
+def _rows(db: Session, model, endpoint_ids: List[int], start: datetime, end: datetime):
+    if start >= end:
+        return []
+    return (
+        db.query(model)
+        .filter(model.endpoint_id.in_(endpoint_ids), model.bucket_start >= start, model.bucket_start < end)
+        .order_by(model.bucket_start)
+        .all()
+    )
+
+
+def _ceil(moment: datetime, seconds: int) -> datetime:
+    floor = bucket_start(moment, seconds)
+    return floor if floor == moment else floor + timedelta(seconds=seconds)
+
+
+def summarize(db: Session, endpoint_ids: List[int], start: datetime, end: datetime) -> CheckAggregate:
+    """
+    Aggregate over [start, end), to the minute, from the coarsest rollups that fit:
+    hourly rows for every whole hour in the window and minute rows only for the
+    ragged edges. Thirty days reads about 720 hourly rows per endpoint plus at most
+    118 minute rows, instead of every raw check. An edge older than minute_cutoff()
+    has no minute rows left, so it is widened to its whole hour.
+    """
+    start, end = bucket_start(start, 60), _ceil(_as_utc(end), 60)
+    cutoff = minute_cutoff()
+    if start < cutoff:
+        start = bucket_start(start, 3600)
+    if end <= cutoff:
+        end = _ceil(end, 3600)
+    aggregate = CheckAggregate()
+    first_hour, last_hour = _ceil(start, 3600), bucket_start(end, 3600)
+    if first_hour < last_hour:
+        rows = _rows(db, HealthCheckRollupHour, endpoint_ids, first_hour, last_hour)
+        rows += _rows(db, HealthCheckRollupMinute, endpoint_ids, start, first_hour)
+        rows += _rows(db, HealthCheckRollupMinute, endpoint_ids, last_hour, end)
+    else:
+        rows = _rows(db, HealthCheckRollupMinute, endpoint_ids, start, end)
+    for row in rows:
+        aggregate.merge_row(row)
+    return aggregate
+
+
+def pick_resolution(start: datetime, end: datetime, min_points: int = 24) -> int:
+    """
+    Coarsest resolution that still gives at least min_points buckets over the
+    window; hourly for windows reaching back past minute_cutoff(), whatever their length.
+    """
+    if _as_utc(start) < minute_cutoff():
+        return RESOLUTIONS[-1][0]
+    window = (_as_utc(end) - _as_utc(start)).total_seconds()
+    for seconds, _ in reversed(RESOLUTIONS):
+        if window / seconds >= min_points:
+            return seconds
+    return RESOLUTIONS[0][0]
+
+
+def series(db: Session, endpoint_ids: List[int], start: datetime, end: datetime, seconds: int) -> List[tuple]:
+    """
+    (bucket_start, CheckAggregate) per bucket at the given resolution, buckets with
+    no checks omitted. Finer buckets before minute_cutoff() no longer exist; that
+    part of the window comes back as hourly buckets.
+    """
+    model = dict(RESOLUTIONS)[seconds]
+    start, end = bucket_start(start, seconds), _as_utc(end)
+    rows = []
+    cutoff = minute_cutoff()
+    if model is not HealthCheckRollupHour and start < cutoff:
+        rows += _rows(db, HealthCheckRollupHour, endpoint_ids, bucket_start(start, 3600), min(end, cutoff))
+        start = cutoff
+    rows += _rows(db, model, endpoint_ids, start, end)
+    buckets: Dict[datetime, CheckAggregate] = {}
+    for row in rows:
+        buckets.setdefault(_as_utc(row.bucket_start), CheckAggregate()).merge_row(row)
+    return sorted(buckets.items())
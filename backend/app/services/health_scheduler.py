@@ -0,0 +1,98 @@
+import time
+from typing import Dict, Iterable, List, Optional
+
+from app.services.health_prober import ProbeTarget
+
+DUE_KEY = "hc:due:{shard}"
+
+
+def phase(endpoint_id: int) -> float:
+    """Fixed fraction in [0, 1) for an endpoint, spreading first checks over the interval."""
+    # Knuth's multiplicative hash; consecutive ids land far apart
+    return ((endpoint_id * 2654435761) % 2**32) / 2**32
+
+
+class CheckScheduler:
+    """
+    When each endpoint in a prober's shard is next due, as a Redis sorted set of
+    endpoint ids scored by due time, so a tick only touches the endpoints that are
+    actually due instead of the whole shard.
+
+    A new endpoint's first check is placed at a fixed offset (phase * interval)
+    from when it is first seen, and later checks follow every check_interval
+    seconds from there, so 10k endpoints on a 60s interval are spread over the
+    minute instead of all firing at :00. The set outlives prober restarts, so a
+    restart doesn't bunch them up again. One prober process per shard.
+    """
+    def __init__(self, redis_client, shard: int = 0, min_interval: int = 10):
+        self.redis = redis_client
+        self.key = DUE_KEY.format(shard=shard)
+        self.min_interval = min_interval
+        self.targets: Dict[int, ProbeTarget] = {}
+
+    def interval(self, target: ProbeTarget) -> int:
+        return max(target.check_interval or 60, self.min_interval)
+
+    def sync(self, targets: Iterable[ProbeTarget], now: Optional[float] = None):
+        """Brings the schedule in line with the shard's current active endpoints."""
+        now = time.time() if now is None else now
+        current = {target.endpoint_id: target for target in targets}
+        added, moved = {}, {}
+        for endpoint_id, target in current.items():
+            previous = self.targets.get(endpoint_id)
+            first_due = now + phase(endpoint_id) * self.interval(target)
+            if previous is None:
+                added[str(endpoint_id)] = first_due
+            elif self.interval(previous) != self.interval(target):
+                # Don't wait out the old interval (an hour, say) before the new one applies
+                moved[str(endpoint_id)] = first_due
+        removed = [str(endpoint_id) for endpoint_id in self.targets.keys() - current.keys()]
+
+        pipe = self.redis.pipeline(transaction=False)
+        if added:
+            # NX keeps the due times a previous run of this prober left behind
+            pipe.zadd(self.key, added, nx=True)
+        if moved:
+            pipe.zadd(self.key, moved)
+        if removed:
+            pipe.zrem(self.key, *removed)
+        pipe.execute()
+        self.targets = current
+
+    def pop_due(self, now: Optional[float] = None, limit: int = 5000) -> List[ProbeTarget]:
+        """Endpoints due by now; each one's next due time is moved one interval on."""
+        now = time.time() if now is None else now
+        due = self.redis.zrangebyscore(self.key, "-inf", now, start=0, num=limit, withscores=True)
+        if not due:
+            return []
+        targets = []
+        next_due = {}
+        stale = []
+        for member, due_at in due:
+            target = self.targets.get(int(member))
+            if target is None:
+                # Deleted or deactivated since the last sync
+                stale.append(member)
+                continue
+            interval = self.interval(target)
+            following = due_at + interval
+            if following <= now:
+                # Fell behind (prober was down); skip the missed checks but keep the offset
+                following += ((now - following) // interval + 1) * interval
+            next_due[member] = following
+            targets.append(target)
+
+        pipe = self.redis.pipeline(transaction=False)
+        if next_due:
+            pipe.zadd(self.key, next_due)
+        if stale:
+            pipe.zrem(self.key, *stale)
+        pipe.execute()
+        return targets
+
+    def next_due(self) -> Optional[float]:
+        first = self.redis.zrangebyscore(self.key, "-inf", "+inf", start=0, num=1, withscores=True)
+        return first[0][1] if first else None
+
+    def __len__(self):
+        return self.redis.zcard(self.key)
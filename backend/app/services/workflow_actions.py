@@ -0,0 +1,193 @@
+"""
+Handlers for workflow node types, looked up by a single dict access.
+
+A handler is keyed by node type ("conditionNode") or, for action nodes, by
+"actionNode:<actionType>" ("actionNode:http-request"). compile_plan resolves the
+handler for every node once, so running a step is a direct call. Handlers are
+process-wide singletons; anything expensive they need (HTTP pools, API clients)
+is created on first use and then shared by every run in the process.
+
+Adding an action type:
+
+    @register("actionNode:pagerduty-incident")
+    class PagerDutyIncidentHandler(ActionHandler):
+        def run(self, data, context):
+            ...
+            return None, {"incident_id": ...}
+"""
+import time
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from app.core.config import settings
+from app.services.workflow_expressions import compile_expression, render_template
+from app.services.workflow_http import HttpTransport, get_http_transport
+from app.services.workflow_resilience import RetryPolicy, call_with_retry, cap_timeout
+
+_HANDLERS: Dict[str, "ActionHandler"] = {}
+
+
+class ActionHandler:
+    """
+    Runs one kind of node. run() gets the node's data and the expression scope
+    and returns (result_handle, result): the branch to follow (None follows every
+    outgoing edge) and the step output. Raising marks the step failed.
+    """
+    key: str = ""
+
+    def run(self, data: dict, context: Mapping[str, Any]) -> Tuple[Optional[str], dict]:
+        raise NotImplementedError
+
+
+def register(key: str):
+    """Class decorator: registers one instance of the handler under key."""
+    def decorator(cls):
+        handler = cls()
+        handler.key = key
+        _HANDLERS[key] = handler
+        return cls
+    return decorator
+
+
+def handler_key(node: dict) -> str:
+    node_type = node.get("type", "unknown")
+    if node_type == "actionNode":
+        return f"actionNode:{(node.get('data') or {}).get('actionType', 'unknown')}"
+    return node_type
+
+
+def resolve_handler(node: dict) -> ActionHandler:
+    key = handler_key(node)
+    handler = _HANDLERS.get(key)
+    if handler is None:
+        # Unknown action types and legacy node types run as no-ops, as before
+        handler = _UNKNOWN_ACTION if key.startswith("actionNode:") else _UNKNOWN_NODE
+    return handler
+
+
+def _should_retry_http(response, error) -> bool:
+    # Network errors/timeouts and 5xx are transient; 4xx won't get better by retrying
+    return error is not None or response.status_code >= 500
+
+
+def _response_body(response):
+    # Bodies over the context cap are never parsed; the store would drop them anyway
+    if len(response.content) > settings.WORKFLOW_CONTEXT_MAX_BYTES:
+        return None
+    if "json" in response.headers.get("content-type", ""):
+        try:
+            return response.json()
+        except ValueError:
+            pass
+    return response.text or None
+
+
+def delay_seconds(data: dict) -> float:
+    return min(max(float(data.get("seconds") or 0), 0.0), settings.WORKFLOW_DELAY_MAX_SECONDS)
+
+
+@register("triggerNode")
+class TriggerHandler(ActionHandler):
+    def run(self, data, context):
+        print("     Trigger fired.")
+        return None, {}
+
+
+@register("conditionNode")
+class ConditionHandler(ActionHandler):
+    def run(self, data, context):
+        # 'condition' is either a static flag or an expression over upstream
+        # outputs, e.g. "status_code == 200" (see workflow_expressions)
+        condition_value = data.get("condition", True)
+
+        # Normalize to boolean
+        # A blank condition (a node whose field was cleared) is a static false, as before expressions
+        if isinstance(condition_value, str) and condition_value.strip().lower() in ("", "true", "false"):
+            condition_met = condition_value.strip().lower() == "true"
+        elif isinstance(condition_value, str):
+            # Compiled once per expression source, then served from cache
+            condition_met = bool(compile_expression(condition_value).evaluate(context))
+        else:
+            condition_met = bool(condition_value)
+
+        result_handle = "true" if condition_met else "false"
+        print(f"     Condition Outcome: {result_handle}")
+        return result_handle, {"result": condition_met}
+
+
+@register("delayNode")
+class DelayHandler(ActionHandler):
+    def run(self, data, context):
+        # Only reached when the run can't be parked (inside a map item)
+        seconds = delay_seconds(data)
+        if seconds > settings.WORKFLOW_DELAY_INLINE_MAX_SECONDS:
+            raise ValueError(f"Delays over {settings.WORKFLOW_DELAY_INLINE_MAX_SECONDS}s are not supported here")
+        time.sleep(seconds)
+        return None, {"delayed": seconds}
+
+
+@register("actionNode:http-request")
+class HttpRequestHandler(ActionHandler):
+    @property
+    def transport(self) -> HttpTransport:
+        # Pooled keep-alive client shared by every run in the process
+        return get_http_transport()
+
+    def run(self, data, context):
+        # url/body/headers may reference upstream outputs: "{{ steps.fetch.body.id }}"
+        url = render_template(data.get('url'), context)
+        method = data.get('method', 'GET')
+        body = render_template(data.get('body'), context)
+        headers = render_template(data.get('headers', {}), context)
+        timeout = data.get('timeout') or settings.WORKFLOW_HTTP_TIMEOUT
+
+        print(f"     Sending {method} Request to {url}")
+        if not url:
+            return None, {}
+        transport = self.transport
+        response = call_with_retry(
+            lambda: transport.request(method, url, json=body, headers=headers, timeout=cap_timeout(float(timeout))),
+            RetryPolicy.from_node(data),
+            _should_retry_http,
+        )
+        print(f"     Response Status: {response.status_code}")
+        return None, {"status_code": response.status_code, "body": _response_body(response)}
+
+
+@register("actionNode:slack-notification")
+class SlackNotificationHandler(ActionHandler):
+    @property
+    def transport(self) -> HttpTransport:
+        return get_http_transport()
+
+    def run(self, data, context):
+        webhook_url = render_template(data.get('webhook_url') or data.get('url'), context) # handle legacy keys
+        message = render_template(data.get('message', 'Default notification message'), context)
+        channel = render_template(data.get('channel'), context)
+
+        if not webhook_url:
+            print("     [Warn] No webhook_url for slack")
+            return None, {}
+        print(f"     Sending Slack Notification to {webhook_url}")
+        timeout = data.get('timeout') or 5.0
+        transport = self.transport
+        call_with_retry(
+            lambda: transport.post(webhook_url, json={"text": message, "channel": channel}, timeout=cap_timeout(float(timeout))),
+            RetryPolicy.from_node(data),
+            _should_retry_http,
+        )
+        return None, {"sent": True}
+
+
+@register("actionNode:noop")
+class NoopHandler(ActionHandler):
+    def __init__(self, message: Optional[str] = None):
+        self.message = message
+
+    def run(self, data, context):
+        if self.message:
+            print(f"     {self.message}")
+        return None, {}
+
+
+_UNKNOWN_ACTION = NoopHandler("No handler for this action type, skipping")
+_UNKNOWN_NODE = NoopHandler("Unknown step type") # Legacy check
@@ -0,0 +1,185 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+from collections.abc import Mapping
+from typing import Any, Optional
+
+SPILL_MARKER = "$spilled"  # Key of the placeholder stored in StepRun.result for spilled outputs
+
+
+class SpilledValue(Mapping):
+    """
+    Read-only view of a step output that lives outside worker memory.
+
+    The payload is only loaded when an expression or template actually looks
+    inside it, and is then kept for the lifetime of this view (one step's scope).
+    """
+    __slots__ = ("_store", "ref", "size", "_value")
+
+    def __init__(self, store: "StepContextStore", ref: str, size: int):
+        self._store = store
+        self.ref = ref
+        self.size = size
+        self._value = None
+
+    def load(self):
+        if self._value is None:
+            self._value = self._store._read(self.ref)
+        return self._value
+
+    def __getitem__(self, key):
+        value = self.load()
+        if not isinstance(value, Mapping):
+            raise KeyError(key)
+        return value[key]
+
+    def __iter__(self):
+        value = self.load()
+        return iter(value) if isinstance(value, Mapping) else iter(())
+
+    def __len__(self):
+        value = self.load()
+        return len(value) if isinstance(value, Mapping) else 0
+
+    def __repr__(self):
+        return f"SpilledValue({self.ref!r}, size={self.size})"
+
+
+class StepContextStore(Mapping):
+    """
+    Outputs of the steps of one run, by node id. This is the `steps` scope that
+    expressions and templates see.
+
+    Outputs up to inline_bytes (serialized as JSON) stay in memory. Bigger ones
+    are written to a per-run temp directory (backend "file") or to Redis with a
+    TTL (backend "redis", which survives a worker crash so a resumed run can still
+    read them) and are loaded on demand. Outputs over max_bytes are not kept at
+    all: only their top-level scalar fields survive, flagged with "truncated".
+    """
+    def __init__(
+        self,
+        run_key: str,
+        inline_bytes: int = 64 * 1024,
+        max_bytes: int = 10 * 1024 * 1024,
+        backend: str = "file",
+        redis_client=None,
+        ttl: int = 86400,
+    ):
+        self.run_key = run_key
+        self.inline_bytes = inline_bytes
+        self.max_bytes = max_bytes
+        self.backend = backend if backend != "redis" or redis_client is not None else "file"
+        self.redis = redis_client
+        self.ttl = ttl
+        self._values = {}
+        self._spilled = {}  # node_id -> (ref, size)
+        self._dir = None
+        self._lock = threading.Lock()
+
+    def put(self, node_id: str, value: Any) -> Any:
+        """
+        Stores a step output. Returns what should be checkpointed for it: the value
+        itself, or a small placeholder when the payload was spilled or dropped.
+        """
+        if value is None or not isinstance(value, (dict, list)):
+            self._values[node_id] = value
+            return value
+
+        payload = json.dumps(value, default=str)
+        size = len(payload)
+        if size <= self.inline_bytes:
+            self._values[node_id] = value
+            return value
+
+        if size > self.max_bytes:
+            print(f"     [Warn] Output of step {node_id} is {size} bytes, over the {self.max_bytes} byte cap; dropping it")
+            kept = _truncate(value, size)
+            self._values[node_id] = kept
+            return kept
+
+        ref = self._write(node_id, payload)
+        self._spilled[node_id] = (ref, size)
+        self._values.pop(node_id, None)
+        return {SPILL_MARKER: {"backend": self.backend, "ref": ref, "size": size}}
+
+    def restore(self, node_id: str, stored: Any):
+        """Re-registers a checkpointed output (see put) when a run is resumed."""
+        marker = stored.get(SPILL_MARKER) if isinstance(stored, dict) else None
+        if marker and marker.get("backend") == self.backend:
+            self._spilled[node_id] = (marker["ref"], marker["size"])
+        elif marker:
+            self._values[node_id] = None
+        else:
+            self._values[node_id] = stored
+
+    def __getitem__(self, node_id):
+        if node_id in self._spilled:
+            ref, size = self._spilled[node_id]
+            return SpilledValue(self, ref, size)
+        return self._values[node_id]
+
+    def __contains__(self, node_id):
+        return node_id in self._values or node_id in self._spilled
+
+    def __iter__(self):
+        yield from self._values
+        yield from self._spilled
+
+    def __len__(self):
+        return len(self._values) + len(self._spilled)
+
+    def close(self, keep_spilled: bool = False):
+        """
+        Drops spilled payloads once the run is over. keep_spilled leaves Redis
+        payloads for a later attempt of the same run (they expire after ttl);
+        file spills are local to this process and always go.
+        """
+        if self.backend == "redis" and self._spilled and not keep_spilled:
+            try:
+                self.redis.delete(*(ref for ref, _ in self._spilled.values()))
+            except Exception as e:
+                print(f"Failed to delete spilled step outputs: {e}")
+        if self._dir is not None:
+            shutil.rmtree(self._dir, ignore_errors=True)
+            self._dir = None
+        self._spilled.clear()
+        self._values.clear()
+
+    def _write(self, node_id: str, payload: str) -> str:
+        if self.backend == "redis":
+            key = f"wf:ctx:{self.run_key}:{node_id}"
+            self.redis.set(key, payload, ex=self.ttl)
+            return key
+
+        with self._lock:
+            if self._dir is None:
+                self._dir = tempfile.mkdtemp(prefix=f"wf-{self.run_key}-")
+        path = os.path.join(self._dir, f"{len(self._spilled)}.json")
+        with open(path, "w") as f:
+            f.write(payload)
+        return path
+
+    def _read(self, ref: str) -> Optional[Any]:
+        try:
+            if self.backend == "redis":
+                payload = self.redis.get(ref)
+            else:
+                with open(ref) as f:
+                    payload = f.read()
+        except Exception as e:
+            print(f"Failed to load spilled step output {ref}: {e}")
+            return None
+        return json.loads(payload) if payload is not None else None
+
+
+def _truncate(value, size):
+    # Keep the small fields (status_code, ...) so conditions on them still work
+    kept = {}
+    if isinstance(value, dict):
+        for key, item in value.items():
+            if item is None or isinstance(item, (int, float, bool)) or (isinstance(item, str) and len(item) <= 1024):
+                kept[key] = item
+    kept.update({"truncated": True, "size": size})
+    return kept
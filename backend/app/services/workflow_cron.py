@@ -0,0 +1,113 @@
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import FrozenSet
+
+_ALIASES = {
+    "@yearly": "0 0 1 1 *",
+    "@annually": "0 0 1 1 *",
+    "@monthly": "0 0 1 * *",
+    "@weekly": "0 0 * * 0",
+    "@daily": "0 0 * * *",
+    "@midnight": "0 0 * * *",
+    "@hourly": "0 * * * *",
+}
+
+_MONTH_NAMES = {name: i for i, name in enumerate(
+    ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"], start=1)}
+_DAY_NAMES = {name: i for i, name in enumerate(["sun", "mon", "tue", "wed", "thu", "fri", "sat"])}
+
+# (low, high, names) for minute, hour, day of month, month, day of week
+_FIELDS = ((0, 59, {}), (0, 23, {}), (1, 31, {}), (1, 12, _MONTH_NAMES), (0, 7, _DAY_NAMES))
+
+_MAX_LOOKAHEAD_DAYS = 366 * 5  # "0 0 30 2 *" never fires; stop looking eventually
+
+
+class CronError(ValueError):
+    pass
+
+
+def _parse_value(token: str, names: dict) -> int:
+    token = token.lower()
+    if token in names:
+        return names[token]
+    if not token.isdigit():
+        raise CronError(f"Invalid cron value '{token}'")
+    return int(token)
+
+
+def _parse_field(field: str, low: int, high: int, names: dict) -> FrozenSet[int]:
+    values = set()
+    for part in field.split(","):
+        step = 1
+        if "/" in part:
+            part, step_text = part.split("/", 1)
+            if not step_text.isdigit() or int(step_text) == 0:
+                raise CronError(f"Invalid cron step '{step_text}'")
+            step = int(step_text)
+        if part == "*":
+            start, end = low, high
+        elif "-" in part:
+            start_text, end_text = part.split("-", 1)
+            start, end = _parse_value(start_text, names), _parse_value(end_text, names)
+        else:
+            start = _parse_value(part, names)
+            end = high if step > 1 else start
+        if not low <= start <= end <= high:
+            raise CronError(f"Cron range '{part}' outside {low}-{high}")
+        values.update(range(start, end + 1, step))
+    return frozenset(values)
+
+
+class CronExpression:
+    """
+    Standard 5-field cron (minute hour day-of-month month day-of-week) in UTC,
+    with lists, ranges, steps, month/day names and the @daily style aliases.
+    As in cron, when both day fields are restricted a day matching either fires.
+    """
+    __slots__ = ("source", "minutes", "hours", "days", "months", "weekdays", "_any_day", "_any_weekday")
+
+    def __init__(self, source: str):
+        self.source = source
+        fields = _ALIASES.get(source.strip().lower(), source).split()
+        if len(fields) != 5:
+            raise CronError(f"Cron expression '{source}' must have 5 fields")
+        parsed = [_parse_field(field, low, high, names) for field, (low, high, names) in zip(fields, _FIELDS)]
+        self.minutes, self.hours, self.days, self.months, weekdays = parsed
+        self.weekdays = frozenset(day % 7 for day in weekdays)  # 7 is Sunday too
+        # Unrestricted means every value, however it is spelled ("*", "*/1", "1-31", "0-7")
+        self._any_day = self.days == frozenset(range(1, 32))
+        self._any_weekday = self.weekdays == frozenset(range(7))
+
+    def _day_matches(self, moment: datetime) -> bool:
+        day_ok = moment.day in self.days
+        weekday_ok = (moment.isoweekday() % 7) in self.weekdays
+        if self._any_day or self._any_weekday:
+            return day_ok and weekday_ok
+        return day_ok or weekday_ok
+
+    def next_after(self, moment: datetime) -> datetime:
+        """First matching minute strictly after moment (keeps moment's tzinfo)."""
+        current = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = moment + timedelta(days=_MAX_LOOKAHEAD_DAYS)
+        # Jump field by field instead of stepping minute by minute
+        while current <= limit:
+            if current.month not in self.months:
+                year, month = (current.year + 1, 1) if current.month == 12 else (current.year, current.month + 1)
+                current = current.replace(year=year, month=month, day=1, hour=0, minute=0)
+                continue
+            if not self._day_matches(current):
+                current = (current + timedelta(days=1)).replace(hour=0, minute=0)
+                continue
+            if current.hour not in self.hours:
+                current = (current + timedelta(hours=1)).replace(minute=0)
+                continue
+            if current.minute not in self.minutes:
+                current += timedelta(minutes=1)
+                continue
+            return current
+        raise CronError(f"Cron expression '{self.source}' never fires")
+
+
+@lru_cache(maxsize=4096)
+def parse_cron(source: str) -> CronExpression:
+    return CronExpression(source)
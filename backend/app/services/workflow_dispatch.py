@@ -0,0 +1,288 @@
+import json
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, List, Optional, Tuple
+
+from redis.exceptions import LockError
+
+from app.core.config import settings
+
+# Relative share of dispatch slots per billing plan (User.plan)
+PLAN_WEIGHTS = {"free": 1.0, "hobby": 1.0, "startup": 2.0, "enterprise": 4.0}
+
+PENDING_KEY = "wf:pending:{owner_id}"  # List of queued runs per owner (FIFO)
+ACTIVE_OWNERS_KEY = "wf:owners"  # Owners with something pending
+WEIGHTS_KEY = "wf:weights"  # owner_id -> weight
+DEFICIT_KEY = "wf:deficit"  # owner_id -> unused dispatch credit
+RUNNING_OWNER_KEY = "wf:running:owner:{owner_id}"  # ZSET run_id -> lease expiry
+RUNNING_WORKFLOW_KEY = "wf:running:workflow:{workflow_id}"
+LOCK_KEY = "wf:dispatch:lock"
+
+# Queued runs read per owner beyond its free slots, to get past ones whose workflow is at its cap
+LOOKAHEAD = 20
+
+
+@dataclass
+class _OwnerQueue:
+    """An owner's dispatch state, read once per pass and then updated in memory."""
+    weight: float
+    deficit: float
+    running: int
+    queued: int
+    candidates: list = field(default_factory=list)  # [(raw, entry)] from the head of the queue
+
+
+class WorkflowDispatcher:
+    """
+    Weighted-fair admission in front of execute_workflow_task.
+
+    Runs are queued per owner in Redis instead of going straight to the Celery
+    queue. dispatch() walks the owners with deficit round robin: each pass gives an
+    owner credit equal to its weight, and one credit buys one run. A run is only
+    sent while its owner and its workflow are under their concurrency caps, so a
+    tenant that queues thousands of runs is throttled to its cap and everyone
+    else's runs keep going out on the next pass.
+
+    Running slots are ZSET members scored by lease expiry, so a slot held by a
+    worker that died without calling release() frees itself after the lease.
+    """
+    def __init__(
+        self,
+        redis_client,
+        send: Callable[[List[Tuple[int, int, int]]], None],
+        max_per_owner: int = 10,
+        max_per_workflow: int = 5,
+        lease_seconds: int = 3600,
+    ):
+        self.redis = redis_client
+        self.send = send  # Receives [(workflow_id, run_id, owner_id), ...]
+        self.max_per_owner = max_per_owner
+        self.max_per_workflow = max_per_workflow
+        self.lease_seconds = lease_seconds
+
+    def enqueue(self, owner_id: int, runs: Iterable[Tuple[int, int]], plan: Optional[str] = None):
+        """Queues (workflow_id, run_id) pairs for an owner in one round trip."""
+        entries = [json.dumps({"workflow_id": workflow_id, "run_id": run_id}) for workflow_id, run_id in runs]
+        if not entries:
+            return
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.rpush(PENDING_KEY.format(owner_id=owner_id), *entries)
+        pipe.sadd(ACTIVE_OWNERS_KEY, owner_id)
+        pipe.hset(WEIGHTS_KEY, owner_id, PLAN_WEIGHTS.get(plan or "free", 1.0))
+        pipe.execute()
+
+    def release(self, owner_id: int, workflow_id: int, run_id: int):
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.zrem(RUNNING_OWNER_KEY.format(owner_id=owner_id), run_id)
+        pipe.zrem(RUNNING_WORKFLOW_KEY.format(workflow_id=workflow_id), run_id)
+        pipe.execute()
+
+    @contextmanager
+    def _locked(self):
+        # One dispatcher at a time keeps check-then-acquire on the slot sets race free.
+        # redis-py's Lock releases with a compare-and-delete script, so a pass that
+        # outlived the lease can't delete the lock another dispatcher has taken since.
+        lock = self.redis.lock(LOCK_KEY, timeout=30, blocking=False)
+        acquired = lock.acquire(blocking=False)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                try:
+                    lock.release()
+                except LockError:
+                    print("[Dispatch] Lock lease ran out during a dispatch pass")
+
+    def try_acquire(self, owner_id: int, workflow_id: int, run_id: int) -> bool:
+        """
+        Takes a running slot for a run started outside dispatch() (inline webhook
+        runs), if its owner and workflow are under their caps; release() frees it.
+        False, and nothing taken, when they are at their caps or a dispatch pass
+        holds the lock: the caller queues the run instead.
+        """
+        with self._locked() as acquired:
+            if not acquired:
+                return False
+            now = time.time()
+            owner_slots = RUNNING_OWNER_KEY.format(owner_id=owner_id)
+            workflow_slots = RUNNING_WORKFLOW_KEY.format(workflow_id=workflow_id)
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.zremrangebyscore(owner_slots, "-inf", now)
+            pipe.zremrangebyscore(workflow_slots, "-inf", now)
+            pipe.zcard(owner_slots)
+            pipe.zcard(workflow_slots)
+            _, _, owner_running, workflow_running = pipe.execute()
+            if owner_running >= self.max_per_owner or workflow_running >= self.max_per_workflow:
+                return False
+            expires = now + self.lease_seconds
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.zadd(owner_slots, {run_id: expires})
+            pipe.zadd(workflow_slots, {run_id: expires})
+            pipe.execute()
+            return True
+
+    def dispatch(self, limit: int = 500) -> int:
+        """Sends up to `limit` runs that fit under the caps. Returns how many were sent."""
+        with self._locked() as acquired:
+            if not acquired:
+                return 0
+            batch = self._select(limit)
+
+        if batch:
+            try:
+                self.send(batch)
+            except Exception as e:
+                # Broker down: put the runs back where they were and free their
+                # slots, the next dispatch pass tries again
+                print(f"[Dispatch] Failed to send {len(batch)} runs, requeued: {e}")
+                self._requeue(batch)
+                return 0
+        return len(batch)
+
+    def _requeue(self, batch: List[Tuple[int, int, int]]):
+        pipe = self.redis.pipeline(transaction=False)
+        # LPUSH in reverse keeps each owner's runs in their original order at the head
+        for workflow_id, run_id, owner_id in reversed(batch):
+            pipe.lpush(PENDING_KEY.format(owner_id=owner_id), json.dumps({"workflow_id": workflow_id, "run_id": run_id}))
+            pipe.sadd(ACTIVE_OWNERS_KEY, owner_id)
+            pipe.zrem(RUNNING_OWNER_KEY.format(owner_id=owner_id), run_id)
+            pipe.zrem(RUNNING_WORKFLOW_KEY.format(workflow_id=workflow_id), run_id)
+        pipe.execute()
+
+    def _select(self, limit: int) -> List[Tuple[int, int, int]]:
+        # A fixed handful of round trips per pass instead of several per run, since
+        # all of it happens under the lock: one pipeline reads every owner's state
+        # and the head of its queue, one reads the running counts of the workflows
+        # found there, the round robin runs in memory, and one pipeline dequeues
+        # and leases what it picked.
+        now = time.time()
+        owners = sorted(int(_decode(owner)) for owner in self.redis.smembers(ACTIVE_OWNERS_KEY))
+        if not owners:
+            return []
+
+        pipe = self.redis.pipeline(transaction=False)
+        for owner_id in owners:
+            owner_slots = RUNNING_OWNER_KEY.format(owner_id=owner_id)
+            pending_key = PENDING_KEY.format(owner_id=owner_id)
+            pipe.hget(WEIGHTS_KEY, owner_id)
+            pipe.hget(DEFICIT_KEY, owner_id)
+            pipe.zremrangebyscore(owner_slots, "-inf", now)
+            pipe.zcard(owner_slots)
+            pipe.llen(pending_key)
+            pipe.lrange(pending_key, 0, self.max_per_owner + LOOKAHEAD - 1)
+        replies = pipe.execute()
+        queues = {}
+        for i, owner_id in enumerate(owners):
+            weight, deficit, _, running, queued, head = replies[i * 6:(i + 1) * 6]
+            queues[owner_id] = _OwnerQueue(
+                weight=float(_decode(weight) or 1.0),
+                deficit=float(_decode(deficit) or 0.0),
+                running=running,
+                queued=queued,
+                candidates=[(raw, json.loads(_decode(raw))) for raw in head],
+            )
+
+        workflow_ids = sorted({entry["workflow_id"] for queue in queues.values() for _, entry in queue.candidates})
+        workflow_running = {}
+        if workflow_ids:
+            pipe = self.redis.pipeline(transaction=False)
+            for workflow_id in workflow_ids:
+                workflow_slots = RUNNING_WORKFLOW_KEY.format(workflow_id=workflow_id)
+                pipe.zremrangebyscore(workflow_slots, "-inf", now)
+                pipe.zcard(workflow_slots)
+            workflow_running = dict(zip(workflow_ids, pipe.execute()[1::2]))
+
+        batch = []
+        picked = []  # (owner_id, raw, entry)
+        active = list(owners)
+        progress = True
+        while active and progress and len(batch) < limit:
+            progress = False
+            for owner_id in list(active):
+                queue = queues[owner_id]
+                deficit = queue.deficit + queue.weight
+                while deficit >= 1 and len(batch) < limit:
+                    runnable = self._next_runnable(queue, workflow_running)
+                    if runnable is None:
+                        break
+                    raw, entry = runnable
+                    batch.append((entry["workflow_id"], entry["run_id"], owner_id))
+                    picked.append((owner_id, raw, entry))
+                    deficit -= 1
+                    progress = True
+
+                if not queue.queued:
+                    active.remove(owner_id)
+                else:
+                    # Don't let a capped owner bank credit for a burst later
+                    queue.deficit = min(deficit, queue.weight)
+
+        expires = now + self.lease_seconds
+        emptied = [owner_id for owner_id in owners if not queues[owner_id].queued]
+        pipe = self.redis.pipeline(transaction=False)
+        for owner_id, raw, entry in picked:
+            pipe.lrem(PENDING_KEY.format(owner_id=owner_id), 1, raw)
+            pipe.zadd(RUNNING_OWNER_KEY.format(owner_id=owner_id), {entry["run_id"]: expires})
+            pipe.zadd(RUNNING_WORKFLOW_KEY.format(workflow_id=entry["workflow_id"]), {entry["run_id"]: expires})
+        for owner_id in owners:
+            if queues[owner_id].queued:
+                pipe.hset(DEFICIT_KEY, owner_id, queues[owner_id].deficit)
+        # Emptied queues are read back, enqueue() may have added to them meanwhile
+        for owner_id in emptied:
+            pipe.llen(PENDING_KEY.format(owner_id=owner_id))
+        replies = pipe.execute()
+
+        drained = [owner_id for owner_id, length in zip(emptied, replies[len(replies) - len(emptied):]) if not length]
+        if drained:
+            pipe = self.redis.pipeline(transaction=False)
+            for owner_id in drained:
+                pipe.srem(ACTIVE_OWNERS_KEY, owner_id)
+                pipe.hdel(DEFICIT_KEY, owner_id)
+            pipe.execute()
+        return batch
+
+    def _next_runnable(self, queue: _OwnerQueue, workflow_running: dict) -> Optional[Tuple[bytes, dict]]:
+        if queue.running >= self.max_per_owner:
+            return None
+        # Skip past runs whose workflow is at its own cap, they keep their place in the queue
+        for index, (raw, entry) in enumerate(queue.candidates):
+            workflow_id = entry["workflow_id"]
+            if workflow_running.get(workflow_id, 0) >= self.max_per_workflow:
+                continue
+            del queue.candidates[index]
+            queue.running += 1
+            queue.queued -= 1
+            workflow_running[workflow_id] = workflow_running.get(workflow_id, 0) + 1
+            return raw, entry
+        return None
+
+
+def _decode(value):
+    return value.decode() if isinstance(value, bytes) else value
+
+
+_dispatcher = None
+
+
+def get_dispatcher() -> WorkflowDispatcher:
+    global _dispatcher
+    if _dispatcher is None:
+        import redis
+        from celery import group
+        from app.worker.tasks import execute_workflow_task
+
+        def send(batch):
+            group(
+                execute_workflow_task.s(workflow_id, run_id, owner_id)
+                for workflow_id, run_id, owner_id in batch
+            ).apply_async()
+
+        _dispatcher = WorkflowDispatcher(
+            redis.from_url(settings.REDIS_URL),
+            send,
+            max_per_owner=settings.WORKFLOW_MAX_RUNS_PER_OWNER,
+            max_per_workflow=settings.WORKFLOW_MAX_RUNS_PER_WORKFLOW,
+            lease_seconds=settings.WORKFLOW_RUN_LEASE_SECONDS,
+        )
+    return _dispatcher
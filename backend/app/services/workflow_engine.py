@@ -1,117 +1,451 @@
+import contextvars
 import time
-import httpx
+import uuid
 import redis
-import json
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime, timezone
+from typing import NamedTuple, Optional
 from sqlalchemy.orm import Session
-from app.domain.workflow.models import Workflow
+from app.domain.workflow.models import Workflow, WorkflowRunStatus, WorkflowVersion
 from app.core.config import settings
+from app.repositories.workflow_run_repo import WorkflowRunRepository, FINISHED_STATUSES
+from app.services.workflow_context import SpilledValue, StepContextStore
+from app.services.workflow_events import EventBatcher
+from app.services.workflow_actions import ActionHandler, delay_seconds, resolve_handler
+from app.services.workflow_expressions import compile_expression
+from app.services.workflow_plan import CompiledPlan, PlanCache, compile_plan, plan_from_dict
+from app.services.workflow_resilience import StepDeadlineExceeded, step_deadline
+from app.services.workflow_timers import RunTimers
+
+# Potentially large result fields that stay in the run's context store; events
+# only carry the small ones
+_EVENT_OMITTED_FIELDS = ("body", "results")
+
+# Event verbosity of the run executing on this thread. Runs of the same workflow
+# may overlap (inline webhook runs, pool workers), so it is scoped to the run, and
+# step threads get a copy of the run's context when they are submitted.
+_run_verbosity: contextvars.ContextVar = contextvars.ContextVar("workflow_run_verbosity", default=None)
+
+def _event_result(result):
+    if isinstance(result, dict) and any(field in result for field in _EVENT_OMITTED_FIELDS):
+        return {key: value for key, value in result.items() if key not in _EVENT_OMITTED_FIELDS}
+    return result
+
+class WorkflowBudgetExceeded(Exception):
+    """The run hit its deadline; finished steps are checkpointed and the rest can resume elsewhere."""
+
+class WorkflowSuspended(Exception):
+    """Every remaining branch waits on a delay node; the run can be parked until resume_at."""
+    def __init__(self, resume_at: float, node_ids):
+        super().__init__(f"Waiting on {', '.join(node_ids)} until {resume_at}")
+        self.resume_at = resume_at
+        self.node_ids = node_ids
+
+class StepOutcome(NamedTuple):
+    handle: Optional[str]  # Branch to follow; None follows every outgoing edge
+    status: str = "success"
+    result: Optional[dict] = None
+    error: Optional[str] = None
 
 class WorkflowEngine:
     def __init__(self):
         # Initialize Redis client for publishing events
         # We use a sync client here because Celery tasks are typically sync
         self.redis = redis.from_url(settings.REDIS_URL)
+        # Compiled graphs, keyed by (workflow_id, version). The engine lives for the
+        # whole worker process, so this is effectively a per-process cache.
+        self.plans = PlanCache(maxsize=settings.WORKFLOW_PLAN_CACHE_SIZE)
+        self.events = EventBatcher(
+            self.redis,
+            batch_size=settings.WORKFLOW_EVENT_BATCH_SIZE,
+            flush_interval=settings.WORKFLOW_EVENT_FLUSH_INTERVAL,
+        )
+        self.runs = WorkflowRunRepository()
+        self.timers = RunTimers(self.redis)
 
     def _emit_event(self, event_type: str, workflow_id: int, payload: dict = None):
-        """Publishes an event to the Redis 'events' channel"""
+        """Queues an event for the Redis 'events' channel, honouring the run's verbosity"""
+        verbosity = _run_verbosity.get() or settings.WORKFLOW_EVENT_VERBOSITY
+        if not EventBatcher.allows(verbosity, event_type):
+            return
+
         message = {
             "type": event_type,
             "workflow_id": workflow_id,
             "timestamp": time.time(),
             **(payload or {})
         }
-        try:
-            # The SocketManager expects {type: "message", data: JSON_STRING} from Redis
-            # Wait, looking at socket_manager.py:
-            # if message["type"] == "message":
-            #    data = json.loads(message["data"])
-            #    await self.broadcast_local(data)
-            # So we just need to publish the JSON string to the channel.
-            self.redis.publish("events", json.dumps(message))
-        except Exception as e:
-            print(f"Failed to emit event {event_type}: {e}")
+        # The SocketManager json.loads each message on the channel and broadcasts it,
+        # so every event is still published as its own JSON string, just pipelined.
+        self.events.emit(message)
+
+    def execute_workflow(self, db: Session, workflow_id: int, max_concurrency: int = None, verbosity: str = None, run_id: int = None, deadline: float = None):
+        """
+        Runs a workflow graph. Nodes whose predecessors have finished are dispatched
+        together on a bounded thread pool, so independent branches overlap instead of
+        running back to back. max_concurrency caps the number of in-flight steps for
+        this run (falls back to the graph's 'max_concurrency', then the global setting).
+        verbosity ('full', 'summary' or 'final') controls which events are published.
+
+        When run_id is given, every finished step is checkpointed to the WorkflowRun,
+        and calling this again for the same run resumes after the last completed node
+        instead of repeating side effects.
+
+        deadline (a time.monotonic() value) stops scheduling new steps once passed:
+        steps in flight finish and are checkpointed, then WorkflowBudgetExceeded is
+        raised with the run left unfinished, ready to be resumed by a worker. Step
+        network timeouts (and retries) are capped at the time left, so a slow call
+        can't hold the run far past it; such a step runs again on resume.
 
-    def execute_workflow(self, db: Session, workflow_id: int):
-        workflow = db.query(Workflow).filter(Workflow.id == workflow_id).first()
+        Delay nodes park the run: once nothing else can progress it is marked
+        waiting and put on the resume timers, and this call returns, freeing the
+        worker. resume_waiting_runs picks it up again when the delay is over.
+        """
+        # Only fetch the cheap columns; the graph JSON is loaded on a plan cache miss
+        workflow = db.query(Workflow.id, Workflow.name, Workflow.current_version_id, Workflow.updated_at).filter(Workflow.id == workflow_id).first()
         if not workflow:
             print(f"Workflow {workflow_id} not found.")
             return
 
-        print(f"Starting execution of workflow: {workflow.name}")
-        self._emit_event("workflow_start", workflow_id, {"name": workflow.name})
-        
+        run = None
+        completed = {}
+        if run_id is not None:
+            run = self.runs.get(db, run_id)
+            if not run:
+                print(f"Workflow run {run_id} not found.")
+                return
+            if run.status in FINISHED_STATUSES:
+                # Re-delivered task for a run that already finished
+                print(f"Workflow run {run_id} already {run.status}, skipping.")
+                return
+            completed = self.runs.get_completed_steps(db, run_id)
+            self.runs.mark_running(db, run)
+            # Delay nodes checkpointed as waiting by an earlier attempt get finished in place
+            waiting = {node_id for node_id, step in completed.items() if step.status == "waiting"}
+            if completed:
+                print(f"Resuming run {run_id} after {len(completed)} completed steps")
+
+        # A run executes the version it was created with, even if the workflow has
+        # been edited since or this is a retry/resume
+        version_id = run.version_id if run and run.version_id else workflow.current_version_id
+        plan = self.get_plan(db, workflow_id, version_id, workflow.updated_at)
+        verbosity_token = _run_verbosity.set(verbosity or plan.event_verbosity or settings.WORKFLOW_EVENT_VERBOSITY)
+
+        try:
+            print(f"Starting execution of workflow: {workflow.name}")
+            self._emit_event("workflow_start", workflow_id, {"name": workflow.name, "run_id": run_id})
+
+            if not plan.start_node_id:
+                 print("No start node found.")
+                 self._emit_event("workflow_finish", workflow_id, {"status": "error", "message": "No start node", "run_id": run_id})
+                 if run:
+                     self.runs.finish(db, run, WorkflowRunStatus.failed.value, "No start node")
+                 return
+
+            if max_concurrency is None:
+                max_concurrency = plan.max_concurrency or settings.WORKFLOW_MAX_CONCURRENCY
+            max_concurrency = max(1, int(max_concurrency))
+
+            checkpoint = None
+            if run:
+                def checkpoint(node_id, index, outcome, started_at, finished_at):
+                    if node_id in waiting:
+                        self.runs.complete_step(
+                            db, run.id, node_id, outcome.status,
+                            result_handle=outcome.handle,
+                            result=outcome.result,
+                            error=outcome.error,
+                            finished_at=finished_at,
+                        )
+                        return
+                    self.runs.add_step(
+                        db, run.id, node_id, index, outcome.status,
+                        result_handle=outcome.handle,
+                        result=outcome.result,
+                        error=outcome.error,
+                        started_at=started_at,
+                        finished_at=finished_at,
+                    )
+
+            run_input = run.input if run else None
+            # Steps see the deadline too, so their network timeouts stop at it
+            with step_deadline(deadline):
+                self._run_plan(plan, workflow_id, max_concurrency, completed=completed, checkpoint=checkpoint, run_input=run_input, run_id=run_id, deadline=deadline)
+
+            if run:
+                self.runs.finish(db, run, WorkflowRunStatus.succeeded.value)
+            print(f"Workflow {workflow.name} completed successfully.")
+            self._emit_event("workflow_finish", workflow_id, {"status": "success", "run_id": run_id})
+        except WorkflowSuspended as e:
+            # Nothing is held while waiting: the task returns and the timer brings the run back
+            print(f"Workflow {workflow.name} waiting until {datetime.fromtimestamp(e.resume_at, timezone.utc)}")
+            self.runs.mark_waiting(db, run, datetime.fromtimestamp(e.resume_at, timezone.utc))
+            self.timers.schedule(run.id, e.resume_at)
+            self._emit_event("workflow_waiting", workflow_id, {"run_id": run_id, "resume_at": e.resume_at, "nodes": e.node_ids})
+        except WorkflowBudgetExceeded:
+            print(f"Workflow {workflow.name} ran over its time budget, handing off")
+            raise
+        except Exception as e:
+            if run:
+                db.rollback()
+                self.runs.finish(db, run, WorkflowRunStatus.failed.value, str(e))
+            self._emit_event("workflow_finish", workflow_id, {"status": "error", "message": str(e), "run_id": run_id})
+            raise
+        finally:
+            # Always push out whatever is still buffered when the run ends
+            self.events.flush()
+            _run_verbosity.reset(verbosity_token)
+
+    def get_plan(self, db: Session, workflow_id: int, version_id: Optional[int] = None, updated_at=None) -> CompiledPlan:
+        if version_id is not None:
+            # A version never changes, so its plan is cached until evicted by the LRU
+            return self.plans.get_or_compile((workflow_id, ("version", version_id)), lambda: self._compile_version(db, workflow_id, version_id))
+        # Workflows without versions (written directly to the DB): keyed by updated_at
+        return self.plans.get_or_compile((workflow_id, updated_at), lambda: self._compile(db, workflow_id))
+
+    def _compile_version(self, db: Session, workflow_id: int, version_id: int) -> CompiledPlan:
+        # Saved through the API: the plan was already built and validated
+        row = db.query(WorkflowVersion.compiled_graph).filter(WorkflowVersion.id == version_id).first()
+        if row and row.compiled_graph:
+            return plan_from_dict(workflow_id, row.compiled_graph)
+        row = db.query(WorkflowVersion.steps).filter(WorkflowVersion.id == version_id).first()
+        steps = row.steps if row else None
+        graph_data = steps[0] if steps and len(steps) > 0 else {}
+        return compile_plan(workflow_id, graph_data)
+
+    def _compile(self, db: Session, workflow_id: int) -> CompiledPlan:
+        row = db.query(Workflow.steps).filter(Workflow.id == workflow_id).first()
+        steps = row.steps if row else None
         # steps[0] contains { "nodes": [...], "edges": [...] }
-        graph_data = workflow.steps[0] if workflow.steps and len(workflow.steps) > 0 else {}
-        nodes = {node['id']: node for node in graph_data.get('nodes', [])}
-        edges = graph_data.get('edges', [])
-        
-        # Build Adjacency List: source_id -> [(target_id, source_handle)]
-        adjacency_list = {}
-        for edge in edges:
-            source = edge['source']
-            target = edge['target']
-            source_handle = edge.get('sourceHandle') # Important for ConditionNode (true/false)
-            
-            if source not in adjacency_list:
-                adjacency_list[source] = []
-            adjacency_list[source].append((target, source_handle))
-
-        # Find Start Node (TriggerNode)
-        start_node_id = None
-        for node_id, node in nodes.items():
-            if node.get('type') == 'triggerNode':
-                start_node_id = node_id
-                break
-        
-        if not start_node_id and nodes:
-            # Fallback for legacy data: pick first node
-            start_node_id = list(nodes.keys())[0]
-
-        if not start_node_id:
-             print("No start node found.")
-             self._emit_event("workflow_finish", workflow_id, {"status": "error", "message": "No start node"})
-             return
-
-        # Execution Queue: [(node_id, incoming_handle)]
-        queue = [start_node_id]
-        visited = set() # Avoid cycles for now, though loops might be valid later
-        
-        step_index = 0
-        while queue:
-            current_id = queue.pop(0)
-            
-            # Skip if already visited implies simpler DAG. 
-            # Real engine needs sophisticated state management for loops/joins.
-            # Allowing re-visit for now if logic demands, but let's stick to DAG.
-            # Actually, condition branches merge back. Visited check per-path is complex.
-            # Simplified: Execute node.
-            
-            node = nodes.get(current_id)
-            if not node: continue
-            
-            print(f"Processing Node {current_id}")
-            result_handle = self._execute_step(node, workflow_id, step_index)
-            step_index += 1
-            
-            # Find next nodes based on result_handle
-            # If result_handle is None, we follow all edges (normal path)
-            # If result_handle is "true", we follow "sourceHandle" == "true"
-            
-            if current_id in adjacency_list:
-                for target_id, source_handle in adjacency_list[current_id]:
-                    # Condition Logic:
-                    if result_handle:
-                        # Only follow edge if handle matches
-                        if source_handle == result_handle:
-                             queue.append(target_id)
-                    else:
-                        # Follow all edges (default behavior)
-                        queue.append(target_id)
-                        
-        print(f"Workflow {workflow.name} completed successfully.")
-        self._emit_event("workflow_finish", workflow_id, {"status": "success"})
-
-    def _execute_step(self, step, workflow_id, index):
+        graph_data = steps[0] if steps and len(steps) > 0 else {}
+        return compile_plan(workflow_id, graph_data)
+
+    def _new_context_store(self, run_key) -> StepContextStore:
+        return StepContextStore(
+            str(run_key),
+            inline_bytes=settings.WORKFLOW_CONTEXT_INLINE_BYTES,
+            max_bytes=settings.WORKFLOW_CONTEXT_MAX_BYTES,
+            backend=settings.WORKFLOW_CONTEXT_SPILL,
+            redis_client=self.redis,
+            ttl=settings.WORKFLOW_CONTEXT_TTL,
+        )
+
+    def _run_plan(self, plan: CompiledPlan, workflow_id: int, max_concurrency: int, completed: dict = None, checkpoint=None, run_input: dict = None, run_id: int = None, outputs: StepContextStore = None, extra_scope: dict = None, deadline: float = None):
+        """
+        Schedules the plan. completed maps node ids to StepRun checkpoints from an
+        earlier attempt: those nodes are replayed from their stored branch instead of
+        being executed. checkpoint(node_id, index, outcome, started_at, finished_at)
+        is called on this thread (the one owning the DB session) after each step.
+        run_input is exposed to expressions as `input`; step outputs as `steps`,
+        through a StepContextStore that keeps large payloads out of memory. Pass
+        outputs to keep them after the plan finishes (the caller closes the store),
+        and extra_scope for additional names (map items). Past deadline no new steps
+        are started and WorkflowBudgetExceeded is raised once in-flight ones finish;
+        steps whose calls the deadline cut short aren't checkpointed and count as
+        not finished.
+
+        With a checkpoint and run_id a delay node is checkpointed as waiting instead
+        of sleeping; the branch behind it stops there and, when nothing else is
+        left, WorkflowSuspended is raised with the earliest resume time. Without
+        them (map items) the delay is waited out on the step's thread.
+        """
+        # A node runs once, after every incoming edge is resolved, if at least one
+        # of them was taken. If all of them were skipped the node is skipped too.
+        completed = completed or {}
+        step_index = max((step.step_index for step in completed.values()), default=-1) + 1
+        waiting = {node_id: step.result["resume_at"] for node_id, step in completed.items() if step.status == "waiting"}
+        completed = {node_id: step for node_id, step in completed.items() if step.status != "waiting"}
+        can_park = checkpoint is not None and run_id is not None
+        parked = {}  # node_id -> resume_at (epoch seconds)
+        pending_inputs = dict(plan.join_counts)
+        activated = set()
+        # Step outputs visible to expressions, and which node triggered each node
+        owns_outputs = outputs is None
+        if owns_outputs:
+            outputs = self._new_context_store(run_id if run_id is not None else f"{workflow_id}-{uuid.uuid4().hex}")
+        for node_id, step in completed.items():
+            outputs.restore(node_id, step.result)
+        triggered_by = {}
+        ready = deque([plan.start_node_id])
+        in_flight = {}  # future -> (node_id, index, started_at)
+
+        def resolve_edges(source_id, result_handle, skipped=False):
+            # Iterative so long skipped chains don't hit the recursion limit
+            stack = [(source_id, result_handle, skipped)]
+            while stack:
+                current_id, handle, is_skipped = stack.pop()
+                for source_handle, targets in plan.successors.get(current_id, ()):
+                    # If result_handle is None, we follow all edges (normal path)
+                    # If result_handle is "true", we follow "sourceHandle" == "true"
+                    taken = not is_skipped and (handle is None or source_handle == handle)
+                    for target_id in targets:
+                        if taken:
+                            activated.add(target_id)
+                            triggered_by[target_id] = current_id
+                        pending_inputs[target_id] -= 1
+                        if pending_inputs[target_id] == 0:
+                            if target_id in activated:
+                                ready.append(target_id)
+                            else:
+                                print(f"Skipping Node {target_id} (no active inputs)")
+                                stack.append((target_id, None, True))
+
+        cut_short = []  # Steps the deadline stopped mid-call
+        suspended = False
+        try:
+            with ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix=f"wf-{workflow_id}") as pool:
+                while ready or in_flight:
+                    # Fill the pool up to the per-workflow limit
+                    while ready and len(in_flight) < max_concurrency:
+                        if deadline is not None and time.monotonic() > deadline:
+                            break
+                        current_id = ready.popleft()
+                        if current_id in completed:
+                            # Finished before a crash/redelivery: follow the recorded branch
+                            resolve_edges(current_id, completed[current_id].result_handle)
+                            continue
+
+                        print(f"Processing Node {current_id}")
+                        spec = plan.nodes[current_id]
+                        if spec.type == "delayNode" and can_park:
+                            resume_at = waiting.get(current_id)
+                            if resume_at is None:
+                                seconds = delay_seconds(spec.node.get("data") or {})
+                                if seconds > 0:
+                                    resume_at = time.time() + seconds
+                                    now = datetime.now(timezone.utc)
+                                    checkpoint(current_id, step_index, StepOutcome(None, "waiting", {"resume_at": resume_at}), now, None)
+                                    step_index += 1
+                            if resume_at is not None and resume_at > time.time():
+                                print(f"  -> Delay {current_id} parked until {datetime.fromtimestamp(resume_at, timezone.utc)}")
+                                parked[current_id] = resume_at
+                                continue
+                            # Delay over (or zero): finish it here, no thread needed
+                            now = datetime.now(timezone.utc)
+                            stored = outputs.put(current_id, {"resume_at": resume_at})
+                            checkpoint(current_id, step_index, StepOutcome(None, "success", stored), now, now)
+                            step_index += 1
+                            resolve_edges(current_id, None)
+                            continue
+
+                        context = {"steps": outputs, "prev": outputs.get(triggered_by.get(current_id)), "input": run_input, **(extra_scope or {})}
+                        if spec.subplan is not None:
+                            future = pool.submit(contextvars.copy_context().run, self._execute_map, spec, workflow_id, step_index, context)
+                        else:
+                            future = pool.submit(contextvars.copy_context().run, self._execute_step, spec.node, workflow_id, step_index, context, spec.handler)
+                        in_flight[future] = (current_id, step_index, datetime.now(timezone.utc))
+                        step_index += 1
+
+                    if not in_flight:
+                        if ready or cut_short:
+                            # Only left behind when the deadline stopped scheduling
+                            raise WorkflowBudgetExceeded(f"{len(ready) + len(cut_short)} steps not finished before the deadline")
+                        continue
+
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        current_id, index, started_at = in_flight.pop(future)
+                        try:
+                            outcome = future.result()
+                        except StepDeadlineExceeded:
+                            # Not checkpointed, so it runs again wherever the run resumes;
+                            # the other in-flight steps still get to finish and checkpoint
+                            cut_short.append(current_id)
+                            continue
+                        # Large outputs are spilled; the checkpoint keeps only the reference
+                        stored = outputs.put(current_id, outcome.result)
+                        if checkpoint:
+                            checkpoint(current_id, index, outcome._replace(result=stored), started_at, datetime.now(timezone.utc))
+                        resolve_edges(current_id, outcome.handle)
+            if cut_short:
+                raise WorkflowBudgetExceeded(f"{len(cut_short)} steps not finished before the deadline")
+            if parked:
+                raise WorkflowSuspended(min(parked.values()), sorted(parked))
+        except (WorkflowSuspended, WorkflowBudgetExceeded):
+            suspended = True
+            raise
+        finally:
+            if owns_outputs:
+                # A run that continues later still needs its Redis-spilled outputs
+                outputs.close(keep_spilled=suspended)
+
+        if plan.cyclic_nodes:
+            print(f"Nodes never became ready (cycle?): {list(plan.cyclic_nodes)}")
+
+    def _execute_map(self, spec, workflow_id, index, context=None):
+        """
+        Runs a map node: evaluates data.items (an expression such as
+        "steps.fetch.body.pods", or a literal list) and runs the node's sub-graph once
+        per element, at most data.max_concurrency items at a time. Inside the
+        sub-graph `item` and `index` are in scope and `parent` holds the outer steps.
+        The result is {"count", "failed", "results": [{"outputs", "error"}, ...]} in
+        item order, so a 200-item fan-out takes about as long as its slowest item.
+        """
+        data = spec.node.get("data") or {}
+        print(f"  -> Executing Map {spec.id}: {spec.label}")
+        self._emit_event("step_start", workflow_id, {"step_id": spec.id, "label": spec.label, "index": index})
+        try:
+            items = data.get("items")
+            if isinstance(items, str):
+                items = compile_expression(items).evaluate(context or {})
+            items = list(items or [])
+            if len(items) > settings.WORKFLOW_MAP_MAX_ITEMS:
+                raise ValueError(f"Map over {len(items)} items exceeds the limit of {settings.WORKFLOW_MAP_MAX_ITEMS}")
+
+            limit = int(data.get("max_concurrency") or settings.WORKFLOW_MAP_MAX_CONCURRENCY)
+            workers = max(1, min(limit, settings.WORKFLOW_MAP_MAX_CONCURRENCY, len(items) or 1))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"wf-{workflow_id}-map") as pool:
+                futures = [
+                    pool.submit(contextvars.copy_context().run, self._run_map_item, spec.subplan, workflow_id, item_index, item, context or {})
+                    for item_index, item in enumerate(items)
+                ]
+                results = [future.result() for future in futures]
+
+            result_data = {
+                "count": len(results),
+                "failed": sum(1 for result in results if result["error"]),
+                "results": results,
+            }
+            print(f"     Map finished: {len(results)} items, {result_data['failed']} failed")
+            self._emit_event("step_finish", workflow_id, {"step_id": spec.id, "status": "success", "result": _event_result(result_data)})
+            return StepOutcome(None, "success", result_data)
+        except Exception as e:
+            print(f"     [Error] Map failed: {e}")
+            self._emit_event("step_finish", workflow_id, {"step_id": spec.id, "status": "error", "error": str(e)})
+            return StepOutcome(None, "error", None, str(e))
+
+    def _run_map_item(self, subplan: CompiledPlan, workflow_id: int, item_index: int, item, context: dict) -> dict:
+        errors = []
+        def record(node_id, index, outcome, started_at, finished_at):
+            if outcome.status == "error":
+                errors.append(f"{node_id}: {outcome.error}")
+
+        outputs = self._new_context_store(f"{workflow_id}-{uuid.uuid4().hex}")
+        try:
+            # Steps inside one item run in order; parallelism comes from the items
+            self._run_plan(
+                subplan, workflow_id, 1, checkpoint=record, run_input=context.get("input"),
+                outputs=outputs, extra_scope={"item": item, "index": item_index, "parent": context.get("steps")},
+            )
+            item_outputs = {}
+            for node_id in subplan.order:
+                if node_id != subplan.start_node_id and node_id in outputs:
+                    value = outputs[node_id]
+                    item_outputs[node_id] = value.load() if isinstance(value, SpilledValue) else value
+        except Exception as e:
+            return {"outputs": {}, "error": str(e)}
+        finally:
+            outputs.close()
+        return {"outputs": item_outputs, "error": "; ".join(errors) or None}
+
+    def _execute_step(self, step, workflow_id, index, context=None, handler: ActionHandler = None):
+        """
+        Runs a single node. context is the expression scope for this step:
+        {"steps": outputs by node id, "prev": output of the triggering node, "input": run input}.
+        handler is the node's entry from the action registry, resolved when the
+        plan was compiled; it is looked up here only for callers that don't pass it.
+        """
         step_id = step.get("id")
         step_type = step.get("type", "unknown")
         # ReactFlow stores custom data in 'data'
@@ -124,61 +458,19 @@ class WorkflowEngine:
         result_handle = None # Default: follow all paths
         
         try:
-            result_data = {}
-            if step_type == "actionNode": # Use exact types from FlowEditor
-                 # Identify action subtype
-                 action_type = data_payload.get("actionType", "unknown")
-                 
-                 if action_type == "http-request":
-                    url = data_payload.get('url')
-                    method = data_payload.get('method', 'GET')
-                    body = data_payload.get('body')
-                    headers = data_payload.get('headers', {})
-                    
-                    print(f"     Sending {method} Request to {url}")
-                    if url:
-                        response = httpx.request(method, url, json=body, headers=headers, timeout=10.0)
-                        print(f"     Response Status: {response.status_code}")
-                        result_data = {"status_code": response.status_code}
-                 
-                 elif action_type == "slack-notification":
-                     webhook_url = data_payload.get('webhook_url') or data_payload.get('url') # handle legacy keys
-                     message = data_payload.get('message', 'Default notification message')
-                     channel = data_payload.get('channel')
-                     
-                     if webhook_url:
-                         print(f"     Sending Slack Notification to {webhook_url}")
-                         httpx.post(webhook_url, json={"text": message, "channel": channel}, timeout=5.0)
-                         result_data = {"sent": True}
-                     else:
-                         print("     [Warn] No webhook_url for slack")
-            
-            elif step_type == "conditionNode":
-                # Check for a 'condition' field in the node data (default to True)
-                # In a real app, this would evaluate an expression like "status_code == 200"
-                # For now, we look for a boolean flag or string "true"/"false"
-                condition_value = data_payload.get("condition", True)
-                
-                # Normalize to boolean
-                if isinstance(condition_value, str):
-                    condition_met = condition_value.lower() == "true"
-                else:
-                    condition_met = bool(condition_value)
-
-                result_handle = "true" if condition_met else "false"
-                print(f"     Condition Outcome: {result_handle}")
-
-            elif step_type == "triggerNode":
-                 print("     Trigger fired.")
-            
-            else:
-                 print(f"     Unknown step type: {step_type}") # Legacy check
-            
-            self._emit_event("step_finish", workflow_id, {"step_id": step_id, "status": "success", "result": result_data})
+            handler = handler or resolve_handler(step)
+            result_handle, result_data = handler.run(data_payload, context or {})
+            self._emit_event("step_finish", workflow_id, {"step_id": step_id, "status": "success", "result": _event_result(result_data)})
+            outcome = StepOutcome(result_handle, "success", result_data)
 
+        except StepDeadlineExceeded as e:
+            # Not a failure of the step: the run is handed off and it runs again there
+            print(f"     [Warn] Step cut short by the run's time budget: {e}")
+            raise
         except Exception as e:
             print(f"     [Error] Step failed: {e}")
             self._emit_event("step_finish", workflow_id, {"step_id": step_id, "status": "error", "error": str(e)})
+            outcome = StepOutcome(result_handle, "error", None, str(e))
         
         print(f"     Step {step_id} finished.")
-        return result_handle
+        return outcome
@@ -0,0 +1,68 @@
+import json
+import threading
+import time
+
+# Which event types survive each verbosity level (None = everything)
+VERBOSITY_LEVELS = {
+    "full": None,
+    "summary": {"workflow_start", "workflow_finish", "step_finish"},
+    "final": {"workflow_finish"},
+}
+
+
+class EventBatcher:
+    """
+    Buffers engine events and publishes them to Redis in one pipelined round trip.
+
+    A batch is flushed when it reaches batch_size, when flush_interval seconds have
+    passed since the first buffered event (via a one-shot timer, so a long step
+    doesn't hold its step_start back), or explicitly at the end of a run.
+    Each event is still published as its own message, so subscribers such as the
+    websocket ConnectionManager see exactly the same payloads as before.
+    """
+    def __init__(self, redis_client, channel: str = "events", batch_size: int = 50, flush_interval: float = 0.25):
+        self.redis = redis_client
+        self.channel = channel
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._buffer = []
+        self._lock = threading.Lock()
+        # One publish at a time, in buffer order: a timer flush and a size flush
+        # racing outside it could otherwise send later events first
+        self._write_lock = threading.Lock()
+        self._timer = None
+
+    def emit(self, message: dict):
+        with self._lock:
+            self._buffer.append(json.dumps(message))
+            if len(self._buffer) < self.batch_size:
+                if self._timer is None and self.flush_interval > 0:
+                    self._timer = threading.Timer(self.flush_interval, self.flush)
+                    self._timer.daemon = True
+                    self._timer.start()
+                return
+        self.flush()
+
+    def flush(self):
+        # Taken before the buffer is swapped, so batches go out in the order they were cut
+        with self._write_lock:
+            with self._lock:
+                batch, self._buffer = self._buffer, []
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+            if not batch:
+                return
+
+            try:
+                pipe = self.redis.pipeline(transaction=False)
+                for message in batch:
+                    pipe.publish(self.channel, message)
+                pipe.execute()
+            except Exception as e:
+                print(f"Failed to emit {len(batch)} events: {e}")
+
+    @staticmethod
+    def allows(verbosity: str, event_type: str) -> bool:
+        allowed = VERBOSITY_LEVELS.get(verbosity, None)
+        return allowed is None or event_type in allowed
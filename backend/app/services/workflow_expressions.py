@@ -0,0 +1,306 @@
+"""
+Small, safe expression language for workflow nodes (conditions, map items, ...).
+
+Syntax is a subset of Python expressions:
+    status_code == 200 and prev.body.healthy
+    steps["http-1"].status_code in [500, 502, 503]
+    len(input.services) > 0 or not true
+
+Names resolve against the scope the engine builds for a step: `steps` (outputs
+by node id), `prev` (output of the node that triggered this one) and `input`
+(run input). Any other bare name is looked up in `prev`, so the common case
+`status_code == 200` works right after an http-request node. Attribute access
+is key lookup on dicts and yields None when the key is missing.
+
+Action fields (url, body, headers, message, ...) can embed expressions as
+templates: "https://api/pods/{{ input.pod }}/restart".
+
+Expressions are compiled once into a tree of closures and cached by source, so
+evaluating the same expression in a loop costs no parsing.
+"""
+import ast
+import operator
+import re
+from functools import lru_cache
+from typing import Any, Callable, List, Mapping
+
+MAX_SEQUENCE_LENGTH = 10000  # Guards "x" * 10**9 style blowups
+
+_CONSTANTS = {"true": True, "false": False, "null": None, "none": None}
+
+_BIN_OPS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+}
+
+_COMPARE_OPS = {
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+    ast.In: lambda a, b: a in b,
+    ast.NotIn: lambda a, b: a not in b,
+}
+
+_FUNCTIONS = {
+    "len": len,
+    "int": int,
+    "float": float,
+    "str": str,
+    "bool": bool,
+    "abs": abs,
+    "min": min,
+    "max": max,
+    "any": any,
+    "all": all,
+    "lower": lambda value: str(value).lower(),
+    "upper": lambda value: str(value).upper(),
+}
+
+
+class ExpressionError(ValueError):
+    pass
+
+
+class Expression:
+    def __init__(self, source: str, fn: Callable[[Mapping[str, Any]], Any]):
+        self.source = source
+        self._fn = fn
+
+    def evaluate(self, scope: Mapping[str, Any]) -> Any:
+        try:
+            return self._fn(scope)
+        except ExpressionError:
+            raise
+        except Exception as e:
+            raise ExpressionError(f"Error evaluating '{self.source}': {e}")
+
+    def __repr__(self):
+        return f"Expression({self.source!r})"
+
+
+@lru_cache(maxsize=2048)
+def compile_expression(source: str) -> Expression:
+    """Parses and compiles an expression. Cached by source text."""
+    if not isinstance(source, str) or not source.strip():
+        raise ExpressionError("Expression must be a non-empty string")
+    try:
+        tree = ast.parse(source.strip(), mode="eval")
+    except SyntaxError as e:
+        raise ExpressionError(f"Invalid expression '{source}': {e.msg}")
+    return Expression(source, _compile_node(tree.body))
+
+
+def _lookup(value, key):
+    if isinstance(value, Mapping):
+        return value.get(key)
+    if isinstance(value, (list, tuple, str)) and isinstance(key, int):
+        return value[key] if -len(value) <= key < len(value) else None
+    return None
+
+
+def _resolve_name(name: str, scope: Mapping[str, Any]):
+    if name in scope:
+        return scope[name]
+    if name in _CONSTANTS:
+        return _CONSTANTS[name]
+    return _lookup(scope.get("prev"), name)
+
+
+def _compile_node(node) -> Callable[[Mapping[str, Any]], Any]:
+    if isinstance(node, ast.Constant):
+        value = node.value
+        return lambda scope: value
+
+    if isinstance(node, ast.Name):
+        name = node.id
+        return lambda scope: _resolve_name(name, scope)
+
+    if isinstance(node, ast.Attribute):
+        if node.attr.startswith("_"):
+            raise ExpressionError(f"Access to '{node.attr}' is not allowed")
+        target, attr = _compile_node(node.value), node.attr
+        return lambda scope: _lookup(target(scope), attr)
+
+    if isinstance(node, ast.Subscript):
+        target, key = _compile_node(node.value), _compile_node(node.slice)
+        return lambda scope: _lookup(target(scope), key(scope))
+
+    if isinstance(node, ast.BoolOp):
+        operands = [_compile_node(value) for value in node.values]
+        if isinstance(node.op, ast.And):
+            def and_(scope):
+                result = True
+                for operand in operands:
+                    result = operand(scope)
+                    if not result:
+                        return result
+                return result
+            return and_
+
+        def or_(scope):
+            result = False
+            for operand in operands:
+                result = operand(scope)
+                if result:
+                    return result
+            return result
+        return or_
+
+    if isinstance(node, ast.UnaryOp):
+        operand = _compile_node(node.operand)
+        if isinstance(node.op, ast.Not):
+            return lambda scope: not operand(scope)
+        if isinstance(node.op, ast.USub):
+            return lambda scope: -operand(scope)
+        if isinstance(node.op, ast.UAdd):
+            return lambda scope: +operand(scope)
+
+    if isinstance(node, ast.BinOp) and type(node.op) in _BIN_OPS:
+        op = _BIN_OPS[type(node.op)]
+        left, right = _compile_node(node.left), _compile_node(node.right)
+        if isinstance(node.op, ast.Mult):
+            def mult(scope):
+                a, b = left(scope), right(scope)
+                for seq, count in ((a, b), (b, a)):
+                    if isinstance(seq, (str, list, tuple)) and isinstance(count, int) and len(seq) * count > MAX_SEQUENCE_LENGTH:
+                        raise ExpressionError("Sequence repetition too large")
+                return op(a, b)
+            return mult
+        return lambda scope: op(left(scope), right(scope))
+
+    if isinstance(node, ast.Compare):
+        left = _compile_node(node.left)
+        pairs = [(_COMPARE_OPS[type(op)], _compile_node(comparator))
+                 for op, comparator in zip(node.ops, node.comparators) if type(op) in _COMPARE_OPS]
+        if len(pairs) != len(node.ops):
+            raise ExpressionError("Unsupported comparison operator")
+
+        def compare(scope):
+            current = left(scope)
+            for op, comparator in pairs:
+                other = comparator(scope)
+                if not op(current, other):
+                    return False
+                current = other
+            return True
+        return compare
+
+    if isinstance(node, ast.IfExp):
+        test, body, orelse = _compile_node(node.test), _compile_node(node.body), _compile_node(node.orelse)
+        return lambda scope: body(scope) if test(scope) else orelse(scope)
+
+    if isinstance(node, (ast.List, ast.Tuple)):
+        items = [_compile_node(item) for item in node.elts]
+        return lambda scope: [item(scope) for item in items]
+
+    if isinstance(node, ast.Dict):
+        keys = [_compile_node(key) for key in node.keys if key is not None]
+        values = [_compile_node(value) for value in node.values]
+        if len(keys) != len(values):
+            raise ExpressionError("Dict unpacking is not allowed")
+        return lambda scope: {key(scope): value(scope) for key, value in zip(keys, values)}
+
+    if isinstance(node, ast.Call):
+        if not isinstance(node.func, ast.Name) or node.func.id not in _FUNCTIONS or node.keywords:
+            raise ExpressionError("Unsupported function call in expression")
+        fn = _FUNCTIONS[node.func.id]
+        args = [_compile_node(arg) for arg in node.args]
+        return lambda scope: fn(*[arg(scope) for arg in args])
+
+    raise ExpressionError(f"Unsupported syntax in expression: {type(node).__name__}")
+
+
+_TEMPLATE = re.compile(r"\{\{(.*?)\}\}")
+# Action node fields that may reference upstream outputs with {{ ... }}
+TEMPLATE_FIELDS = ("url", "body", "headers", "message", "channel", "webhook_url")
+
+
+@lru_cache(maxsize=2048)
+def compile_template(source: str) -> Callable[[Mapping[str, Any]], Any]:
+    """
+    Compiles a string with {{ expression }} placeholders, e.g.
+    "https://api/pods/{{ input.pod }}/restart". A string that is a single
+    placeholder evaluates to the raw value, so "{{ steps.fetch.body }}" passes a
+    dict through as a dict.
+    """
+    parts = _TEMPLATE.split(source)
+    if len(parts) == 1:
+        return lambda scope: source
+    if len(parts) == 3 and not parts[0] and not parts[2]:
+        expression = compile_expression(parts[1])
+
+        def raw(scope):
+            value = expression.evaluate(scope)
+            # Lazily loaded step outputs (see workflow_context) become plain dicts
+            return dict(value) if isinstance(value, Mapping) and not isinstance(value, dict) else value
+        return raw
+
+    # Even indexes are literal text, odd ones expressions
+    pieces = [(False, part) if i % 2 == 0 else (True, compile_expression(part)) for i, part in enumerate(parts)]
+
+    def render(scope):
+        out = []
+        for is_expression, piece in pieces:
+            if is_expression:
+                value = piece.evaluate(scope)
+                out.append("" if value is None else str(value))
+            else:
+                out.append(piece)
+        return "".join(out)
+    return render
+
+
+def render_template(value: Any, scope: Mapping[str, Any]) -> Any:
+    """Renders placeholders in a node field: strings, and strings inside dicts/lists."""
+    if isinstance(value, str):
+        return compile_template(value)(scope) if "{{" in value else value
+    if isinstance(value, dict):
+        return {key: render_template(item, scope) for key, item in value.items()}
+    if isinstance(value, list):
+        return [render_template(item, scope) for item in value]
+    return value
+
+
+def validate_graph_expressions(graph_data: dict) -> List[str]:
+    """Returns a list of error messages for expressions in a ReactFlow graph payload."""
+    errors = []
+    for node in (graph_data or {}).get("nodes", []):
+        data = node.get("data") or {}
+        if node.get("type") == "conditionNode":
+            condition = data.get("condition", True)
+            # Blank means false at run time, nothing to compile
+            if isinstance(condition, str) and condition.strip():
+                try:
+                    compile_expression(condition)
+                except ExpressionError as e:
+                    errors.append(f"Node {node.get('id')}: {e}")
+        elif node.get("type") == "mapNode" and isinstance(data.get("items"), str):
+            try:
+                compile_expression(data["items"])
+            except ExpressionError as e:
+                errors.append(f"Node {node.get('id')} items: {e}")
+        elif node.get("type") == "actionNode":
+            for field in TEMPLATE_FIELDS:
+                try:
+                    _compile_templates(data.get(field))
+                except ExpressionError as e:
+                    errors.append(f"Node {node.get('id')} {field}: {e}")
+    return errors
+
+
+def _compile_templates(value):
+    if isinstance(value, str) and "{{" in value:
+        compile_template(value)
+    elif isinstance(value, dict):
+        for item in value.values():
+            _compile_templates(item)
+    elif isinstance(value, list):
+        for item in value:
+            _compile_templates(item)
@@ -0,0 +1,144 @@
+import os
+import threading
+from typing import Optional
+from urllib.parse import urlsplit
+
+import httpx
+from app.core.config import settings
+from app.services.workflow_resilience import CircuitBreaker
+
+
+class HttpTransport:
+    """
+    Long-lived HTTP client shared by workflow actions in this process.
+
+    Keeps connections alive between steps (and between runs), caps the total pool
+    size, and limits how many requests may be in flight against a single host so
+    one slow API can't soak up the whole pool. Connection errors, timeouts and 5xx
+    responses count against the host's circuit breaker; while it is open requests
+    fail with CircuitOpenError without waiting on the network.
+    """
+    def __init__(
+        self,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        per_host_limit: int = 10,
+        http2: bool = False,
+        timeout: float = 10.0,
+        transport: Optional[httpx.BaseTransport] = None,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.per_host_limit = per_host_limit
+        self.http2 = http2
+        self.timeout = timeout
+        self._transport = transport
+        self.breaker = breaker or CircuitBreaker()
+        self._client = None
+        self._host_slots = {}
+        self._lock = threading.Lock()
+
+    @property
+    def client(self) -> httpx.Client:
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._build_client()
+        return self._client
+
+    def _build_client(self) -> httpx.Client:
+        limits = httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+        )
+        kwargs = {"limits": limits, "timeout": self.timeout}
+        if self._transport is not None:
+            kwargs["transport"] = self._transport
+        if self.http2:
+            try:
+                return httpx.Client(http2=True, **kwargs)
+            except ImportError:
+                # http2 needs the optional 'h2' package
+                print("[Warn] HTTP/2 requested but 'h2' is not installed, using HTTP/1.1")
+        return httpx.Client(**kwargs)
+
+    def _host_slot(self, url: str) -> threading.BoundedSemaphore:
+        host = urlsplit(url).netloc
+        slot = self._host_slots.get(host)
+        if slot is None:
+            with self._lock:
+                slot = self._host_slots.setdefault(host, threading.BoundedSemaphore(self.per_host_limit))
+        return slot
+
+    def request(self, method: str, url: str, timeout: Optional[float] = None, **kwargs) -> httpx.Response:
+        host = urlsplit(url).netloc
+        self.breaker.before_request(host)
+        try:
+            with self._host_slot(url):
+                response = self.client.request(method, url, timeout=timeout or self.timeout, **kwargs)
+        except httpx.TransportError:
+            self.breaker.record_failure(host)
+            raise
+        except BaseException:
+            # Not the host's fault, but a trial request must not stay in flight
+            # forever or the circuit never closes again
+            self.breaker.release(host)
+            raise
+        if response.status_code >= 500:
+            self.breaker.record_failure(host)
+        else:
+            self.breaker.record_success(host)
+        return response
+
+    def post(self, url: str, timeout: Optional[float] = None, **kwargs) -> httpx.Response:
+        return self.request("POST", url, timeout=timeout, **kwargs)
+
+    def close(self):
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+
+    def _reset_after_fork(self):
+        # Sockets inherited from the parent must not be shared with the child
+        self._client = None
+        self._host_slots = {}
+        self._lock = threading.Lock()
+        self.breaker._lock = threading.Lock()
+
+
+_transport = None
+_transport_lock = threading.Lock()
+
+
+def get_http_transport() -> HttpTransport:
+    """Returns the process-wide transport, creating it on first use."""
+    global _transport
+    if _transport is None:
+        with _transport_lock:
+            if _transport is None:
+                _transport = HttpTransport(
+                    max_connections=settings.WORKFLOW_HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.WORKFLOW_HTTP_MAX_KEEPALIVE,
+                    per_host_limit=settings.WORKFLOW_HTTP_PER_HOST_LIMIT,
+                    http2=settings.WORKFLOW_HTTP2,
+                    timeout=settings.WORKFLOW_HTTP_TIMEOUT,
+                    breaker=CircuitBreaker(
+                        failure_threshold=settings.WORKFLOW_CIRCUIT_FAILURE_THRESHOLD,
+                        cooldown=settings.WORKFLOW_CIRCUIT_COOLDOWN,
+                    ),
+                )
+    return _transport
+
+
+def _after_fork():
+    global _transport_lock
+    _transport_lock = threading.Lock()
+    if _transport is not None:
+        _transport._reset_after_fork()
+
+
+# Celery's prefork pool forks workers after import; give each child its own pool
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork)
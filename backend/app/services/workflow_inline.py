@@ -0,0 +1,125 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.domain.workflow.models import Workflow
+from app.repositories.workflow_repo import WorkflowRepository
+from app.repositories.workflow_run_repo import WorkflowRunRepository
+from app.services.workflow_engine import WorkflowBudgetExceeded, WorkflowEngine
+
+
+def _enqueue_with_dispatcher(workflow: Workflow, run_id: int):
+    from app.services.workflow_dispatch import get_dispatcher
+
+    dispatcher = get_dispatcher()
+    plan = workflow.owner.plan if workflow.owner else None
+    dispatcher.enqueue(workflow.owner_id, [(workflow.id, run_id)], plan)
+    dispatcher.dispatch()
+
+
+class InlineExecutor:
+    """
+    Fast path for webhook-triggered runs: small workflows execute right inside the
+    API process instead of paying for broker -> worker -> DB reload.
+
+    A run goes inline only if its compiled graph has at most max_nodes reachable
+    nodes (and no map nodes, which fan out regardless of graph size), an inline
+    slot is free, and its owner and workflow are under the dispatcher's
+    concurrency caps; an inline run holds a dispatcher slot like a queued one. It
+    then gets time_budget seconds: once that passes no new steps are started,
+    network calls in flight are cut off, and the run, checkpointed up to the last
+    finished step, is handed to a Celery worker which resumes it. Everything else
+    is queued as usual.
+    """
+    def __init__(
+        self,
+        engine: Optional[WorkflowEngine] = None,
+        max_nodes: int = 10,
+        time_budget: float = 2.0,
+        workers: int = 4,
+        enqueue: Callable[[Workflow, int], None] = _enqueue_with_dispatcher,
+        dispatcher=None,
+    ):
+        self._engine = engine
+        self._dispatcher = dispatcher
+        self.max_nodes = max_nodes
+        self.time_budget = time_budget
+        self.enqueue = enqueue
+        self.workflows = WorkflowRepository()
+        self.runs = WorkflowRunRepository()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="wf-inline")
+        self._slots = threading.BoundedSemaphore(workers)
+
+    @property
+    def engine(self) -> WorkflowEngine:
+        if self._engine is None:
+            self._engine = WorkflowEngine()
+        return self._engine
+
+    @property
+    def dispatcher(self):
+        if self._dispatcher is None:
+            from app.services.workflow_dispatch import get_dispatcher
+            self._dispatcher = get_dispatcher()
+        return self._dispatcher
+
+    async def trigger(self, db: Session, token: str, payload: Optional[dict]) -> Optional[dict]:
+        """Starts a run for the workflow behind token. Returns None for an unknown token."""
+        loop = asyncio.get_running_loop()
+        # The engine is synchronous; run it off the event loop
+        if not self._slots.acquire(blocking=False):
+            # Every inline slot is busy: queue instead of waiting behind them
+            return await loop.run_in_executor(None, self._start, db, token, payload, False)
+        try:
+            return await loop.run_in_executor(self._pool, self._start, db, token, payload, True)
+        finally:
+            self._slots.release()
+
+    def _start(self, db: Session, token: str, payload: Optional[dict], inline: bool) -> Optional[dict]:
+        workflow = self.workflows.get_by_webhook_token(db, token)
+        if not workflow or not workflow.is_active:
+            return None
+        run = self.runs.create(db, workflow.id, input=payload)
+
+        if not inline or not self._fits(db, workflow) or not self.dispatcher.try_acquire(workflow.owner_id, workflow.id, run.id):
+            self.enqueue(workflow, run.id)
+            return {"run_id": run.id, "status": run.status, "mode": "queued"}
+
+        handed_off = False
+        try:
+            self.engine.execute_workflow(db, workflow.id, run_id=run.id, deadline=time.monotonic() + self.time_budget)
+        except WorkflowBudgetExceeded:
+            handed_off = True
+        except Exception as e:
+            # The engine has already marked the run failed
+            print(f"Inline run {run.id} of workflow {workflow.id} failed: {e}")
+        finally:
+            # Freed before a hand-off, so the queued run can take it again
+            self.dispatcher.release(workflow.owner_id, workflow.id, run.id)
+        if handed_off:
+            self.enqueue(workflow, run.id)
+            return {"run_id": run.id, "status": run.status, "mode": "handed_off"}
+        db.refresh(run)
+        return {"run_id": run.id, "status": run.status, "mode": "inline"}
+
+    def _fits(self, db: Session, workflow: Workflow) -> bool:
+        plan = self.engine.get_plan(db, workflow.id, workflow.current_version_id, workflow.updated_at)
+        return len(plan.order) <= self.max_nodes and not any(spec.subplan for spec in plan.nodes.values())
+
+
+_executor = None
+
+
+def get_inline_executor() -> InlineExecutor:
+    global _executor
+    if _executor is None:
+        _executor = InlineExecutor(
+            max_nodes=settings.WORKFLOW_INLINE_MAX_NODES,
+            time_budget=settings.WORKFLOW_INLINE_TIME_BUDGET,
+            workers=settings.WORKFLOW_INLINE_WORKERS,
+        )
+    return _executor
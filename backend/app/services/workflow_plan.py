@@ -0,0 +1,353 @@
+import copy
+import threading
+import weakref
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Hashable, List, Mapping, Optional, Tuple
+from app.services.workflow_actions import ActionHandler, resolve_handler
+from app.services.workflow_expressions import ExpressionError, compile_expression
+
+# Every live PlanCache registers itself here so a workflow update can evict
+# stale plans from all caches in this process.
+_caches = weakref.WeakSet()
+
+
+@dataclass(frozen=True)
+class NodeSpec:
+    """Dispatch-ready view of a single ReactFlow node."""
+    id: str
+    type: str
+    label: str
+    action_type: Optional[str]
+    node: Dict[str, Any]  # Private deep copy of the raw node, treat as read-only
+    subplan: Optional["CompiledPlan"] = None  # mapNode: the sub-graph run once per item
+    handler: Optional[ActionHandler] = field(default=None, compare=False, repr=False)  # From the action registry
+
+
+@dataclass(frozen=True)
+class CompiledPlan:
+    """
+    Immutable execution plan for one version of a workflow graph.
+
+    successors maps a node to its outgoing edges grouped by source handle:
+    node_id -> ((source_handle, (target_id, ...)), ...). Only nodes reachable
+    from the start node are included, and join_counts holds the number of
+    incoming edges each of them has to wait for.
+    """
+    workflow_id: int
+    start_node_id: Optional[str]
+    nodes: Mapping[str, NodeSpec]
+    order: Tuple[str, ...]  # Topological order of reachable nodes
+    successors: Mapping[str, Tuple[Tuple[Optional[str], Tuple[str, ...]], ...]]
+    join_counts: Mapping[str, int]
+    cyclic_nodes: Tuple[str, ...]  # Reachable nodes that can never become ready
+    max_concurrency: Optional[int] = None
+    event_verbosity: Optional[str] = None
+
+
+def _parent_id(raw: dict) -> Optional[str]:
+    # ReactFlow 11 calls it parentNode, 12 renamed it to parentId
+    return raw.get('parentNode') or raw.get('parentId')
+
+
+def _ancestors(node_id: str, parents: Dict[str, Optional[str]]):
+    seen = set()
+    parent = parents.get(node_id)
+    while parent and parent not in seen:
+        yield parent
+        seen.add(parent)
+        parent = parents.get(parent)
+
+
+def _map_subgraph(map_id: str, raw_nodes: list, edges: list, parents: Dict[str, Optional[str]]) -> dict:
+    """
+    The sub-graph of a map node: every node nested under it (at any depth) and the
+    edges between them, plus a synthetic trigger feeding the nodes without inputs.
+    """
+    members = [raw for raw in raw_nodes if map_id in _ancestors(raw['id'], parents)]
+    member_ids = {raw['id'] for raw in members}
+    inner_edges = [edge for edge in edges if edge.get('source') in member_ids and edge.get('target') in member_ids]
+    has_input = {edge.get('target') for edge in inner_edges}
+    start_id = f"{map_id}:item"
+    roots = [raw['id'] for raw in members if parents[raw['id']] == map_id and raw['id'] not in has_input]
+    return {
+        "nodes": [{"id": start_id, "type": "triggerNode", "data": {"label": "Map item"}}] + members,
+        "edges": [{"source": start_id, "target": root} for root in roots] + inner_edges,
+    }
+
+
+def _warm_expression(node_type: Optional[str], data: dict):
+    # Warm the expression cache so runs never parse; bad expressions
+    # surface as a failed step when the node runs
+    expression = data.get('condition') if node_type == 'conditionNode' else data.get('items') if node_type == 'mapNode' else None
+    if isinstance(expression, str) and expression.strip():
+        try:
+            compile_expression(expression)
+        except ExpressionError:
+            pass
+
+
+def compile_plan(workflow_id: int, graph_data: dict) -> CompiledPlan:
+    """Builds a CompiledPlan from the raw ReactFlow payload stored in Workflow.steps[0]."""
+    graph_data = graph_data or {}
+    raw_nodes = graph_data.get('nodes', [])
+
+    # Nodes nested in a map node (a ReactFlow sub flow) belong to the map's
+    # sub-graph, not to this one
+    map_ids = {raw['id'] for raw in raw_nodes if raw.get('type') == 'mapNode'}
+    parents = {raw['id']: _parent_id(raw) for raw in raw_nodes}
+
+    nodes = {}
+    for raw in raw_nodes:
+        if map_ids and any(parent in map_ids for parent in _ancestors(raw['id'], parents)):
+            continue
+        node = copy.deepcopy(raw)
+        data = node.get('data') or {}
+        subplan = None
+        if node.get('type') == 'mapNode':
+            subplan = compile_plan(workflow_id, _map_subgraph(node['id'], raw_nodes, graph_data.get('edges', []), parents))
+        nodes[node['id']] = NodeSpec(
+            id=node['id'],
+            type=node.get('type', 'unknown'),
+            label=data.get('label') or node.get('label', 'Unnamed Step'),
+            action_type=data.get('actionType'),
+            node=node,
+            subplan=subplan,
+            handler=None if subplan else resolve_handler(node),
+        )
+        _warm_expression(node.get('type'), data)
+
+    # Find Start Node (TriggerNode), falling back to the first node for legacy data
+    start_node_id = next((node_id for node_id, spec in nodes.items() if spec.type == 'triggerNode'), None)
+    if not start_node_id and nodes:
+        start_node_id = next(iter(nodes))
+
+    # source_id -> [(target_id, source_handle)], dropping dangling edges
+    adjacency = {}
+    for edge in graph_data.get('edges', []):
+        source, target = edge.get('source'), edge.get('target')
+        if source not in nodes or target not in nodes:
+            continue
+        adjacency.setdefault(source, []).append((target, edge.get('sourceHandle')))
+
+    reachable = set()
+    if start_node_id:
+        reachable.add(start_node_id)
+        stack = [start_node_id]
+        while stack:
+            current_id = stack.pop()
+            for target_id, _ in adjacency.get(current_id, []):
+                if target_id not in reachable:
+                    reachable.add(target_id)
+                    stack.append(target_id)
+
+    successors = {}
+    join_counts = {node_id: 0 for node_id in reachable}
+    for source in reachable:
+        grouped = OrderedDict()
+        for target_id, source_handle in adjacency.get(source, []):
+            # Edges looping back into the trigger never re-fire it
+            if target_id == start_node_id:
+                continue
+            grouped.setdefault(source_handle, []).append(target_id)
+            join_counts[target_id] += 1
+        if grouped:
+            successors[source] = tuple((handle, tuple(targets)) for handle, targets in grouped.items())
+
+    # Kahn's algorithm; whatever is left over sits on a cycle
+    remaining = dict(join_counts)
+    order = []
+    queue = deque([start_node_id] if start_node_id else [])
+    while queue:
+        current_id = queue.popleft()
+        order.append(current_id)
+        for _, targets in successors.get(current_id, ()):
+            for target_id in targets:
+                remaining[target_id] -= 1
+                if remaining[target_id] == 0:
+                    queue.append(target_id)
+    ordered = set(order)
+    cyclic_nodes = tuple(node_id for node_id in reachable if node_id not in ordered)
+
+    max_concurrency = graph_data.get('max_concurrency')
+
+    return CompiledPlan(
+        workflow_id=workflow_id,
+        start_node_id=start_node_id,
+        nodes=MappingProxyType(nodes),
+        order=tuple(order),
+        successors=MappingProxyType(successors),
+        join_counts=MappingProxyType(join_counts),
+        cyclic_nodes=cyclic_nodes,
+        max_concurrency=int(max_concurrency) if max_concurrency else None,
+        event_verbosity=graph_data.get('event_verbosity'),
+    )
+
+
+class GraphValidationError(ValueError):
+    pass
+
+
+def validate_graph(graph_data: dict) -> List[str]:
+    """
+    Structural problems that would otherwise only show up when the workflow runs:
+    no trigger, edges pointing at missing nodes or crossing into or out of a map
+    sub flow, nodes the trigger can't reach and cycles. An empty graph (a freshly created workflow) is fine.
+    """
+    graph_data = graph_data or {}
+    raw_nodes = graph_data.get('nodes', [])
+    if not raw_nodes:
+        return []
+
+    errors = []
+    node_ids = [raw.get('id') for raw in raw_nodes]
+    duplicates = sorted({str(node_id) for node_id in node_ids if node_ids.count(node_id) > 1})
+    if duplicates:
+        errors.append(f"Duplicate node ids: {', '.join(duplicates)}")
+    known = set(node_ids)
+    parents = {raw.get('id'): _parent_id(raw) for raw in raw_nodes}
+    for edge in graph_data.get('edges', []):
+        source, target = edge.get('source'), edge.get('target')
+        missing = [end for end in (source, target) if end not in known]
+        if missing:
+            errors.append(f"Edge {edge.get('id') or source} -> {target} points at missing node {missing[0]}")
+        elif parents[source] != parents[target]:
+            # compile_plan keeps each sub flow's edges to itself, so this one would be dropped
+            errors.append(f"Edge {edge.get('id') or source} -> {target} crosses a map boundary")
+    for raw in raw_nodes:
+        if raw.get('type') == 'delayNode':
+            seconds = (raw.get('data') or {}).get('seconds')
+            if isinstance(seconds, bool) or not isinstance(seconds, (int, float)) or seconds < 0:
+                errors.append(f"Node {raw.get('id')}: delay needs a number of seconds")
+    if errors:
+        return errors
+
+    plan = compile_plan(0, graph_data)
+    if not any(spec.type == 'triggerNode' for spec in plan.nodes.values()):
+        errors.append("Graph has no trigger node")
+    errors.extend(_plan_problems(plan, ""))
+    return errors
+
+
+def _plan_problems(plan: CompiledPlan, prefix: str) -> List[str]:
+    errors = []
+    unreachable = [node_id for node_id in plan.nodes if node_id not in plan.join_counts]
+    if unreachable:
+        errors.append(f"{prefix}Nodes not reachable from the trigger: {', '.join(unreachable)}")
+    if plan.cyclic_nodes:
+        # In the order they were drawn; cyclic_nodes comes out of a set
+        cyclic = [node_id for node_id in plan.nodes if node_id in plan.cyclic_nodes]
+        errors.append(f"{prefix}Cycle between nodes: {', '.join(cyclic)}")
+    for spec in plan.nodes.values():
+        if spec.subplan:
+            errors.extend(_plan_problems(spec.subplan, f"Map {spec.id}: "))
+    return errors
+
+
+# Editor-only node fields (position, size, selection state, ...) are left out
+# of the stored plan; the engine only reads these
+_NODE_FIELDS = ('id', 'type', 'label', 'data')
+
+
+def plan_to_dict(plan: CompiledPlan) -> dict:
+    """
+    Compact, JSON-serializable form of a plan, stored in Workflow.compiled_graph on
+    save so the engine can skip re-parsing the editor payload.
+    """
+    return {
+        "start": plan.start_node_id,
+        "nodes": {
+            node_id: {
+                "node": {field: spec.node[field] for field in _NODE_FIELDS if field in spec.node},
+                "label": spec.label,
+                "subplan": plan_to_dict(spec.subplan) if spec.subplan else None,
+            }
+            for node_id, spec in plan.nodes.items()
+        },
+        "order": list(plan.order),
+        "successors": {node_id: [[handle, list(targets)] for handle, targets in groups] for node_id, groups in plan.successors.items()},
+        "join_counts": dict(plan.join_counts),
+        "cyclic": list(plan.cyclic_nodes),
+        "max_concurrency": plan.max_concurrency,
+        "event_verbosity": plan.event_verbosity,
+    }
+
+
+def plan_from_dict(workflow_id: int, data: dict) -> CompiledPlan:
+    """Rebuilds a CompiledPlan from plan_to_dict output without walking the graph again."""
+    nodes = {}
+    for node_id, entry in data["nodes"].items():
+        node = entry["node"]
+        node_data = node.get('data') or {}
+        nodes[node_id] = NodeSpec(
+            id=node_id,
+            type=node.get('type', 'unknown'),
+            label=entry["label"],
+            action_type=node_data.get('actionType'),
+            node=node,
+            subplan=plan_from_dict(workflow_id, entry["subplan"]) if entry.get("subplan") else None,
+            handler=None if entry.get("subplan") else resolve_handler(node),
+        )
+        _warm_expression(node.get('type'), node_data)
+    return CompiledPlan(
+        workflow_id=workflow_id,
+        start_node_id=data["start"],
+        nodes=MappingProxyType(nodes),
+        order=tuple(data["order"]),
+        successors=MappingProxyType({
+            node_id: tuple((handle, tuple(targets)) for handle, targets in groups)
+            for node_id, groups in data["successors"].items()
+        }),
+        join_counts=MappingProxyType(data["join_counts"]),
+        cyclic_nodes=tuple(data["cyclic"]),
+        max_concurrency=data.get("max_concurrency"),
+        event_verbosity=data.get("event_verbosity"),
+    )
+
+
+class PlanCache:
+    """
+    Per-process LRU of compiled plans. Keys are (workflow_id, version marker) so a
+    plan built for an older revision is simply never hit again once the workflow
+    changes, even if this process never heard about the update.
+    """
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self._plans = OrderedDict()
+        self._lock = threading.Lock()
+        _caches.add(self)
+
+    def get_or_compile(self, key: Tuple[int, Hashable], loader: Callable[[], CompiledPlan]) -> CompiledPlan:
+        with self._lock:
+            plan = self._plans.get(key)
+            if plan is not None:
+                self._plans.move_to_end(key)
+                return plan
+
+        # Compile outside the lock; a concurrent miss just compiles twice
+        plan = loader()
+        with self._lock:
+            self._plans[key] = plan
+            self._plans.move_to_end(key)
+            while len(self._plans) > self.maxsize:
+                self._plans.popitem(last=False)
+        return plan
+
+    def invalidate(self, workflow_id: int):
+        with self._lock:
+            for key in [key for key in self._plans if key[0] == workflow_id]:
+                del self._plans[key]
+
+    def clear(self):
+        with self._lock:
+            self._plans.clear()
+
+    def __len__(self):
+        return len(self._plans)
+
+
+def invalidate_workflow_plans(workflow_id: int):
+    """Drops cached plans for a workflow from every cache in this process."""
+    for cache in list(_caches):
+        cache.invalidate(workflow_id)
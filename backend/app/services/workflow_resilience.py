@@ -0,0 +1,194 @@
+import contextvars
+import random
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+# time.monotonic() deadline of the run executing on this thread, if it has a time
+# budget (inline runs). The engine sets it; step threads inherit it.
+_step_deadline: contextvars.ContextVar = contextvars.ContextVar("workflow_step_deadline", default=None)
+
+
+class CircuitOpenError(Exception):
+    """Raised without touching the network while a host's circuit is open."""
+    def __init__(self, host: str, retry_in: float):
+        super().__init__(f"Circuit open for {host}, retry in {retry_in:.1f}s")
+        self.host = host
+        self.retry_in = retry_in
+
+
+class StepDeadlineExceeded(Exception):
+    """The run's time budget ran out during a step; the step didn't finish and can run again elsewhere."""
+
+
+@contextmanager
+def step_deadline(deadline: Optional[float]):
+    token = _step_deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _step_deadline.reset(token)
+
+
+def _deadline_passed() -> bool:
+    deadline = _step_deadline.get()
+    return deadline is not None and time.monotonic() >= deadline
+
+
+def cap_timeout(timeout: float) -> float:
+    """
+    A step's I/O timeout, cut to what is left of the run's time budget so a slow
+    call can't hold the run past it. Raises StepDeadlineExceeded once nothing is left.
+    """
+    deadline = _step_deadline.get()
+    if deadline is None:
+        return timeout
+    left = deadline - time.monotonic()
+    if left <= 0:
+        raise StepDeadlineExceeded("Time budget used up before the call")
+    return min(timeout, left)
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """
+    Per-node retry settings, read from node data:
+        "retry": {"max_attempts": 3, "backoff": 0.5, "max_backoff": 30}
+    or just "retry": 3. The default is a single attempt (no retries).
+    """
+    max_attempts: int = 1
+    backoff: float = 0.5  # Base delay, doubled on every attempt
+    max_backoff: float = 30.0
+
+    @classmethod
+    def from_node(cls, data: dict) -> "RetryPolicy":
+        retry = (data or {}).get("retry")
+        if not retry:
+            return cls()
+        if isinstance(retry, (int, float)):
+            return cls(max_attempts=max(1, int(retry)))
+        return cls(
+            max_attempts=max(1, int(retry.get("max_attempts", 3))),
+            backoff=float(retry.get("backoff", cls.backoff)),
+            max_backoff=float(retry.get("max_backoff", cls.max_backoff)),
+        )
+
+    def delay(self, attempt: int) -> float:
+        # Exponential backoff with full jitter, so retries from many runs spread out
+        ceiling = min(self.max_backoff, self.backoff * (2 ** (attempt - 1)))
+        return random.uniform(0, ceiling)
+
+
+def call_with_retry(
+    fn: Callable[[], T],
+    policy: RetryPolicy,
+    should_retry: Callable[[Optional[T], Optional[Exception]], bool],
+    sleep: Callable[[float], None] = time.sleep,
+) -> T:
+    """
+    Calls fn up to policy.max_attempts times. should_retry(result, error) decides
+    whether an outcome is worth another attempt; the last outcome is returned
+    (or its exception re-raised). An open circuit is never retried.
+
+    Under a run time budget (step_deadline), a failed attempt once the budget is
+    gone, or a retry that wouldn't start before it ends, raises
+    StepDeadlineExceeded instead: the attempt was likely cut short by
+    cap_timeout, and the step is better re-run where it has the time.
+    """
+    attempt = 1
+    while True:
+        try:
+            result, error = fn(), None
+        except (CircuitOpenError, StepDeadlineExceeded):
+            raise
+        except Exception as e:
+            result, error = None, e
+
+        failed = error is not None or should_retry(result, error)
+        if failed and _deadline_passed():
+            raise StepDeadlineExceeded(f"Time budget used up on attempt {attempt}") from error
+        if attempt >= policy.max_attempts or not should_retry(result, error):
+            if error is not None:
+                raise error
+            return result
+
+        wait = policy.delay(attempt)
+        deadline = _step_deadline.get()
+        if deadline is not None and time.monotonic() + wait >= deadline:
+            raise StepDeadlineExceeded(f"No time left in the budget to retry after attempt {attempt}") from error
+        print(f"     Attempt {attempt} failed, retrying in {wait:.2f}s")
+        sleep(wait)
+        attempt += 1
+
+
+class _HostState:
+    __slots__ = ("failures", "opened_at", "probing")
+
+    def __init__(self):
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+
+class CircuitBreaker:
+    """
+    Per-host circuit breaker shared by every workflow in the process.
+
+    After failure_threshold consecutive failures the circuit opens and calls fail
+    immediately for cooldown seconds. Then a single trial call is let through
+    (half-open): success closes the circuit, failure re-opens it.
+    """
+    def __init__(self, failure_threshold: int = 5, cooldown: float = 30.0, clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._clock = clock
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def before_request(self, host: str):
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is None or state.opened_at is None:
+                return
+            remaining = self.cooldown - (self._clock() - state.opened_at)
+            if remaining > 0 or state.probing:
+                raise CircuitOpenError(host, max(remaining, 0.0))
+            state.probing = True  # Half-open: this caller is the trial request
+
+    def record_success(self, host: str):
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is not None:
+                state.failures = 0
+                state.opened_at = None
+                state.probing = False
+
+    def record_failure(self, host: str):
+        with self._lock:
+            state = self._hosts.setdefault(host, _HostState())
+            state.failures += 1
+            if state.probing or state.failures >= self.failure_threshold:
+                if state.opened_at is None or state.probing:
+                    print(f"     [Warn] Circuit opened for {host}")
+                state.opened_at = self._clock()
+                state.probing = False
+
+    def release(self, host: str):
+        """
+        Ends a half-open trial that said nothing about the host (the request
+        failed locally: bad payload, redirect loop, undecodable body). The circuit
+        stays open and the next caller gets to try instead.
+        """
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is not None:
+                state.probing = False
+
+    def is_open(self, host: str) -> bool:
+        with self._lock:
+            state = self._hosts.get(host)
+            return bool(state and state.opened_at is not None and self._clock() - state.opened_at < self.cooldown)
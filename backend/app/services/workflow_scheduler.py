@@ -0,0 +1,228 @@
+import heapq
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+from app.domain.workflow.models import WorkflowSchedule
+from app.repositories.workflow_schedule_repo import WorkflowScheduleRepository
+from app.services.workflow_cron import parse_cron
+
+LEADER_KEY = "wf:scheduler:leader"
+
+
+def _as_utc(moment: datetime) -> datetime:
+    # SQLite hands back naive datetimes
+    return moment.replace(tzinfo=timezone.utc) if moment.tzinfo is None else moment
+
+
+def next_fire_time(schedule: WorkflowSchedule, now: datetime) -> datetime:
+    """
+    Next occurrence strictly after now. Occurrences missed while no scheduler was
+    running are collapsed: the schedule fires once, then continues from now.
+    """
+    if schedule.cron:
+        return parse_cron(schedule.cron).next_after(now)
+    interval = timedelta(seconds=schedule.interval_seconds)
+    previous = _as_utc(schedule.next_run_at)
+    if previous + interval > now:
+        return previous + interval
+    # Stay on the original grid (e.g. every 10 minutes on the tens)
+    skipped = (now - previous) // interval + 1
+    return previous + skipped * interval
+
+
+class ScheduleHeap:
+    """
+    Min-heap of (fire_at, schedule_id). Rescheduling or removing a schedule doesn't
+    search the heap: the current time for each id is kept in a dict, and entries
+    that no longer match it are discarded when they reach the top.
+    """
+    def __init__(self):
+        self._heap = []
+        self._current: Dict[int, float] = {}
+
+    def load(self, entries):
+        self._current = {schedule_id: fire_at for schedule_id, fire_at in entries}
+        self._heap = [(fire_at, schedule_id) for schedule_id, fire_at in self._current.items()]
+        heapq.heapify(self._heap)
+
+    def push(self, schedule_id: int, fire_at: float):
+        if self._current.get(schedule_id) == fire_at:
+            return
+        self._current[schedule_id] = fire_at
+        heapq.heappush(self._heap, (fire_at, schedule_id))
+
+    def remove(self, schedule_id: int):
+        self._current.pop(schedule_id, None)
+
+    def peek(self) -> Optional[float]:
+        self._drop_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: float, limit: int = 1000) -> List[int]:
+        due = []
+        while len(due) < limit:
+            self._drop_stale()
+            if not self._heap or self._heap[0][0] > now:
+                break
+            _, schedule_id = heapq.heappop(self._heap)
+            del self._current[schedule_id]
+            due.append(schedule_id)
+        return due
+
+    def _drop_stale(self):
+        while self._heap and self._current.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+
+    def __len__(self):
+        return len(self._current)
+
+
+class LeaderLease:
+    """Redis lease: whoever holds the key runs the schedules; it expires if the holder dies."""
+    def __init__(self, redis_client, key: str = LEADER_KEY, ttl: float = 15.0):
+        self.redis = redis_client
+        self.key = key
+        self.ttl_ms = int(ttl * 1000)
+        self.token = uuid.uuid4().hex
+
+    def acquire_or_renew(self) -> bool:
+        if self.redis.set(self.key, self.token, nx=True, px=self.ttl_ms):
+            return True
+        holder = self.redis.get(self.key)
+        if isinstance(holder, bytes):
+            holder = holder.decode()
+        if holder != self.token:
+            return False
+        # Not atomic with the GET, but a lost race only extends someone else's lease
+        # for one tick; the claim in the database stops a double fire either way
+        self.redis.pexpire(self.key, self.ttl_ms)
+        return True
+
+    def release(self):
+        holder = self.redis.get(self.key)
+        if isinstance(holder, bytes):
+            holder = holder.decode()
+        if holder == self.token:
+            self.redis.delete(self.key)
+
+
+class WorkflowScheduler:
+    """
+    Fires cron/interval schedules. Run one or more copies (python -m
+    app.worker.scheduler); only the lease holder does any work.
+
+    On becoming leader it loads (id, next_run_at) of every active schedule into a
+    heap, then only re-reads schedules whose updated_at moved since the last sync,
+    so a tick costs O(changes + due * log n) instead of a table scan. Each due
+    schedule is claimed in the database (compare-and-set on next_run_at) together
+    with creating its run, and the run is handed to enqueue(owner_id, workflow_id,
+    run_id, plan), normally the concurrency-capped dispatcher.
+    """
+    def __init__(
+        self,
+        redis_client,
+        enqueue: Callable[[int, int, int, Optional[str]], None],
+        sync_interval: float = 5.0,
+        lease_ttl: float = 15.0,
+        clock: Callable[[], datetime] = lambda: datetime.now(timezone.utc),
+        after_fire: Optional[Callable[[], None]] = None,
+    ):
+        self.lease = LeaderLease(redis_client, ttl=lease_ttl)
+        self.enqueue = enqueue
+        self.after_fire = after_fire
+        self.sync_interval = sync_interval
+        self.lease_ttl = lease_ttl
+        self.clock = clock
+        self.repo = WorkflowScheduleRepository()
+        self.heap = ScheduleHeap()
+        self.is_leader = False
+        self._last_sync = None
+
+    def tick(self, db: Session) -> int:
+        """One scheduling pass. Returns the number of runs started."""
+        now = self.clock()
+        if not self.lease.acquire_or_renew():
+            if self.is_leader:
+                print("[Scheduler] Lost leadership")
+            self.is_leader = False
+            return 0
+
+        if not self.is_leader:
+            print("[Scheduler] Became leader, loading schedules")
+            self.heap.load((row.id, _as_utc(row.next_run_at).timestamp()) for row in self.repo.get_active_next_runs(db))
+            self._last_sync = now
+            self.is_leader = True
+        elif (now - self._last_sync).total_seconds() >= self.sync_interval:
+            self._sync(db, now)
+
+        fired = 0
+        due = self.heap.pop_due(now.timestamp())
+        if due:
+            fired = self._fire(db, due, now)
+            if fired and self.after_fire:
+                self.after_fire()
+        return fired
+
+    def _sync(self, db: Session, now: datetime):
+        # Overlap the window a little: updated_at comes from the database clock
+        since = self._last_sync - timedelta(seconds=self.sync_interval)
+        for row in self.repo.get_changed_since(db, since):
+            if row.is_active:
+                self.heap.push(row.id, _as_utc(row.next_run_at).timestamp())
+            else:
+                self.heap.remove(row.id)
+        self._last_sync = now
+
+    def _fire(self, db: Session, due: List[int], now: datetime) -> int:
+        fired = 0
+        for schedule, owner_id, workflow_active, plan in self.repo.get_due(db, due):
+            if not schedule.is_active or not workflow_active:
+                continue
+            expected = schedule.next_run_at
+            if _as_utc(expected) > now:
+                # Moved later since we loaded it
+                self.heap.push(schedule.id, _as_utc(expected).timestamp())
+                continue
+
+            new_next = next_fire_time(schedule, now)
+            run = self.repo.claim_and_create_run(db, schedule, expected, new_next, now)
+            if run is not None:
+                self.enqueue(owner_id, schedule.workflow_id, run.id, plan)
+                fired += 1
+                self.heap.push(schedule.id, new_next.timestamp())
+            else:
+                # Someone else fired it; pick up whatever they scheduled next
+                db.refresh(schedule)
+                self.heap.push(schedule.id, _as_utc(schedule.next_run_at).timestamp())
+        return fired
+
+    def sleep_time(self) -> float:
+        """How long the loop may sleep before the next tick."""
+        if not self.is_leader:
+            return self.lease_ttl / 3
+        wait = min(self.sync_interval, self.lease_ttl / 3)
+        next_fire = self.heap.peek()
+        if next_fire is not None:
+            wait = min(wait, max(0.0, next_fire - self.clock().timestamp()))
+        return wait
+
+    def run_forever(self, session_factory):
+        print("[Scheduler] Started")
+        try:
+            while True:
+                db = session_factory()
+                try:
+                    fired = self.tick(db)
+                    if fired:
+                        print(f"[Scheduler] Started {fired} scheduled runs")
+                except Exception as e:
+                    print(f"[Scheduler] Tick failed: {e}")
+                    db.rollback()
+                finally:
+                    db.close()
+                time.sleep(self.sleep_time())
+        finally:
+            self.lease.release()
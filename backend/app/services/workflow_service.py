@@ -1,15 +1,49 @@
 from sqlalchemy.orm import Session
 from app.repositories.workflow_repo import WorkflowRepository
-from app.schemas.workflow import WorkflowCreate, WorkflowUpdate
-from app.domain.workflow.models import Workflow
-from typing import List, Optional
+from app.repositories.workflow_run_repo import WorkflowRunRepository, FINISHED_STATUSES
+from app.repositories.workflow_schedule_repo import WorkflowScheduleRepository
+from app.schemas.workflow import WorkflowCreate, WorkflowUpdate, ScheduleCreate
+from app.core.config import settings
+from app.domain.workflow.models import Workflow, WorkflowRun, WorkflowSchedule, WorkflowVersion
+from app.services.workflow_cron import CronError, parse_cron
+from app.services.workflow_expressions import ExpressionError, validate_graph_expressions
+from app.services.workflow_plan import GraphValidationError, compile_plan, plan_to_dict, validate_graph
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Set
+import secrets
+import uuid
 
 class WorkflowService:
     def __init__(self):
         self.repo = WorkflowRepository()
+        self.run_repo = WorkflowRunRepository()
+        self.schedule_repo = WorkflowScheduleRepository()
+
+    def validate_steps(self, steps: list):
+        """
+        Raises ExpressionError if any node expression doesn't compile, or
+        GraphValidationError (both ValueErrors) if the graph can't run as drawn.
+        """
+        errors = []
+        for graph_data in steps or []:
+            errors.extend(validate_graph_expressions(graph_data))
+        if errors:
+            raise ExpressionError("; ".join(errors))
+        for graph_data in steps or []:
+            errors.extend(validate_graph(graph_data))
+        if errors:
+            raise GraphValidationError("; ".join(errors))
+
+    def compile_steps(self, steps: list) -> dict:
+        """Validates the editor payload and returns the plan to store with the new WorkflowVersion."""
+        self.validate_steps(steps)
+        # steps[0] contains { "nodes": [...], "edges": [...] }
+        graph_data = steps[0] if steps else {}
+        return plan_to_dict(compile_plan(0, graph_data))
 
     def create_workflow(self, db: Session, workflow_in: WorkflowCreate, user_id: int) -> Workflow:
-        return self.repo.create(db, workflow_in, user_id)
+        compiled_graph = self.compile_steps(workflow_in.steps)
+        return self.repo.create(db, workflow_in, user_id, compiled_graph)
 
     def get_workflow(self, db: Session, workflow_id: int) -> Optional[Workflow]:
         return self.repo.get(db, workflow_id)
@@ -21,10 +55,91 @@ class WorkflowService:
         workflow = self.repo.get(db, workflow_id)
         if not workflow or workflow.owner_id != user_id:
             return None
-        return self.repo.update(db, workflow, workflow_in)
+        compiled_graph = None
+        if "steps" in workflow_in.model_fields_set:
+            compiled_graph = self.compile_steps(workflow_in.steps)
+        return self.repo.update(db, workflow, workflow_in, compiled_graph)
 
     def delete_workflow(self, db: Session, workflow_id: int, user_id: int) -> Optional[Workflow]:
         workflow = self.repo.get(db, workflow_id)
         if not workflow or workflow.owner_id != user_id:
             return None
         return self.repo.remove(db, workflow_id)
+
+    def create_run(self, db: Session, workflow_id: int, input: Optional[dict] = None) -> WorkflowRun:
+        return self.run_repo.create(db, workflow_id, input)
+
+    def get_runs(self, db: Session, workflow_id: int, limit: int = 50, before_run_id: Optional[int] = None) -> List[WorkflowRun]:
+        before = None
+        if before_run_id is not None:
+            before = self.run_repo.get(db, before_run_id)
+            if not before or before.workflow_id != workflow_id:
+                return []
+        return self.run_repo.get_multi_by_workflow(db, workflow_id, limit, before)
+
+    def get_run(self, db: Session, workflow_id: int, run_id: int) -> Optional[WorkflowRun]:
+        run = self.run_repo.get(db, run_id)
+        if not run or run.workflow_id != workflow_id:
+            return None
+        return run
+
+    def get_unowned_workflow_ids(self, db: Session, workflow_ids: Set[int], user_id: int) -> Set[int]:
+        """Ownership check for a whole batch in one query. Returns ids the user can't run."""
+        owned = db.query(Workflow.id).filter(Workflow.id.in_(workflow_ids), Workflow.owner_id == user_id).all()
+        return set(workflow_ids) - {row.id for row in owned}
+
+    def create_bulk_runs(self, db: Session, items: List[tuple]) -> tuple:
+        batch_id = uuid.uuid4().hex
+        runs = self.run_repo.create_many(db, items, batch_id)
+        return batch_id, runs
+
+    def get_batch_status(self, db: Session, batch_id: str, user_id: int) -> Optional[dict]:
+        counts = self.run_repo.get_batch_counts(db, batch_id, user_id)
+        if not counts:
+            return None
+        total = sum(counts.values())
+        finished = sum(counts.get(status, 0) for status in FINISHED_STATUSES)
+        return {"batch_id": batch_id, "total": total, "counts": counts, "finished": finished == total}
+
+    def rotate_webhook_token(self, db: Session, workflow: Workflow) -> str:
+        """Issues a new inbound webhook token; the previous URL stops working."""
+        token = secrets.token_urlsafe(24)
+        self.repo.set_webhook_token(db, workflow, token)
+        return token
+
+    def get_workflow_by_webhook_token(self, db: Session, token: str) -> Optional[Workflow]:
+        return self.repo.get_by_webhook_token(db, token)
+
+    def create_schedule(self, db: Session, workflow: Workflow, schedule_in: ScheduleCreate) -> WorkflowSchedule:
+        if (schedule_in.cron is None) == (schedule_in.interval_seconds is None):
+            raise ValueError("Provide exactly one of cron or interval_seconds")
+        now = datetime.now(timezone.utc)
+        if schedule_in.cron is not None:
+            try:
+                next_run_at = parse_cron(schedule_in.cron).next_after(now)
+            except CronError as e:
+                raise ValueError(str(e))
+        else:
+            if schedule_in.interval_seconds < settings.WORKFLOW_SCHEDULE_MIN_INTERVAL:
+                raise ValueError(f"interval_seconds must be at least {settings.WORKFLOW_SCHEDULE_MIN_INTERVAL}")
+            next_run_at = now + timedelta(seconds=schedule_in.interval_seconds)
+        return self.schedule_repo.create(
+            db,
+            workflow.id,
+            next_run_at,
+            cron=schedule_in.cron,
+            interval_seconds=schedule_in.interval_seconds,
+            input=schedule_in.input,
+        )
+
+    def get_schedules(self, db: Session, workflow_id: int) -> List[WorkflowSchedule]:
+        return self.schedule_repo.get_multi_by_workflow(db, workflow_id)
+
+    def delete_schedule(self, db: Session, workflow_id: int, schedule_id: int) -> Optional[WorkflowSchedule]:
+        schedule = self.schedule_repo.get(db, schedule_id)
+        if not schedule or schedule.workflow_id != workflow_id:
+            return None
+        return self.schedule_repo.remove(db, schedule)
+
+    def get_versions(self, db: Session, workflow_id: int) -> List[WorkflowVersion]:
+        return self.repo.get_versions(db, workflow_id)
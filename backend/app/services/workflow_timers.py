@@ -0,0 +1,74 @@
+import time
+from typing import List, Optional
+
+from sqlalchemy.orm import Session
+from app.repositories.workflow_run_repo import WorkflowRunRepository
+
+TIMERS_KEY = "wf:timers"
+
+
+class RunTimers:
+    """
+    Wake-up times of runs parked on a delay node, as a Redis sorted set of run ids
+    scored by resume time. A parked run holds no worker and no dispatcher slot, so
+    any number of them can wait at once; the cost is one sorted-set entry each.
+    """
+    def __init__(self, redis_client, key: str = TIMERS_KEY):
+        self.redis = redis_client
+        self.key = key
+
+    def schedule(self, run_id: int, resume_at: float):
+        self.redis.zadd(self.key, {str(run_id): resume_at})
+
+    def cancel(self, run_id: int):
+        self.redis.zrem(self.key, str(run_id))
+
+    def pop_due(self, now: Optional[float] = None, limit: int = 500) -> List[int]:
+        """Removes and returns runs whose time has come. Safe to call from several workers."""
+        now = time.time() if now is None else now
+        due = self.redis.zrangebyscore(self.key, "-inf", now, start=0, num=limit)
+        claimed = []
+        for member in due:
+            # ZREM succeeds for exactly one caller, so a run is resumed once
+            if self.redis.zrem(self.key, member):
+                claimed.append(int(member))
+        return claimed
+
+    def __len__(self):
+        return self.redis.zcard(self.key)
+
+
+def resume_due_runs(db: Session, timers: RunTimers, dispatcher, now: Optional[float] = None) -> int:
+    """
+    Hands runs whose delay is over back to the dispatcher, which applies the usual
+    concurrency caps. Returns the number of runs queued.
+    """
+    run_ids = timers.pop_due(now)
+    if not run_ids:
+        return 0
+    try:
+        by_owner = {}
+        for run_id, workflow_id, owner_id, plan in WorkflowRunRepository().get_resumable(db, run_ids):
+            by_owner.setdefault((owner_id, plan), []).append((workflow_id, run_id))
+        for (owner_id, plan), runs in by_owner.items():
+            dispatcher.enqueue(owner_id, runs, plan)
+    except Exception:
+        # Put them back so the next sweep retries
+        for run_id in run_ids:
+            timers.schedule(run_id, 0)
+        raise
+    dispatcher.dispatch()
+    return sum(len(runs) for runs in by_owner.values())
+
+
+_timers = None
+
+
+def get_run_timers() -> RunTimers:
+    global _timers
+    if _timers is None:
+        import redis
+        from app.core.config import settings
+
+        _timers = RunTimers(redis.from_url(settings.REDIS_URL))
+    return _timers
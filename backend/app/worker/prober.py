@@ -0,0 +1,95 @@
+"""
+Health-check prober: python -m app.worker.prober
+
+Checks each active endpoint in its shard every check_interval seconds: due times
+live in a Redis sorted set (see health_scheduler), whatever is due is probed
+concurrently from one event loop, and results are buffered and written in bulk
+(see health_ingest). Run HEALTH_PROBER_SHARDS copies, each with its own
+HEALTH_PROBER_SHARD, to split the endpoints between them.
+"""
+import asyncio
+import time
+
+import redis
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.domain.monitoring.service import MonitoringService
+from app.services.health_ingest import CheckResultBuffer
+from app.services.health_prober import HealthProber, ProbeTarget
+from app.services.health_scheduler import CheckScheduler
+
+service = MonitoringService()
+
+
+def load_targets(shard: int, shard_count: int):
+    db = SessionLocal()
+    try:
+        return [ProbeTarget(*row) for row in service.get_probe_targets(db, shard, shard_count)]
+    finally:
+        db.close()
+
+
+def ingest(results):
+    db = SessionLocal()
+    try:
+        service.record_check_results(db, results)
+    finally:
+        db.close()
+
+
+async def run_forever(
+    prober: HealthProber,
+    scheduler: CheckScheduler,
+    buffer: CheckResultBuffer,
+    shard: int,
+    shard_count: int,
+    tick: float,
+    sync_interval: float,
+):
+    print(f"[Prober] Started, shard {shard} of {shard_count}")
+    in_flight = set()
+    last_sync = None
+    try:
+        while True:
+            now = time.time()
+            try:
+                if last_sync is None or now - last_sync >= sync_interval:
+                    targets = await asyncio.to_thread(load_targets, shard, shard_count)
+                    await asyncio.to_thread(scheduler.sync, targets, now)
+                    last_sync = now
+                due = await asyncio.to_thread(scheduler.pop_due, now)
+                if due:
+                    # Not awaited: a slow endpoint mustn't hold up the ones due next tick
+                    probing = asyncio.create_task(prober.probe(due, buffer.add))
+                    in_flight.add(probing)
+                    probing.add_done_callback(in_flight.discard)
+            except Exception as e:
+                print(f"[Prober] Tick failed: {e}")
+            await asyncio.sleep(tick)
+    finally:
+        if in_flight:
+            await asyncio.gather(*in_flight, return_exceptions=True)
+        buffer.flush()
+        await prober.aclose()
+
+
+def main():
+    scheduler = CheckScheduler(
+        redis.from_url(settings.REDIS_URL),
+        shard=settings.HEALTH_PROBER_SHARD,
+        min_interval=settings.HEALTH_CHECK_MIN_INTERVAL,
+    )
+    asyncio.run(run_forever(
+        HealthProber.from_settings(),
+        scheduler,
+        CheckResultBuffer(ingest, settings.HEALTH_INGEST_BATCH_SIZE, settings.HEALTH_INGEST_FLUSH_INTERVAL),
+        settings.HEALTH_PROBER_SHARD,
+        settings.HEALTH_PROBER_SHARDS,
+        settings.HEALTH_CHECK_TICK_SECONDS,
+        settings.HEALTH_CHECK_SYNC_SECONDS,
+    ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+"""
+Workflow schedule runner: python -m app.worker.scheduler
+
+Several copies can run for failover; a Redis lease makes one of them the leader.
+"""
+import redis
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.services.workflow_dispatch import get_dispatcher
+from app.services.workflow_scheduler import WorkflowScheduler
+
+
+def main():
+    dispatcher = get_dispatcher()
+
+    def enqueue(owner_id, workflow_id, run_id, plan):
+        dispatcher.enqueue(owner_id, [(workflow_id, run_id)], plan)
+
+    scheduler = WorkflowScheduler(
+        redis.from_url(settings.REDIS_URL),
+        enqueue,
+        sync_interval=settings.WORKFLOW_SCHEDULER_SYNC_INTERVAL,
+        lease_ttl=settings.WORKFLOW_SCHEDULER_LEASE_SECONDS,
+        # One dispatch per tick, not per fired schedule
+        after_fire=dispatcher.dispatch,
+    )
+    scheduler.run_forever(SessionLocal)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,12 +6,22 @@ from app.domain.team.models import Team
 from app.domain.user.models import User
 from app.domain.deployment.models import Deployment
 from app.domain.reliability.models import SLO
+import asyncio
 import httpx
 import time
+from datetime import datetime, timedelta, timezone
+from app.core.config import settings
 from app.services.workflow_engine import WorkflowEngine
+from app.repositories.workflow_run_repo import WorkflowRunRepository
+from app.services.workflow_dispatch import get_dispatcher
+from app.services.workflow_timers import get_run_timers, resume_due_runs
+from app.services.health_prober import HealthProber, ProbeTarget
+from app.services.health_partitions import maintain_partitions
+from app.services.health_rollups import prune_minute_rollups
 
 service = MonitoringService()
 workflow_engine = WorkflowEngine()
+workflow_run_repo = WorkflowRunRepository()
 
 @celery_app.task
 def check_service_health(endpoint_id: int, url: str, method: str = "GET"):
@@ -54,23 +64,93 @@ def check_service_health(endpoint_id: int, url: str, method: str = "GET"):
 
 @celery_app.task
 def run_all_health_checks():
+    # One task probes everything concurrently instead of one task per endpoint;
+    # deployments with many endpoints should run the prober (app.worker.prober)
+    from app.worker.prober import ingest
+
     db = SessionLocal()
     try:
-        endpoints = db.query(Endpoint).filter(Endpoint.is_active == True).all()
-        print(f"Dispatching checks for {len(endpoints)} endpoints")
-        for ep in endpoints:
-            check_service_health.delay(ep.id, ep.url, ep.method)
+        targets = [ProbeTarget(*row) for row in service.get_probe_targets(db)]
     finally:
         db.close()
-    return f"Dispatched {len(endpoints)} checks"
+    print(f"Probing {len(targets)} endpoints")
 
-@celery_app.task
-def execute_workflow_task(workflow_id: int):
+    async def probe_all():
+        prober = HealthProber.from_settings()
+        try:
+            return await prober.probe(targets, ingest)
+        finally:
+            await prober.aclose()
+
+    probed = asyncio.run(probe_all())
+    return f"Probed {probed} endpoints"
+
+# acks_late + reject_on_worker_lost: if the worker dies mid-run the message is
+# re-delivered, and the engine resumes the run from its last checkpointed step.
+@celery_app.task(acks_late=True, reject_on_worker_lost=True)
+def execute_workflow_task(workflow_id: int, run_id: int = None, owner_id: int = None):
     db = SessionLocal()
     try:
-        workflow_engine.execute_workflow(db, workflow_id)
+        if run_id is None:
+            # Messages enqueued before runs were persisted don't carry a run id
+            run_id = workflow_run_repo.create(db, workflow_id).id
+        workflow_engine.execute_workflow(db, workflow_id, run_id=run_id)
     except Exception as e:
         print(f"Error executing workflow {workflow_id}: {e}")
     finally:
         db.close()
+        if owner_id is not None:
+            # Runs admitted by the dispatcher hold a concurrency slot; hand it on
+            try:
+                dispatcher = get_dispatcher()
+                dispatcher.release(owner_id, workflow_id, run_id)
+                dispatcher.dispatch()
+            except Exception as e:
+                print(f"Failed to release dispatch slot for run {run_id}: {e}")
     return f"Executed workflow {workflow_id}"
+
+@celery_app.task
+def dispatch_workflow_runs():
+    sent = get_dispatcher().dispatch()
+    return f"Dispatched {sent} workflow runs"
+
+@celery_app.task
+def resume_waiting_runs():
+    db = SessionLocal()
+    try:
+        resumed = resume_due_runs(db, get_run_timers(), get_dispatcher())
+    finally:
+        db.close()
+    return f"Resumed {resumed} waiting workflow runs"
+
+@celery_app.task
+def maintain_health_check_partitions():
+    """Creates upcoming daily partitions of health_check_results, drops expired ones and prunes minute rollups"""
+    db = SessionLocal()
+    try:
+        result = maintain_partitions(
+            db, settings.HEALTH_RESULTS_PARTITIONS_AHEAD, settings.HEALTH_RESULTS_RETENTION_DAYS
+        )
+        pruned = prune_minute_rollups(db)
+    finally:
+        db.close()
+    if not result["partitioned"]:
+        return f"health_check_results is not partitioned; pruned {pruned} minute rollups"
+    message = (
+        f"Created {len(result['created'])} and dropped {len(result['dropped'])} health check partitions, "
+        f"pruned {pruned} minute rollups"
+    )
+    if result["default_rows"]:
+        message += f", {result['default_rows']} rows left in the default partition"
+    return message
+
+@celery_app.task
+def prune_workflow_runs():
+    """Retention: drop finished run history older than WORKFLOW_RUN_RETENTION_DAYS"""
+    cutoff = datetime.now(timezone.utc) - timedelta(days=settings.WORKFLOW_RUN_RETENTION_DAYS)
+    db = SessionLocal()
+    try:
+        deleted = workflow_run_repo.delete_older_than(db, cutoff)
+    finally:
+        db.close()
+    return f"Pruned {deleted} workflow runs"
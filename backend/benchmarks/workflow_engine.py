@@ -0,0 +1,350 @@
+"""
+Workflow engine benchmarks.
+
+Builds synthetic ReactFlow graphs (chains, wide fan-outs, stacked diamonds and
+condition trees) and runs them through WorkflowEngine against a local stub HTTP
+server and an in-process Redis stand-in, so the numbers measure the engine and
+not the network or a broker. Results are written as JSON to diff across releases:
+
+    python -m benchmarks.workflow_engine --output bench.json
+    python -m benchmarks.workflow_engine --sizes 10 100 --compare bench.json
+
+Run from the backend directory.
+"""
+import argparse
+import contextlib
+import json
+import platform
+import subprocess
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from app.services.workflow_engine import WorkflowEngine
+from app.services.workflow_plan import compile_plan, plan_to_dict
+
+SHAPES = ("chain", "fan_out", "diamond", "condition_tree")
+DEFAULT_SIZES = (10, 100, 1000, 10000)
+STEP_BUDGET = 20000  # Executed steps per (shape, size) before we stop repeating runs
+
+
+# --- Synthetic graphs -------------------------------------------------------
+
+def _trigger():
+    return {"id": "0", "type": "triggerNode", "data": {"label": "Start"}}
+
+
+def _action(node_id, url):
+    return {
+        "id": str(node_id),
+        "type": "actionNode",
+        "data": {"label": f"Call {node_id}", "actionType": "http-request", "url": url, "method": "GET"},
+    }
+
+
+def _condition(node_id, condition):
+    return {"id": str(node_id), "type": "conditionNode", "data": {"label": f"Check {node_id}", "condition": condition}}
+
+
+def _edge(source, target, handle=None):
+    return {"id": f"e{source}-{target}", "source": str(source), "target": str(target), "sourceHandle": handle}
+
+
+def chain_graph(size, url):
+    """trigger -> a1 -> a2 -> ... (size nodes)"""
+    nodes = [_trigger()] + [_action(i, url) for i in range(1, size)]
+    edges = [_edge(i - 1, i) for i in range(1, size)]
+    return {"nodes": nodes, "edges": edges}
+
+
+def fan_out_graph(size, url):
+    """trigger -> (size - 2 parallel actions) -> join"""
+    join = size - 1
+    nodes = [_trigger()] + [_action(i, url) for i in range(1, size)]
+    edges = []
+    for i in range(1, join):
+        edges += [_edge(0, i), _edge(i, join)]
+    return {"nodes": nodes, "edges": edges}
+
+
+def diamond_graph(size, url):
+    """trigger -> (a, b) -> join -> (a, b) -> join ... stacked until size nodes"""
+    nodes, edges = [_trigger()], []
+    join = 0
+    while len(nodes) + 3 <= size:
+        left, right, new_join = len(nodes), len(nodes) + 1, len(nodes) + 2
+        nodes += [_action(left, url), _action(right, url), _action(new_join, url)]
+        edges += [_edge(join, left), _edge(join, right), _edge(left, new_join), _edge(right, new_join)]
+        join = new_join
+    for i in range(len(nodes), size):
+        nodes.append(_action(i, url))
+        edges.append(_edge(join, i))
+        join = i
+    return {"nodes": nodes, "edges": edges}
+
+
+def condition_tree_graph(size, url):
+    """
+    Binary tree of condition nodes (heap layout: node i branches to 2i on "true"
+    and 2i+1 on "false") with http actions at the leaves. A run walks one path;
+    every other branch goes through skip propagation.
+    """
+    nodes, edges = [_trigger()], [_edge(0, 1)]
+    for i in range(1, size):
+        if 2 * i < size:
+            # Mix static flags with compiled expressions
+            condition = "true" if i % 3 == 0 else f"len(steps) % 2 == {i % 2}"
+            nodes.append(_condition(i, condition))
+            edges.append(_edge(i, 2 * i, "true"))
+            if 2 * i + 1 < size:
+                edges.append(_edge(i, 2 * i + 1, "false"))
+        else:
+            nodes.append(_action(i, url))
+    return {"nodes": nodes, "edges": edges}
+
+
+GRAPH_BUILDERS = {
+    "chain": chain_graph,
+    "fan_out": fan_out_graph,
+    "diamond": diamond_graph,
+    "condition_tree": condition_tree_graph,
+}
+
+
+# --- Local stand-ins ----------------------------------------------------------
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, like a real API
+    disable_nagle_algorithm = True  # Headers and body go out in separate writes
+    body = b'{"ok": true}'
+
+    def _respond(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    do_GET = do_POST = _respond
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubHTTPServer:
+    """Threaded HTTP server on 127.0.0.1 answering every request with 200."""
+    def __init__(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class InMemoryRedis:
+    """Enough of redis-py for the engine's event publishing; counts what it sees."""
+    def __init__(self):
+        self.published = 0
+        self.round_trips = 0
+        self._lock = threading.Lock()
+
+    def publish(self, channel, message):
+        with self._lock:
+            self.published += 1
+            self.round_trips += 1
+
+    def pipeline(self, transaction=True):
+        return _InMemoryPipeline(self)
+
+
+class _InMemoryPipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.queued = 0
+
+    def publish(self, channel, message):
+        self.queued += 1
+
+    def execute(self):
+        with self.redis._lock:
+            self.redis.published += self.queued
+            self.redis.round_trips += 1
+        self.queued = 0
+
+
+class _BenchSession:
+    """Stands in for the SQLAlchemy session: serves one workflow row, never writes."""
+    def __init__(self, workflow_id, graph):
+        # As if saved through the API: one row stands in for both the workflow and
+        # its current version, which carries the compiled plan
+        self.row = _Row(
+            id=workflow_id,
+            name=f"bench-{workflow_id}",
+            current_version_id=workflow_id,
+            updated_at=None,
+            steps=[graph],
+            compiled_graph=plan_to_dict(compile_plan(workflow_id, graph)),
+        )
+
+    def query(self, *entities):
+        return self
+
+    def filter(self, *args):
+        return self
+
+    def first(self):
+        return self.row
+
+
+class _Row:
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+
+class _NullWriter:
+    # The engine logs with print(); keep that out of the measurements
+    def write(self, text):
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+# --- Runner -------------------------------------------------------------------
+
+def _make_engine():
+    engine = WorkflowEngine()
+    fake_redis = InMemoryRedis()
+    engine.redis = fake_redis
+    engine.events.redis = fake_redis
+    return engine, fake_redis
+
+
+class _StepCounter:
+    def __init__(self, engine):
+        self.count = 0
+        self._lock = threading.Lock()
+        original = engine._execute_step
+
+        def counted(*args, **kwargs):
+            with self._lock:
+                self.count += 1
+            return original(*args, **kwargs)
+        engine._execute_step = counted
+
+
+def bench_graph(shape, size, url, max_concurrency=None, verbosity="full", repeat=None):
+    graph = GRAPH_BUILDERS[shape](size, url)
+    workflow_id = size * len(SHAPES) + SHAPES.index(shape)
+    db = _BenchSession(workflow_id, graph)
+
+    started = time.perf_counter()
+    compile_plan(workflow_id, graph)
+    compile_ms = (time.perf_counter() - started) * 1000
+
+    engine, fake_redis = _make_engine()
+    counter = _StepCounter(engine)
+
+    with contextlib.redirect_stdout(_NullWriter()):
+        # Warm-up run: fills the plan cache and the HTTP pool
+        engine.execute_workflow(db, workflow_id, max_concurrency=max_concurrency, verbosity=verbosity)
+        steps_per_run = counter.count
+
+        runs = repeat or max(1, min(50, STEP_BUDGET // max(steps_per_run, 1)))
+        started = time.perf_counter()
+        for _ in range(runs):
+            engine.execute_workflow(db, workflow_id, max_concurrency=max_concurrency, verbosity=verbosity)
+        elapsed = time.perf_counter() - started
+
+        tracemalloc.start()
+        engine.execute_workflow(db, workflow_id, max_concurrency=max_concurrency, verbosity=verbosity)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    return {
+        "shape": shape,
+        "nodes": size,
+        "edges": len(graph["edges"]),
+        "steps_per_run": steps_per_run,
+        "runs": runs,
+        "runs_per_sec": round(runs / elapsed, 3),
+        "step_overhead_us": round(elapsed / (runs * max(steps_per_run, 1)) * 1e6, 2),
+        "compile_ms": round(compile_ms, 3),
+        "peak_memory_kb": round(peak / 1024, 1),
+        "events_published": fake_redis.published,
+        "redis_round_trips": fake_redis.round_trips,
+    }
+
+
+def run_suite(shapes=SHAPES, sizes=DEFAULT_SIZES, max_concurrency=None, verbosity="full", repeat=None):
+    results = []
+    with StubHTTPServer() as stub:
+        for shape in shapes:
+            for size in sizes:
+                result = bench_graph(shape, size, stub.url, max_concurrency, verbosity, repeat)
+                print(f"{shape:>15} {size:>6} nodes  {result['runs_per_sec']:>10.2f} runs/s  "
+                      f"{result['step_overhead_us']:>9.1f} us/step  {result['peak_memory_kb']:>9.1f} KB peak")
+                results.append(result)
+    return {"meta": _meta(max_concurrency, verbosity), "results": results}
+
+
+def _meta(max_concurrency, verbosity):
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_commit": commit or None,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "max_concurrency": max_concurrency,
+        "verbosity": verbosity,
+    }
+
+
+def compare(current, baseline):
+    """Prints runs/sec changes against an earlier results file."""
+    previous = {(r["shape"], r["nodes"]): r for r in baseline.get("results", [])}
+    for result in current["results"]:
+        before = previous.get((result["shape"], result["nodes"]))
+        if before and before["runs_per_sec"]:
+            change = (result["runs_per_sec"] / before["runs_per_sec"] - 1) * 100
+            print(f"{result['shape']:>15} {result['nodes']:>6} nodes  {change:+7.1f}% runs/s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the workflow engine on synthetic graphs")
+    parser.add_argument("--shapes", nargs="+", choices=SHAPES, default=list(SHAPES))
+    parser.add_argument("--sizes", nargs="+", type=int, default=list(DEFAULT_SIZES))
+    parser.add_argument("--max-concurrency", type=int, default=None)
+    parser.add_argument("--verbosity", choices=("full", "summary", "final"), default="full")
+    parser.add_argument("--repeat", type=int, default=None, help="Runs per graph (default: sized to the step budget)")
+    parser.add_argument("--output", default="workflow_bench.json")
+    parser.add_argument("--compare", default=None, help="Earlier results file to diff against")
+    args = parser.parse_args(argv)
+
+    report = run_suite(args.shapes, args.sizes, args.max_concurrency, args.verbosity, args.repeat)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
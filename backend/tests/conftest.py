@@ -1,3 +1,5 @@
+import uuid
+
 import pytest
 from typing import Generator
 from fastapi.testclient import TestClient
@@ -51,3 +53,157 @@ def client(db_engine, db):
         yield c
     # Cleanup overrides
     app.dependency_overrides = {}
+
+
+class FakeRedis:
+    """In-memory stand-in for the handful of redis-py commands the services use."""
+    def __init__(self):
+        self.data = {}
+        self.published = []
+
+    def pipeline(self, transaction=True):
+        return _FakePipeline(self)
+
+    def lock(self, name, timeout=None, blocking=True):
+        return _FakeLock(self, name, timeout)
+
+    def publish(self, channel, message):
+        self.published.append((channel, message))
+        return 0
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, nx=False, px=None, ex=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    def pexpire(self, key, ms):
+        return key in self.data
+
+    def delete(self, *keys):
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    def rpush(self, key, *values):
+        self.data.setdefault(key, []).extend(values)
+        return len(self.data[key])
+
+    def lpush(self, key, *values):
+        for value in values:
+            self.data.setdefault(key, []).insert(0, value)
+        return len(self.data[key])
+
+    def lpop(self, key):
+        items = self.data.get(key)
+        return items.pop(0) if items else None
+
+    def llen(self, key):
+        return len(self.data.get(key, []))
+
+    def lrange(self, key, start, end):
+        items = self.data.get(key, [])
+        return items[start:] if end == -1 else items[start:end + 1]
+
+    def lrem(self, key, count, value):
+        items = self.data.get(key, [])
+        removed = 0
+        while value in items and (not count or removed < count):
+            items.remove(value)
+            removed += 1
+        return removed
+
+    def sadd(self, key, *members):
+        self.data.setdefault(key, set()).update(str(m) for m in members)
+
+    def srem(self, key, *members):
+        self.data.get(key, set()).difference_update(str(m) for m in members)
+
+    def smembers(self, key):
+        return set(self.data.get(key, set()))
+
+    def hset(self, key, field, value):
+        self.data.setdefault(key, {})[str(field)] = str(value)
+
+    def hget(self, key, field):
+        return self.data.get(key, {}).get(str(field))
+
+    def hdel(self, key, *fields):
+        for field in fields:
+            self.data.get(key, {}).pop(str(field), None)
+
+    def zadd(self, key, mapping, nx=False):
+        zset = self.data.setdefault(key, {})
+        added = 0
+        for member, score in mapping.items():
+            if nx and str(member) in zset:
+                continue
+            added += str(member) not in zset
+            zset[str(member)] = float(score)
+        return added
+
+    def zrem(self, key, *members):
+        zset = self.data.get(key, {})
+        return sum(zset.pop(str(member), None) is not None for member in members)
+
+    def zcard(self, key):
+        return len(self.data.get(key, {}))
+
+    def zrangebyscore(self, key, low, high, start=None, num=None, withscores=False):
+        low, high = float(low), float(high)
+        members = sorted((s, m) for m, s in self.data.get(key, {}).items() if low <= s <= high)
+        members = [(m, s) if withscores else m for s, m in members]
+        return members[start:start + num] if num is not None else members
+
+    def zremrangebyscore(self, key, low, high):
+        low, high = float(low), float(high)
+        zset = self.data.get(key, {})
+        for member in [m for m, s in zset.items() if low <= s <= high]:
+            del zset[member]
+
+
+class _FakeLock:
+    """redis-py Lock semantics: token-checked release, LockNotOwnedError once lost."""
+    def __init__(self, redis, name, timeout):
+        self.redis = redis
+        self.name = name
+        self.timeout = timeout
+        self.token = None
+
+    def acquire(self, blocking=True):
+        token = uuid.uuid4().hex
+        px = int(self.timeout * 1000) if self.timeout else None
+        if not self.redis.set(self.name, token, nx=True, px=px):
+            return False
+        self.token = token
+        return True
+
+    def release(self):
+        from redis.exceptions import LockNotOwnedError
+        if self.token is None or self.redis.get(self.name) != self.token:
+            raise LockNotOwnedError("Cannot release a lock that's no longer owned")
+        self.redis.delete(self.name)
+        self.token = None
+
+
+class _FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.calls = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.calls.append((getattr(self.redis, name), args, kwargs))
+            return self
+        return queue
+
+    def execute(self):
+        results = [fn(*args, **kwargs) for fn, args, kwargs in self.calls]
+        self.calls = []
+        return results
+
+
+@pytest.fixture
+def fake_redis():
+    return FakeRedis()
@@ -0,0 +1,40 @@
+from datetime import date, datetime, timezone
+
+from app.services.health_partitions import (
+    days_to_create, expired, maintain_partitions, parse_bound, partition_name,
+)
+
+
+def _utc(*args):
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+def test_partition_bounds_and_planning():
+    legacy = parse_bound("health_check_results_legacy", "FOR VALUES FROM (MINVALUE) TO ('2026-10-19 00:00:00+00')")
+    day = parse_bound(
+        "health_check_results_p20261019", "FOR VALUES FROM ('2026-10-19 00:00:00+00') TO ('2026-10-20 00:00:00+00')"
+    )
+    shifted = parse_bound("other", "FOR VALUES FROM ('2026-10-20 02:00:00+02') TO ('2026-10-21 02:00:00+02')")
+    assert parse_bound("health_check_results_default", "DEFAULT") is None
+    assert legacy.start is None and legacy.end == _utc(2026, 10, 19)
+    assert day.start == _utc(2026, 10, 19) and day.end == _utc(2026, 10, 20)
+    assert shifted.start == _utc(2026, 10, 20)
+    # Other offset and fraction spellings Postgres uses; all must parse on Python 3.9+
+    odd = parse_bound("odd", "FOR VALUES FROM ('2026-10-19 19:00:00.5-05') TO ('2026-10-21 05:30:00+05:30')")
+    assert odd.start == _utc(2026, 10, 20, 0, 0, 0, 500000) and odd.end == _utc(2026, 10, 21)
+    assert partition_name(date(2026, 10, 21)) == "health_check_results_p20261021"
+
+    # Today is in the legacy partition, the next two days exist already
+    missing = days_to_create([legacy, day, shifted], date(2026, 10, 18), days_ahead=4)
+    assert missing == [date(2026, 10, 21), date(2026, 10, 22)]
+
+    # Only partitions wholly before the cutoff go; the legacy one once all of it has aged out
+    assert [p.name for p in expired([legacy, day, shifted], _utc(2026, 10, 19))] == ["health_check_results_legacy"]
+    assert [p.name for p in expired([legacy, day, shifted], _utc(2026, 10, 20, 12))] == [
+        "health_check_results_legacy", "health_check_results_p20261019"
+    ]
+
+
+def test_maintenance_is_a_no_op_without_partitioning(db):
+    result = maintain_partitions(db, days_ahead=7, retention_days=14, now=_utc(2026, 10, 18, 9))
+    assert result == {"partitioned": False, "created": [], "dropped": [], "default_rows": 0}
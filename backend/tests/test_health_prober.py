@@ -0,0 +1,201 @@
+import asyncio
+import time
+from collections import Counter
+
+import httpx
+
+from app.domain.monitoring.models import Endpoint, HealthCheckResult, MonitoredService
+from app.domain.monitoring.service import MonitoringService
+from app.services.health_ingest import CheckResultBuffer
+from app.services.health_prober import CheckResult, HealthProber, ProbeTarget
+from app.services.health_scheduler import CheckScheduler
+
+NOW = 1_800_000_000.0
+
+
+def test_prober_limits_per_host_concurrency_and_ingests_in_batches():
+    in_flight = Counter()
+    peak = Counter()
+
+    async def handler(request):
+        host = request.url.host
+        in_flight[host] += 1
+        peak[host] = max(peak[host], in_flight[host])
+        await asyncio.sleep(0.01)
+        in_flight[host] -= 1
+        if host == "down.internal":
+            raise httpx.ConnectError("connection refused")
+        return httpx.Response(503 if request.url.path == "/broken" else 200)
+
+    targets = [ProbeTarget(i, f"http://busy.internal/{i}") for i in range(40)]
+    targets += [ProbeTarget(100 + i, f"http://quiet-{i}.internal/") for i in range(5)]
+    targets += [ProbeTarget(200, "http://down.internal/"), ProbeTarget(201, "http://other.internal/broken", "HEAD")]
+    batches = []
+
+    prober = HealthProber(
+        max_connections=20, per_host_limit=4, batch_size=10, transport=httpx.MockTransport(handler)
+    )
+
+    async def run():
+        try:
+            return await prober.probe(targets, batches.append)
+        finally:
+            await prober.aclose()
+
+    assert asyncio.run(run()) == len(targets)
+
+    assert peak["busy.internal"] == 4
+    # Other hosts weren't stuck behind the busy one
+    assert all(peak[f"quiet-{i}.internal"] == 1 for i in range(5))
+    assert [len(batch) for batch in batches] == [10, 10, 10, 10, 7]
+
+    results = {result.endpoint_id: result for batch in batches for result in batch}
+    assert len(results) == len(targets)
+    assert results[0].success and results[0].status_code == 200
+    assert not results[200].success and results[200].status_code is None
+    assert "connection refused" in results[200].error_message
+    assert not results[201].success and results[201].status_code == 503
+
+
+def test_probe_targets_are_sharded_and_results_recorded(db):
+    monitored = MonitoredService(name="Payments", status="healthy")
+    db.add(monitored)
+    db.commit()
+    endpoints = [Endpoint(service_id=monitored.id, name=f"ep{i}", url=f"http://payments.internal/{i}") for i in range(6)]
+    endpoints.append(Endpoint(service_id=monitored.id, name="off", url="http://payments.internal/off", is_active=False))
+    db.add_all(endpoints)
+    db.commit()
+
+    service = MonitoringService()
+    active = {ep.id for ep in endpoints if ep.is_active}
+    shards = [{row.id for row in service.get_probe_targets(db, shard, 3)} for shard in range(3)]
+    assert set().union(*shards) >= active
+    assert not (shards[0] & shards[1]) and not (shards[1] & shards[2])
+    mine = [ProbeTarget(*row) for row in service.get_probe_targets(db) if row.id in active]
+    assert len(mine) == 6
+
+    async def handler(request):
+        return httpx.Response(200)
+
+    prober = HealthProber(batch_size=4, transport=httpx.MockTransport(handler))
+
+    async def run():
+        try:
+            await prober.probe(mine, lambda batch: service.record_check_results(db, batch))
+        finally:
+            await prober.aclose()
+
+    asyncio.run(run())
+    recorded = db.query(HealthCheckResult).filter(HealthCheckResult.endpoint_id.in_(active)).all()
+    assert len(recorded) == 6 and all(row.success for row in recorded)
+
+
+def test_check_scheduler_spreads_endpoints_and_honours_intervals(fake_redis):
+    scheduler = CheckScheduler(fake_redis, shard=0, min_interval=10)
+    targets = [ProbeTarget(i, f"http://svc.internal/{i}", check_interval=60) for i in range(1, 1001)]
+    slow = ProbeTarget(5000, "http://svc.internal/slow", check_interval=3600)
+    scheduler.sync(targets + [slow], now=NOW)
+
+    # First checks are spread over the minute instead of all landing on it
+    per_second = Counter(int(score - NOW) for score in fake_redis.data[scheduler.key].values() if score < NOW + 60)
+    assert len(per_second) == 60 and max(per_second.values()) < 40
+
+    first_minute = []
+    for second in range(61):
+        first_minute += [t.endpoint_id for t in scheduler.pop_due(now=NOW + second)]
+    assert sorted(first_minute) == list(range(1, 1001))
+    # Each was pushed one interval on; nothing is due again until its next minute
+    assert scheduler.pop_due(now=NOW + 60) == []
+    assert len(scheduler.pop_due(now=NOW + 120)) == 1000
+
+    # A prober restart keeps the existing due times
+    restarted = CheckScheduler(fake_redis, shard=0)
+    before = dict(fake_redis.data[scheduler.key])
+    restarted.sync(targets + [slow], now=NOW + 500)
+    assert fake_redis.data[scheduler.key] == before
+
+    # Shortening an interval applies now, not after the old hour is up
+    restarted.sync(targets + [ProbeTarget(5000, slow.url, check_interval=30)], now=NOW + 600)
+    assert fake_redis.data[scheduler.key]["5000"] < NOW + 630
+
+    # Removed endpoints drop out, and so do stale entries another process left behind
+    fake_redis.zadd(scheduler.key, {"9999": NOW})
+    restarted.sync(targets[:10], now=NOW + 700)
+    due = restarted.pop_due(now=NOW + 10000)
+    assert sorted(t.endpoint_id for t in due) == list(range(1, 11))
+    assert len(restarted) == 10
+    # Missed checks are skipped rather than fired back to back
+    assert all(NOW + 10000 < score <= NOW + 10060 for score in fake_redis.data[scheduler.key].values())
+
+
+def test_bulk_ingestion_groups_status_updates_by_service(db, monkeypatch):
+    from sqlalchemy import event
+    from app.domain.incidents.models import Incident
+
+    payments = MonitoredService(name="Payments", status="healthy")
+    search = MonitoredService(name="Search", status="down")
+    db.add_all([payments, search])
+    db.commit()
+    pay_eps = [Endpoint(service_id=payments.id, name=f"pay{i}", url=f"http://pay.internal/{i}") for i in range(3)]
+    search_eps = [Endpoint(service_id=search.id, name=f"search{i}", url=f"http://search.internal/{i}") for i in range(3)]
+    db.add_all(pay_eps + search_eps)
+    db.commit()
+
+    results = []
+    for round_ in range(50):
+        for ep in search_eps:
+            results.append(CheckResult(ep.id, True, 12.0, 200))
+        for ep in pay_eps:
+            # pay1 fails in the last round only
+            ok = not (ep.name == "pay1" and round_ == 49)
+            results.append(CheckResult(ep.id, ok, 30.0, 200 if ok else None, None if ok else "timed out"))
+
+    published = []
+    monkeypatch.setattr(MonitoringService, "_publish_check_events", lambda self, events: published.extend(events))
+    statements = []
+
+    def count(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    connection = db.connection()
+    event.listen(connection, "before_cursor_execute", count)
+    try:
+        assert MonitoringService().record_check_results(db, results) == 300
+    finally:
+        event.remove(connection, "before_cursor_execute", count)
+
+    # Statements track the batch, not the 300 checks in it (per rollup table: create missing buckets, lock, update)
+    assert len(statements) <= 13
+    assert db.query(HealthCheckResult).filter(HealthCheckResult.endpoint_id.in_([ep.id for ep in pay_eps + search_eps])).count() == 300
+    db.refresh(payments)
+    db.refresh(search)
+    assert payments.status == "down" and search.status == "healthy"
+    incidents = db.query(Incident).filter(Incident.service_id == payments.id).all()
+    assert len(incidents) == 1 and "pay1" in incidents[0].description and "timed out" in incidents[0].description
+    assert [e["endpoint_id"] for e in published] == [pay_eps[1].id]
+
+    # An open incident isn't duplicated by the next batch
+    MonitoringService().record_check_results(db, [CheckResult(pay_eps[0].id, False, 1.0, 500)])
+    assert db.query(Incident).filter(Incident.service_id == payments.id).count() == 1
+
+
+def test_result_buffer_writes_full_batches_and_flushes_the_rest():
+    written = []
+    buffer = CheckResultBuffer(written.append, batch_size=100, flush_interval=0)
+    for i in range(7):
+        buffer.add([CheckResult(i * 30 + j, True, 1.0, 200) for j in range(30)])
+    # Written once 100 had collected, never more than 100 per write
+    assert [len(batch) for batch in written] == [100, 20]
+    assert len(buffer) == 90
+    buffer.flush()
+    assert [len(batch) for batch in written] == [100, 20, 90]
+    assert sorted(r.endpoint_id for batch in written for r in batch) == list(range(210))
+
+    # A partial batch goes out on its own once flush_interval has passed
+    timed = []
+    buffer = CheckResultBuffer(timed.append, batch_size=100, flush_interval=0.05)
+    buffer.add([CheckResult(1, True, 1.0, 200)])
+    deadline = time.monotonic() + 2
+    while not timed and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert [len(batch) for batch in timed] == [1]
@@ -0,0 +1,160 @@
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.api.deps import get_current_user
+from app.main import app
+from app.domain.monitoring.models import Endpoint, HealthCheckRollupHour, HealthCheckRollupMinute, MonitoredService
+from app.domain.monitoring.service import MonitoringService
+from app.domain.user.models import User
+from app.services.health_prober import CheckResult
+from app.services.health_rollups import LatencySketch, bucket_start, prune_minute_rollups, summarize
+
+# Recent enough that minute rollups are still kept for the whole fixture
+START = bucket_start(datetime.now(timezone.utc) - timedelta(days=4), 86400)
+
+mock_user = User(id=1, email="test@example.com", is_active=True, role="user")
+
+@pytest.fixture
+def auth_client(client):
+    app.dependency_overrides[get_current_user] = lambda: mock_user
+    yield client
+
+
+def _exact_quantile(values, q):
+    values = sorted(values)
+    return values[int(q * (len(values) - 1))]
+
+
+def test_latency_sketch_merges_and_stays_within_accuracy():
+    rng = random.Random(7)
+    values = [rng.lognormvariate(4, 1) for _ in range(9000)] + [0.0] * 100
+    parts = [LatencySketch(), LatencySketch(), LatencySketch()]
+    for i, value in enumerate(values):
+        parts[i % 3].add(value)
+    merged = LatencySketch()
+    for part in parts:
+        # Round-trips through the JSON column
+        merged.merge(LatencySketch.from_dict(part.to_dict()))
+
+    assert merged.count == len(values)
+    for q in (0.5, 0.9, 0.95, 0.99):
+        exact = _exact_quantile(values, q)
+        assert abs(merged.quantile(q) - exact) <= exact * 0.02
+    assert merged.quantile(0.0) == 0.0
+    assert len(merged.bins) < 300
+
+
+@pytest.fixture
+def checked_endpoint(db, monkeypatch):
+    monkeypatch.setattr(MonitoringService, "_publish_check_events", lambda self, events: None)
+    monitored = MonitoredService(name="Checkout", status="healthy")
+    db.add(monitored)
+    db.commit()
+    endpoint = Endpoint(service_id=monitored.id, name="cart", url="http://checkout.internal/cart")
+    db.add(endpoint)
+    db.commit()
+
+    # Three days at one check every five minutes, ingested in batches
+    rng = random.Random(11)
+    results = []
+    for i in range(3 * 24 * 12):
+        ok = i % 17 != 0
+        results.append(CheckResult(endpoint.id, ok, rng.uniform(20, 400), 200 if ok else 503, checked_at=START + timedelta(minutes=5 * i)))
+    service = MonitoringService()
+    for start in range(0, len(results), 100):
+        service.record_check_results(db, results[start:start + 100])
+    return endpoint, results
+
+
+def test_rollups_are_updated_on_ingest_and_summaries_use_the_coarsest_rows(db, checked_endpoint):
+    endpoint, results = checked_endpoint
+    assert db.query(HealthCheckRollupHour).filter(HealthCheckRollupHour.endpoint_id == endpoint.id).count() == 72
+    assert db.query(HealthCheckRollupMinute).filter(HealthCheckRollupMinute.endpoint_id == endpoint.id).count() == len(results)
+
+    window_start = START + timedelta(hours=5, minutes=17)
+    window_end = START + timedelta(days=2, hours=3, minutes=42)
+    inside = [r for r in results if window_start <= r.checked_at < window_end]
+    # Whole hours must come from the hourly rollups: drop the minute rows under them
+    db.query(HealthCheckRollupMinute).filter(
+        HealthCheckRollupMinute.endpoint_id == endpoint.id,
+        HealthCheckRollupMinute.bucket_start >= START + timedelta(hours=6),
+        HealthCheckRollupMinute.bucket_start < START + timedelta(days=2, hours=3),
+    ).delete()
+
+    totals = summarize(db, [endpoint.id], window_start, window_end)
+    assert totals.count == len(inside)
+    assert totals.failures == sum(not r.success for r in inside)
+    assert totals.latency_min == pytest.approx(min(r.latency_ms for r in inside))
+    assert totals.latency_max == pytest.approx(max(r.latency_ms for r in inside))
+    assert totals.latency_avg == pytest.approx(sum(r.latency_ms for r in inside) / len(inside))
+    exact_p95 = _exact_quantile([r.latency_ms for r in inside], 0.95)
+    assert abs(totals.sketch.quantile(0.95) - exact_p95) <= exact_p95 * 0.03
+
+    # A late batch for an hour that already has rows merges into them
+    late = CheckResult(endpoint.id, False, 5000.0, 500, checked_at=START + timedelta(hours=1, minutes=1))
+    MonitoringService().record_check_results(db, [late])
+    hour = summarize(db, [endpoint.id], START + timedelta(hours=1), START + timedelta(hours=2))
+    assert hour.count == 13 and hour.latency_max == 5000.0
+
+
+def test_minute_rollups_past_retention_are_pruned(db, checked_endpoint):
+    endpoint, results = checked_endpoint
+    prune_minute_rollups(db, START + timedelta(days=1))
+    minutes = db.query(HealthCheckRollupMinute).filter(HealthCheckRollupMinute.endpoint_id == endpoint.id).count()
+    assert minutes == sum(r.checked_at >= START + timedelta(days=1) for r in results)
+    # Hourly history stays, and whole-hour summaries of the pruned day still add up
+    assert db.query(HealthCheckRollupHour).filter(HealthCheckRollupHour.endpoint_id == endpoint.id).count() == 72
+    assert summarize(db, [endpoint.id], START, START + timedelta(days=1)).count == 24 * 12
+
+
+def test_windows_past_minute_retention_fall_back_to_hours(db, auth_client, monkeypatch):
+    monkeypatch.setattr(MonitoringService, "_publish_check_events", lambda self, events: None)
+    monitored = MonitoredService(name="Archive", status="healthy")
+    db.add(monitored)
+    db.commit()
+    endpoint = Endpoint(service_id=monitored.id, name="old", url="http://archive.internal/")
+    db.add(endpoint)
+    db.commit()
+    old = bucket_start(datetime.now(timezone.utc) - timedelta(days=30), 86400)
+    results = [CheckResult(endpoint.id, True, 50.0, 200, checked_at=old + timedelta(minutes=5 * i)) for i in range(36)]
+    MonitoringService().record_check_results(db, results)
+    prune_minute_rollups(db)
+
+    # Ragged edges read their whole hour from the hourly rollups
+    totals = summarize(db, [endpoint.id], old + timedelta(minutes=17), old + timedelta(hours=2, minutes=7))
+    assert totals.count == 36
+
+    # A short window back then still gets a series, hourly
+    response = auth_client.get(
+        f"/api/v1/monitoring/endpoints/{endpoint.id}/stats",
+        params={"start": old.isoformat(), "end": (old + timedelta(hours=3)).isoformat()},
+    )
+    stats = response.json()
+    assert stats["resolution_seconds"] == 3600
+    assert [point["count"] for point in stats["series"]] == [12, 12, 12]
+
+
+def test_endpoint_stats_api(auth_client, checked_endpoint):
+    endpoint, results = checked_endpoint
+    response = auth_client.get(
+        f"/api/v1/monitoring/endpoints/{endpoint.id}/stats",
+        params={"start": START.isoformat(), "end": (START + timedelta(days=3)).isoformat()},
+    )
+    assert response.status_code == 200
+    stats = response.json()
+    assert stats["count"] == len(results)
+    assert stats["resolution_seconds"] == 3600 and len(stats["series"]) == 72
+    assert stats["series"][0]["count"] == 12
+    assert stats["availability"] == pytest.approx(100.0 * sum(r.success for r in results) / len(results))
+    assert stats["latency_p50"] <= stats["latency_p95"] <= stats["latency_p99"] <= stats["latency_max"] * 1.02
+
+    # Short windows get minute buckets
+    response = auth_client.get(
+        f"/api/v1/monitoring/endpoints/{endpoint.id}/stats",
+        params={"start": START.isoformat(), "end": (START + timedelta(hours=2)).isoformat()},
+    )
+    assert response.json()["resolution_seconds"] == 60 and len(response.json()["series"]) == 24
+
+    assert auth_client.get("/api/v1/monitoring/endpoints/999999/stats").status_code == 404
@@ -0,0 +1,118 @@
+import time
+
+from app.services.workflow_dispatch import WorkflowDispatcher
+
+
+def _dispatcher(fake_redis, sent, **caps):
+    return WorkflowDispatcher(fake_redis, sent.extend, **caps)
+
+
+def test_owner_and_workflow_caps(fake_redis):
+    sent = []
+    dispatcher = _dispatcher(fake_redis, sent, max_per_owner=3, max_per_workflow=2)
+
+    # Owner 1 floods workflow 10, with a single run of workflow 11 at the back
+    dispatcher.enqueue(1, [(10, run_id) for run_id in range(1, 7)] + [(11, 7)])
+    assert dispatcher.dispatch() == 3
+    # Workflow 10 is capped at 2, so workflow 11's run jumps ahead of the backlog
+    assert sent == [(10, 1, 1), (10, 2, 1), (11, 7, 1)]
+
+    # Nothing more fits until a run finishes
+    assert dispatcher.dispatch() == 0
+
+    dispatcher.release(1, 10, 1)
+    assert dispatcher.dispatch() == 1
+    assert sent[-1] == (10, 3, 1)
+
+
+def test_weighted_fair_share_between_owners(fake_redis):
+    sent = []
+    dispatcher = _dispatcher(fake_redis, sent, max_per_owner=100, max_per_workflow=100)
+
+    dispatcher.enqueue(1, [(1, run_id) for run_id in range(100)], plan="free")
+    dispatcher.enqueue(2, [(2, run_id) for run_id in range(100, 200)], plan="enterprise")
+    dispatcher.enqueue(3, [(3, 500)], plan="free")
+
+    assert dispatcher.dispatch(limit=21) == 21
+    per_owner = {}
+    for _, _, owner_id in sent:
+        per_owner[owner_id] = per_owner.get(owner_id, 0) + 1
+    # The small tenant isn't starved and the enterprise plan gets 4x the free share
+    assert per_owner[3] == 1
+    assert per_owner[2] == 4 * per_owner[1]
+
+
+def test_dispatch_round_trips_do_not_grow_with_the_batch(fake_redis, monkeypatch):
+    sent = []
+    dispatcher = _dispatcher(fake_redis, sent, max_per_owner=5, max_per_workflow=2)
+    for owner_id in range(1, 51):
+        dispatcher.enqueue(owner_id, [(owner_id * 10 + run_id % 3, owner_id * 100 + run_id) for run_id in range(8)])
+
+    pipelines = []
+    pipeline = fake_redis.pipeline
+    monkeypatch.setattr(fake_redis, "pipeline", lambda **kwargs: pipelines.append(1) or pipeline(**kwargs))
+    assert dispatcher.dispatch() == 250
+    # Owner state, workflow counts, leases; every queue still has runs left
+    assert len(pipelines) == 3
+
+
+def test_expired_lease_frees_slot(fake_redis):
+    sent = []
+    dispatcher = _dispatcher(fake_redis, sent, max_per_owner=1, lease_seconds=0.05)
+
+    dispatcher.enqueue(1, [(1, 1), (1, 2)])
+    assert dispatcher.dispatch() == 1
+    assert dispatcher.dispatch() == 0
+    # The first run's worker never released its slot, but the lease has lapsed
+    time.sleep(0.1)
+    assert dispatcher.dispatch() == 1
+    assert [run_id for _, run_id, _ in sent] == [1, 2]
+
+
+def test_dispatch_skips_while_locked(fake_redis):
+    sent = []
+    dispatcher = _dispatcher(fake_redis, sent)
+    dispatcher.enqueue(1, [(1, 1)])
+    fake_redis.set("wf:dispatch:lock", "other")
+    assert dispatcher.dispatch() == 0
+    fake_redis.delete("wf:dispatch:lock")
+    assert dispatcher.dispatch() == 1
+
+
+def test_dispatch_never_releases_a_lock_it_lost(fake_redis, monkeypatch):
+    sent = []
+    dispatcher = _dispatcher(fake_redis, sent)
+    dispatcher.enqueue(1, [(1, 1)])
+    select = dispatcher._select
+
+    def slow_select(limit):
+        # The lease ran out mid-pass and another dispatcher took the lock
+        fake_redis.data["wf:dispatch:lock"] = "other"
+        return select(limit)
+
+    monkeypatch.setattr(dispatcher, "_select", slow_select)
+    assert dispatcher.dispatch() == 1
+    assert fake_redis.get("wf:dispatch:lock") == "other"
+
+
+def test_failed_send_requeues_runs_and_frees_slots(fake_redis):
+    sent = []
+    broker = {"up": False}
+
+    def send(batch):
+        if not broker["up"]:
+            raise ConnectionError("broker unreachable")
+        sent.extend(batch)
+
+    dispatcher = WorkflowDispatcher(fake_redis, send, max_per_owner=2)
+    dispatcher.enqueue(1, [(1, 1), (1, 2), (1, 3)])
+    dispatcher.enqueue(2, [(2, 4)])
+    assert dispatcher.dispatch() == 0
+
+    # Nothing was lost or left holding a slot: the same runs go out, in order, once the broker is back
+    broker["up"] = True
+    assert dispatcher.dispatch() == 3
+    assert sorted(sent) == [(1, 1, 1), (1, 2, 1), (2, 4, 2)]
+    dispatcher.release(1, 1, 1)
+    assert dispatcher.dispatch() == 1
+    assert sent[-1] == (1, 3, 1)
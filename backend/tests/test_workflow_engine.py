@@ -1,3 +1,5 @@
+import json
+
 import pytest
 from app.services.workflow_engine import WorkflowEngine
 from app.domain.workflow.models import Workflow
@@ -18,6 +20,8 @@ class MockRedis:
 
 # Patch redis in the module
 import app.services.workflow_engine
+import app.services.workflow_actions
+import app.services.workflow_context
 app.services.workflow_engine.redis = MockRedis
 
 def test_workflow_engine_graph_traversal():
@@ -47,10 +51,12 @@ def test_workflow_engine_graph_traversal():
     class MockWorkflow:
         id = 999
         name = "Test Flow"
+        updated_at = None
         steps = [steps_data] # The JSON column
+        current_version_id = None # Not saved through the API, so compiled from steps
     
     class MockDB:
-        def query(self, model):
+        def query(self, *entities):
             return self
         def filter(self, *args):
             return self
@@ -65,10 +71,10 @@ def test_workflow_engine_graph_traversal():
     executed_steps = []
     
     class TestableEngine(WorkflowEngine):
-        def _execute_step(self, step, workflow_id, index):
+        def _execute_step(self, step, workflow_id, index, context=None, handler=None):
             executed_steps.append(step['id'])
             # Call original to process logic (like condition evaluation)
-            return super()._execute_step(step, workflow_id, index)
+            return super()._execute_step(step, workflow_id, index, context, handler)
             
     test_engine = TestableEngine()
     test_engine.execute_workflow(MockDB(), 999)
@@ -102,18 +108,20 @@ def test_workflow_engine_condition_false():
     class MockWorkflow:
         id = 999
         name = "Test Flow False"
+        updated_at = None
         steps = [steps_data]
+        current_version_id = None
         
     class MockDB:
-        def query(self, model): return self
+        def query(self, *entities): return self
         def filter(self, *args): return self
         def first(self): return MockWorkflow()
         
     executed_steps = []
     class TestableEngine(WorkflowEngine):
-        def _execute_step(self, step, workflow_id, index):
+        def _execute_step(self, step, workflow_id, index, context=None, handler=None):
             executed_steps.append(step['id'])
-            return super()._execute_step(step, workflow_id, index)
+            return super()._execute_step(step, workflow_id, index, context, handler)
             
     test_engine = TestableEngine()
     test_engine.execute_workflow(MockDB(), 999)
@@ -122,3 +130,881 @@ def test_workflow_engine_condition_false():
     assert "2" in executed_steps
     assert "4" in executed_steps  # False path
     assert "3" not in executed_steps # True path
+
+def _fan_out_graph(width):
+    # Trigger -> N independent actions
+    nodes = [{"id": "t", "type": "triggerNode", "data": {"label": "Start"}}]
+    edges = []
+    for i in range(width):
+        nodes.append({"id": f"a{i}", "type": "actionNode", "data": {"label": f"Action {i}", "actionType": "noop"}})
+        edges.append({"source": "t", "target": f"a{i}", "sourceHandle": None})
+    return {"nodes": nodes, "edges": edges}
+
+def _mock_db(steps_data):
+    class MockWorkflow:
+        id = 999
+        name = "Fan Out"
+        updated_at = None
+        steps = [steps_data]
+        current_version_id = None
+
+    class MockDB:
+        def query(self, *entities): return self
+        def filter(self, *args): return self
+        def first(self): return MockWorkflow()
+
+    return MockDB()
+
+def test_workflow_engine_parallel_fan_out():
+    import threading
+    import time
+
+    lock = threading.Lock()
+    active = {"now": 0, "peak": 0}
+    executed_steps = []
+
+    class SlowEngine(WorkflowEngine):
+        def _execute_step(self, step, workflow_id, index, context=None, handler=None):
+            with lock:
+                active["now"] += 1
+                active["peak"] = max(active["peak"], active["now"])
+                executed_steps.append(step['id'])
+            time.sleep(0.2)
+            with lock:
+                active["now"] -= 1
+            return super()._execute_step(step, workflow_id, index, context, handler)
+
+    started = time.time()
+    SlowEngine().execute_workflow(_mock_db(_fan_out_graph(6)), 999, max_concurrency=6)
+    elapsed = time.time() - started
+
+    assert sorted(executed_steps) == sorted(["t"] + [f"a{i}" for i in range(6)])
+    # Trigger + one wave of 6 parallel actions, not 7 sequential sleeps
+    assert elapsed < 0.2 * 4
+
+    # Concurrency limit is respected
+    active["peak"] = 0
+    executed_steps.clear()
+    SlowEngine().execute_workflow(_mock_db(_fan_out_graph(6)), 999, max_concurrency=2)
+    assert active["peak"] <= 2
+    assert len(executed_steps) == 7
+
+def _recording_engine(executed_steps):
+    class RecordingEngine(WorkflowEngine):
+        def _execute_step(self, step, workflow_id, index, context=None, handler=None):
+            executed_steps.append(step['id'])
+            return super()._execute_step(step, workflow_id, index, context, handler)
+    return RecordingEngine()
+
+def test_workflow_engine_stacked_diamonds_run_each_node_once():
+    # t -> (l0, r0) -> j0 -> (l1, r1) -> j1 ... Without join tracking j_k runs 2^(k+1) times
+    depth = 12
+    nodes = [{"id": "j-1", "type": "triggerNode", "data": {"label": "Start"}}]
+    edges = []
+    for k in range(depth):
+        for side in ("l", "r"):
+            nodes.append({"id": f"{side}{k}", "type": "actionNode", "data": {"actionType": "noop"}})
+            edges.append({"source": f"j{k-1}", "target": f"{side}{k}"})
+            edges.append({"source": f"{side}{k}", "target": f"j{k}"})
+        nodes.append({"id": f"j{k}", "type": "actionNode", "data": {"actionType": "noop"}})
+
+    executed_steps = []
+    _recording_engine(executed_steps).execute_workflow(_mock_db({"nodes": nodes, "edges": edges}), 999)
+
+    assert len(executed_steps) == len(nodes)
+    assert len(set(executed_steps)) == len(nodes)
+    # Joins wait for both branches
+    for k in range(depth):
+        assert executed_steps.index(f"j{k}") > executed_steps.index(f"l{k}")
+        assert executed_steps.index(f"j{k}") > executed_steps.index(f"r{k}")
+
+def test_workflow_engine_condition_branches_merge():
+    # Trigger -> Condition -> (true: A / false: B) -> Merge -> After
+    steps_data = {
+        "nodes": [
+            {"id": "1", "type": "triggerNode", "data": {"label": "Start"}},
+            {"id": "2", "type": "conditionNode", "data": {"label": "Check", "condition": "true"}},
+            {"id": "3", "type": "actionNode", "data": {"label": "A", "actionType": "noop"}},
+            {"id": "4", "type": "actionNode", "data": {"label": "B", "actionType": "noop"}},
+            {"id": "5", "type": "actionNode", "data": {"label": "Merge", "actionType": "noop"}},
+            {"id": "6", "type": "actionNode", "data": {"label": "After", "actionType": "noop"}},
+            {"id": "7", "type": "actionNode", "data": {"label": "Only after B", "actionType": "noop"}},
+        ],
+        "edges": [
+            {"source": "1", "target": "2", "sourceHandle": None},
+            {"source": "2", "target": "3", "sourceHandle": "true"},
+            {"source": "2", "target": "4", "sourceHandle": "false"},
+            {"source": "3", "target": "5", "sourceHandle": None},
+            {"source": "4", "target": "5", "sourceHandle": None},
+            {"source": "5", "target": "6", "sourceHandle": None},
+            {"source": "4", "target": "7", "sourceHandle": None},
+        ]
+    }
+
+    executed_steps = []
+    _recording_engine(executed_steps).execute_workflow(_mock_db(steps_data), 999)
+
+    assert executed_steps == ["1", "2", "3", "5", "6"]
+
+def test_compiled_plan_cache():
+    from app.services.workflow_plan import compile_plan, invalidate_workflow_plans
+
+    steps_data = {
+        "nodes": [
+            {"id": "1", "type": "triggerNode", "data": {"label": "Start"}},
+            {"id": "2", "type": "conditionNode", "data": {"label": "Check", "condition": "true"}},
+            {"id": "3", "type": "actionNode", "data": {"label": "A", "actionType": "noop"}},
+            {"id": "4", "type": "actionNode", "data": {"label": "Orphan", "actionType": "noop"}},
+        ],
+        "edges": [
+            {"source": "1", "target": "2", "sourceHandle": None},
+            {"source": "2", "target": "3", "sourceHandle": "true"},
+            {"source": "2", "target": "missing", "sourceHandle": "false"},
+        ]
+    }
+
+    plan = compile_plan(999, steps_data)
+    assert plan.start_node_id == "1"
+    assert plan.order == ("1", "2", "3")
+    assert plan.successors["2"] == (("true", ("3",)),)
+    assert plan.join_counts["3"] == 1
+    assert "4" not in plan.join_counts
+
+    # The graph is only loaded and compiled once per (id, updated_at)
+    loads = []
+    class CountingEngine(WorkflowEngine):
+        def _compile(self, db, workflow_id):
+            loads.append(workflow_id)
+            return super()._compile(db, workflow_id)
+
+    engine = CountingEngine()
+    db = _mock_db(steps_data)
+    engine.execute_workflow(db, 999)
+    engine.execute_workflow(db, 999)
+    assert loads == [999]
+
+    invalidate_workflow_plans(999)
+    engine.execute_workflow(db, 999)
+    assert loads == [999, 999]
+
+def test_http_actions_share_pooled_transport(monkeypatch):
+    import httpx
+    import threading
+    import time
+    from app.services.workflow_http import HttpTransport
+
+    lock = threading.Lock()
+    seen = {"requests": 0, "active": 0, "peak": 0}
+
+    def handler(request):
+        with lock:
+            seen["requests"] += 1
+            seen["active"] += 1
+            seen["peak"] = max(seen["peak"], seen["active"])
+        time.sleep(0.05)
+        with lock:
+            seen["active"] -= 1
+        return httpx.Response(200, json={"ok": True})
+
+    transport = HttpTransport(per_host_limit=2, transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(app.services.workflow_actions, "get_http_transport", lambda: transport)
+
+    steps_data = _fan_out_graph(6)
+    for node in steps_data["nodes"][1:]:
+        node["data"].update({"actionType": "http-request", "url": "http://internal.example/api", "timeout": 2})
+
+    engine = WorkflowEngine()
+    engine.execute_workflow(_mock_db(steps_data), 999, max_concurrency=6)
+    client = transport.client
+    engine.execute_workflow(_mock_db(steps_data), 999, max_concurrency=6)
+
+    assert seen["requests"] == 12
+    assert seen["peak"] <= 2  # Per-host limit
+    assert transport.client is client  # Same pool across runs
+
+def test_events_are_batched_and_filtered_by_verbosity():
+    class PipelineRedis:
+        def __init__(self):
+            self.round_trips = 0
+            self.published = []
+        def pipeline(self, transaction=True):
+            return self
+        def publish(self, channel, message):
+            self.published.append((channel, message))
+        def execute(self):
+            self.round_trips += 1
+
+    fake_redis = PipelineRedis()
+    engine = WorkflowEngine()
+    engine.events.redis = fake_redis
+    engine.events.flush_interval = 60
+
+    engine.execute_workflow(_mock_db(_fan_out_graph(6)), 999)
+    # workflow_start + 7 x (step_start, step_finish) + workflow_finish in one round trip
+    assert len(fake_redis.published) == 16
+    assert fake_redis.round_trips == 1
+    assert all(channel == "events" for channel, _ in fake_redis.published)
+
+    fake_redis.published.clear()
+    engine.execute_workflow(_mock_db(_fan_out_graph(6)), 999, verbosity="summary")
+    assert len(fake_redis.published) == 9
+
+    fake_redis.published.clear()
+    engine.execute_workflow(_mock_db(_fan_out_graph(6)), 999, verbosity="final")
+    assert len(fake_redis.published) == 1
+    assert '"workflow_finish"' in fake_redis.published[0][1]
+
+def test_overlapping_runs_keep_their_own_verbosity():
+    import threading
+
+    published = []
+
+    class ListRedis:
+        def pipeline(self, transaction=True):
+            return self
+        def publish(self, channel, message):
+            published.append(json.loads(message))
+        def execute(self):
+            pass
+
+    both_running = threading.Barrier(2, timeout=5)
+
+    class OverlappingEngine(WorkflowEngine):
+        def _execute_step(self, step, workflow_id, index, context=None, handler=None):
+            # Neither run's step finishes until both runs are in flight
+            both_running.wait()
+            return super()._execute_step(step, workflow_id, index, context, handler)
+
+    engine = OverlappingEngine()
+    engine.events.redis = ListRedis()
+    engine.events.flush_interval = 0
+    runs = [
+        threading.Thread(target=engine.execute_workflow, args=(_mock_db(_fan_out_graph(1)), 999), kwargs={"verbosity": level})
+        for level in ("final", "full")
+    ]
+    for run in runs:
+        run.start()
+    for run in runs:
+        run.join()
+
+    # Every event of the full run (trigger and action steps), plus the final run's finish
+    types = sorted(event["type"] for event in published)
+    assert types == ["step_finish"] * 2 + ["step_start"] * 2 + ["workflow_finish"] * 2 + ["workflow_start"]
+
+def test_event_flushes_publish_in_order():
+    import threading
+    import time
+    from app.services.workflow_events import EventBatcher
+
+    published = []
+    first_publish = threading.Event()
+    release_first = threading.Event()
+
+    class SlowRedis:
+        def pipeline(self, transaction=True):
+            redis_client = self
+            queued = []
+            class Pipe:
+                def publish(self, channel, message):
+                    queued.append(json.loads(message)["n"])
+                def execute(self):
+                    if not first_publish.is_set():
+                        first_publish.set()
+                        release_first.wait(5)
+                    published.extend(queued)
+            return Pipe()
+
+    batcher = EventBatcher(SlowRedis(), batch_size=100, flush_interval=0)
+    batcher.emit({"n": 1})
+    first = threading.Thread(target=batcher.flush)
+    first.start()
+    first_publish.wait(5)
+    # A second flush while the first batch is still on the wire must wait its turn
+    batcher.emit({"n": 2})
+    second = threading.Thread(target=batcher.flush)
+    second.start()
+    time.sleep(0.05)
+    release_first.set()
+    first.join()
+    second.join()
+    assert published == [1, 2]
+
+def test_workflow_run_resumes_from_checkpoint(db):
+    from app.domain.workflow.models import WorkflowRun, StepRun
+    from app.repositories.workflow_run_repo import WorkflowRunRepository
+
+    steps_data = {
+        "nodes": [
+            {"id": "1", "type": "triggerNode", "data": {"label": "Start"}},
+            {"id": "2", "type": "actionNode", "data": {"label": "Restart", "actionType": "noop"}},
+            {"id": "3", "type": "actionNode", "data": {"label": "Notify", "actionType": "noop"}},
+            {"id": "4", "type": "actionNode", "data": {"label": "Close", "actionType": "noop"}},
+        ],
+        "edges": [
+            {"source": "1", "target": "2"},
+            {"source": "2", "target": "3"},
+            {"source": "3", "target": "4"},
+        ]
+    }
+    workflow = Workflow(name="Resumable", owner_id=1, steps=[steps_data])
+    db.add(workflow)
+    db.commit()
+    run = WorkflowRunRepository().create(db, workflow.id)
+
+    class WorkerLost(BaseException):
+        pass
+
+    executed_steps = []
+    class CrashingEngine(WorkflowEngine):
+        def _execute_step(self, step, workflow_id, index, context=None, handler=None):
+            if step['id'] == "3":
+                raise WorkerLost()
+            executed_steps.append(step['id'])
+            return super()._execute_step(step, workflow_id, index, context, handler)
+
+    with pytest.raises(WorkerLost):
+        CrashingEngine().execute_workflow(db, workflow.id, run_id=run.id)
+
+    db.refresh(run)
+    assert run.status == "running"
+    assert sorted(step.node_id for step in run.steps) == ["1", "2"]
+
+    # Redelivery: only the unfinished tail runs again
+    executed_steps.clear()
+    _recording_engine(executed_steps).execute_workflow(db, workflow.id, run_id=run.id)
+
+    db.refresh(run)
+    assert executed_steps == ["3", "4"]
+    assert run.status == "succeeded"
+    assert run.attempts == 2
+    assert [step.node_id for step in run.steps] == ["1", "2", "3", "4"]
+    assert db.query(StepRun).filter(StepRun.run_id == run.id).count() == 4
+
+    # A finished run is not executed again
+    executed_steps.clear()
+    _recording_engine(executed_steps).execute_workflow(db, workflow.id, run_id=run.id)
+    assert executed_steps == []
+
+def test_expression_language():
+    from app.services.workflow_expressions import ExpressionError, compile_expression
+
+    scope = {
+        "steps": {"http-1": {"status_code": 503, "body": {"pods": ["a", "b"]}}},
+        "prev": {"status_code": 200, "body": {"healthy": True}},
+        "input": {"service": "api"},
+    }
+    assert compile_expression("status_code == 200").evaluate(scope) is True
+    assert compile_expression("prev.body.healthy and not false").evaluate(scope) is True
+    assert compile_expression('steps["http-1"].status_code in [500, 502, 503]').evaluate(scope) is True
+    assert compile_expression('len(steps["http-1"].body.pods) > 1').evaluate(scope) is True
+    assert compile_expression("input.service == 'api' and missing == null").evaluate(scope) is True
+    assert compile_expression("200 <= status_code < 300").evaluate(scope) is True
+
+    # Compiled once, then served from cache
+    assert compile_expression("status_code == 200") is compile_expression("status_code == 200")
+
+    for bad in ["__import__('os')", "prev.__class__", "status_code ==", "open('/etc/passwd')", "'a' * 100000000", "2 ** 10"]:
+        with pytest.raises(ExpressionError):
+            compile_expression(bad).evaluate(scope)
+
+def test_blank_condition_is_false():
+    from app.services.workflow_actions import ConditionHandler
+    from app.services.workflow_expressions import validate_graph_expressions
+
+    for blank in ["", "   "]:
+        assert ConditionHandler().run({"condition": blank}, {}) == ("false", {"result": False})
+    graph = {"nodes": [
+        {"id": "1", "type": "conditionNode", "data": {"condition": ""}},
+        {"id": "2", "type": "conditionNode", "data": {"condition": "status_code =="}},
+    ]}
+    assert [error.split(":")[0] for error in validate_graph_expressions(graph)] == ["Node 2"]
+
+def test_condition_expression_on_upstream_output(monkeypatch):
+    import httpx
+    from app.services.workflow_http import HttpTransport
+
+    transport = HttpTransport(transport=httpx.MockTransport(lambda request: httpx.Response(503)))
+    monkeypatch.setattr(app.services.workflow_actions, "get_http_transport", lambda: transport)
+
+    steps_data = {
+        "nodes": [
+            {"id": "1", "type": "triggerNode", "data": {"label": "Start"}},
+            {"id": "2", "type": "actionNode", "data": {"actionType": "http-request", "url": "http://api.internal/health"}},
+            {"id": "3", "type": "conditionNode", "data": {"condition": "status_code == 200"}},
+            {"id": "4", "type": "actionNode", "data": {"label": "Healthy", "actionType": "noop"}},
+            {"id": "5", "type": "actionNode", "data": {"label": "Restart", "actionType": "noop"}},
+        ],
+        "edges": [
+            {"source": "1", "target": "2"},
+            {"source": "2", "target": "3"},
+            {"source": "3", "target": "4", "sourceHandle": "true"},
+            {"source": "3", "target": "5", "sourceHandle": "false"},
+        ]
+    }
+    executed_steps = []
+    _recording_engine(executed_steps).execute_workflow(_mock_db(steps_data), 999)
+    assert executed_steps == ["1", "2", "3", "5"]
+
+def test_http_retries_with_backoff(monkeypatch):
+    import httpx
+    from app.services.workflow_http import HttpTransport
+
+    attempts = []
+    def handler(request):
+        attempts.append(request.url.host)
+        if len(attempts) < 3:
+            return httpx.Response(502)
+        return httpx.Response(200)
+
+    transport = HttpTransport(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(app.services.workflow_actions, "get_http_transport", lambda: transport)
+
+    steps_data = {
+        "nodes": [
+            {"id": "1", "type": "triggerNode", "data": {}},
+            {"id": "2", "type": "actionNode", "data": {
+                "actionType": "http-request", "url": "http://flaky.internal/restart",
+                "retry": {"max_attempts": 4, "backoff": 0.001},
+            }},
+            {"id": "3", "type": "conditionNode", "data": {"condition": "status_code == 200"}},
+            {"id": "4", "type": "actionNode", "data": {"actionType": "noop"}},
+        ],
+        "edges": [
+            {"source": "1", "target": "2"},
+            {"source": "2", "target": "3"},
+            {"source": "3", "target": "4", "sourceHandle": "true"},
+        ]
+    }
+    executed_steps = []
+    _recording_engine(executed_steps).execute_workflow(_mock_db(steps_data), 999)
+
+    assert len(attempts) == 3
+    assert "4" in executed_steps
+
+def test_circuit_breaker_fails_fast_then_recovers():
+    import httpx
+    from app.services.workflow_http import HttpTransport
+    from app.services.workflow_resilience import CircuitBreaker, CircuitOpenError
+
+    now = {"t": 0.0}
+    calls = []
+    healthy = {"up": False, "loop": False}
+
+    def handler(request):
+        calls.append(request.url.host)
+        if healthy["loop"]:
+            raise httpx.TooManyRedirects("redirect loop", request=request)
+        if not healthy["up"]:
+            raise httpx.ConnectError("connection refused", request=request)
+        return httpx.Response(200)
+
+    breaker = CircuitBreaker(failure_threshold=3, cooldown=30, clock=lambda: now["t"])
+    transport = HttpTransport(transport=httpx.MockTransport(handler), breaker=breaker)
+
+    for _ in range(3):
+        with pytest.raises(httpx.ConnectError):
+            transport.request("GET", "http://down.internal/")
+    assert breaker.is_open("down.internal")
+
+    # Open: no network call is made
+    with pytest.raises(CircuitOpenError):
+        transport.request("GET", "http://down.internal/")
+    assert len(calls) == 3
+    # Other hosts are unaffected
+    assert not breaker.is_open("other.internal")
+
+    # A trial that fails for reasons other than the host doesn't leave the circuit stuck half-open
+    now["t"] = 31
+    healthy["loop"] = True
+    with pytest.raises(httpx.TooManyRedirects):
+        transport.request("GET", "http://down.internal/")
+    healthy["loop"] = False
+
+    # After the cool-down a single trial request closes the circuit again
+    healthy["up"] = True
+    assert transport.request("GET", "http://down.internal/").status_code == 200
+    assert not breaker.is_open("down.internal")
+
+def test_step_outputs_feed_templates_and_spill(monkeypatch, tmp_path):
+    import httpx
+    from app.services.workflow_http import HttpTransport
+
+    pods = [{"name": f"pod-{i}", "log": "x" * 200} for i in range(50)]
+    requests = []
+    def handler(request):
+        requests.append(request)
+        if request.url.path == "/pods":
+            return httpx.Response(200, json={"pods": pods, "first": "pod-0"})
+        return httpx.Response(200, json={"ok": True})
+
+    transport = HttpTransport(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(app.services.workflow_actions, "get_http_transport", lambda: transport)
+    # ~12KB response: spilled with a 1KB inline limit
+    monkeypatch.setattr(app.services.workflow_engine.settings, "WORKFLOW_CONTEXT_INLINE_BYTES", 1024)
+    monkeypatch.setattr(app.services.workflow_context.tempfile, "tempdir", str(tmp_path))
+
+    steps_data = {
+        "nodes": [
+            {"id": "1", "type": "triggerNode", "data": {}},
+            {"id": "fetch", "type": "actionNode", "data": {"actionType": "http-request", "url": "http://k8s.internal/pods"}},
+            {"id": "check", "type": "conditionNode", "data": {"condition": "len(body.pods) == 50"}},
+            {"id": "restart", "type": "actionNode", "data": {
+                "actionType": "http-request", "method": "POST",
+                "url": "http://k8s.internal/pods/{{ steps.fetch.body.first }}/restart",
+                "body": {"reason": "{{ input.reason }}", "count": "{{ len(steps.fetch.body.pods) }}"},
+            }},
+        ],
+        "edges": [
+            {"source": "1", "target": "fetch"},
+            {"source": "fetch", "target": "check"},
+            {"source": "check", "target": "restart", "sourceHandle": "true"},
+        ]
+    }
+    engine = WorkflowEngine()
+    published = []
+    engine.events.emit = published.append
+    checkpoints = {}
+    def checkpoint(node_id, index, outcome, started_at, finished_at):
+        checkpoints[node_id] = outcome.result
+
+    from app.services.workflow_plan import compile_plan
+    engine._run_plan(compile_plan(999, steps_data), 999, 4, checkpoint=checkpoint, run_input={"reason": "oom"})
+
+    restart = requests[-1]
+    assert restart.url.path == "/pods/pod-0/restart"
+    assert json.loads(restart.content) == {"reason": "oom", "count": 50}
+
+    # The big body was checkpointed as a reference, and never sent through events
+    assert set(checkpoints["fetch"]) == {"$spilled"}
+    assert checkpoints["restart"] == {"status_code": 200, "body": {"ok": True}}
+    finishes = [event for event in published if event["type"] == "step_finish" and event["step_id"] == "fetch"]
+    assert finishes[0]["result"] == {"status_code": 200}
+    # Spill files are removed when the run ends
+    assert list(tmp_path.iterdir()) == []
+
+def test_context_store_caps_and_redis_spill(fake_redis):
+    from app.services.workflow_context import StepContextStore
+
+    redis_client = fake_redis
+    store = StepContextStore("run-1", inline_bytes=100, max_bytes=1000, backend="redis", redis_client=redis_client)
+
+    assert store.put("small", {"status_code": 200}) == {"status_code": 200}
+    marker = store.put("medium", {"status_code": 200, "body": "y" * 500})
+    assert marker["$spilled"]["backend"] == "redis"
+    assert store["medium"]["body"] == "y" * 500
+    # Over the cap: only the small fields survive
+    assert store.put("huge", {"status_code": 502, "body": "z" * 5000}) == {"status_code": 502, "truncated": True, "size": 5032}
+
+    # A resumed run finds the spilled output again through the checkpointed marker
+    resumed = StepContextStore("run-1", backend="redis", redis_client=redis_client)
+    resumed.restore("medium", marker)
+    assert resumed["medium"]["status_code"] == 200
+
+    store.close()
+    assert redis_client.get("wf:ctx:run-1:medium") is None
+
+def test_map_node_runs_sub_graph_per_item_in_parallel(monkeypatch):
+    import time
+    from app.services.workflow_plan import compile_plan
+
+    monkeypatch.setattr(app.services.workflow_engine.settings, "WORKFLOW_MAP_MAX_CONCURRENCY", 200)
+    pods = [{"name": f"pod-{i}", "ready": i % 10 != 0} for i in range(200)]
+    steps_data = {
+        "nodes": [
+            {"id": "1", "type": "triggerNode", "data": {}},
+            {"id": "each", "type": "mapNode", "data": {"items": "input.pods", "max_concurrency": 200}},
+            # Sub flow: children of the map node
+            {"id": "check", "type": "conditionNode", "parentNode": "each", "data": {"condition": "not item.ready"}},
+            {"id": "restart", "type": "actionNode", "parentNode": "each", "data": {"actionType": "noop"}},
+            {"id": "done", "type": "actionNode", "data": {"actionType": "noop"}},
+        ],
+        "edges": [
+            {"source": "1", "target": "each"},
+            {"source": "check", "target": "restart", "sourceHandle": "true"},
+            {"source": "each", "target": "done"},
+        ]
+    }
+    plan = compile_plan(999, steps_data)
+    # Children are not part of the top-level graph
+    assert set(plan.order) == {"1", "each", "done"}
+
+    restarted = []
+    class SlowEngine(WorkflowEngine):
+        def _execute_step(self, step, workflow_id, index, context=None, handler=None):
+            if step["id"] == "restart":
+                time.sleep(0.2)
+                restarted.append(context["item"]["name"])
+            return super()._execute_step(step, workflow_id, index, context, handler)
+
+    outcomes = {}
+    def checkpoint(node_id, index, outcome, started_at, finished_at):
+        outcomes[node_id] = outcome
+
+    started = time.monotonic()
+    SlowEngine()._run_plan(plan, 999, 4, checkpoint=checkpoint, run_input={"pods": pods})
+    elapsed = time.monotonic() - started
+
+    # 20 slow items in parallel take about as long as one
+    assert elapsed < 2.0
+    assert sorted(restarted) == sorted(pod["name"] for pod in pods if not pod["ready"])
+    result = outcomes["each"].result
+    assert result["count"] == 200 and result["failed"] == 0
+    assert result["results"][10]["outputs"] == {"check": {"result": True}, "restart": {}}
+    assert result["results"][11]["outputs"] == {"check": {"result": False}}
+    assert "done" in outcomes
+
+def test_deadline_hands_off_and_resumes(db):
+    import time
+    from app.domain.workflow.models import StepRun
+    from app.repositories.workflow_run_repo import WorkflowRunRepository
+    from app.services.workflow_engine import WorkflowBudgetExceeded
+
+    steps_data = {
+        "nodes": [{"id": "1", "type": "triggerNode", "data": {}}]
+                 + [{"id": str(i), "type": "actionNode", "data": {"actionType": "noop"}} for i in range(2, 6)],
+        "edges": [{"source": str(i), "target": str(i + 1)} for i in range(1, 5)],
+    }
+    workflow = Workflow(name="Budgeted", owner_id=1, steps=[steps_data])
+    db.add(workflow)
+    db.commit()
+    run = WorkflowRunRepository().create(db, workflow.id)
+
+    class SlowEngine(WorkflowEngine):
+        def _execute_step(self, step, workflow_id, index, context=None, handler=None):
+            time.sleep(0.05)
+            return super()._execute_step(step, workflow_id, index, context, handler)
+
+    with pytest.raises(WorkflowBudgetExceeded):
+        SlowEngine().execute_workflow(db, workflow.id, run_id=run.id, deadline=time.monotonic() + 0.08)
+
+    db.refresh(run)
+    assert run.status == "running"
+    finished = db.query(StepRun).filter(StepRun.run_id == run.id).count()
+    assert 1 <= finished < 5
+
+    # A worker picks the run up where the API process stopped
+    executed_steps = []
+    _recording_engine(executed_steps).execute_workflow(db, workflow.id, run_id=run.id)
+    db.refresh(run)
+    assert run.status == "succeeded"
+    assert len(executed_steps) == 5 - finished
+
+def test_deadline_cuts_off_slow_http_steps(db, monkeypatch):
+    import time
+    import httpx
+    from app.domain.workflow.models import StepRun
+    from app.repositories.workflow_run_repo import WorkflowRunRepository
+    from app.services.workflow_engine import WorkflowBudgetExceeded
+    from app.services.workflow_http import HttpTransport
+
+    timeouts = []
+    healthy = {"up": False}
+
+    def handler(request):
+        if healthy["up"]:
+            return httpx.Response(200)
+        # A server that never answers: the call lasts exactly as long as its timeout
+        timeouts.append(request.extensions["timeout"]["read"])
+        time.sleep(min(timeouts[-1], 1.0))
+        raise httpx.ReadTimeout("timed out", request=request)
+
+    transport = HttpTransport(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(app.services.workflow_actions, "get_http_transport", lambda: transport)
+
+    steps_data = {
+        "nodes": [
+            {"id": "1", "type": "triggerNode", "data": {}},
+            {"id": "2", "type": "actionNode", "data": {
+                "actionType": "http-request", "url": "http://slow.internal/", "timeout": 10,
+                "retry": {"max_attempts": 3, "backoff": 0.001},
+            }},
+        ],
+        "edges": [{"source": "1", "target": "2"}],
+    }
+    workflow = Workflow(name="Slow API", owner_id=1, steps=[steps_data])
+    db.add(workflow)
+    db.commit()
+    run = WorkflowRunRepository().create(db, workflow.id)
+
+    started = time.monotonic()
+    with pytest.raises(WorkflowBudgetExceeded):
+        WorkflowEngine().execute_workflow(db, workflow.id, run_id=run.id, deadline=time.monotonic() + 0.2)
+    # The 10s timeout (times 3 attempts) was cut to what was left of the budget
+    assert time.monotonic() - started < 1.0
+    assert timeouts and all(timeout <= 0.2 for timeout in timeouts)
+
+    # The cut-off step isn't recorded as failed; it runs again when a worker resumes the run
+    db.refresh(run)
+    assert run.status == "running"
+    assert [step.node_id for step in db.query(StepRun).filter(StepRun.run_id == run.id)] == ["1"]
+    healthy["up"] = True
+    WorkflowEngine().execute_workflow(db, workflow.id, run_id=run.id)
+    db.refresh(run)
+    assert run.status == "succeeded"
+
+def test_graph_validation_and_compiled_plan_round_trip(db):
+    from app.services.workflow_plan import compile_plan, plan_from_dict, plan_to_dict, validate_graph
+
+    trigger = {"id": "1", "type": "triggerNode", "data": {}}
+    action = lambda node_id: {"id": node_id, "type": "actionNode", "data": {"actionType": "noop"}}
+
+    assert validate_graph({"nodes": [], "edges": []}) == []
+    assert validate_graph({"nodes": [action("2")], "edges": []}) == ["Graph has no trigger node"]
+    assert "points at missing node 9" in validate_graph({"nodes": [trigger], "edges": [{"source": "1", "target": "9"}]})[0]
+    assert validate_graph({"nodes": [trigger, action("2"), action("3")], "edges": [
+        {"source": "1", "target": "2"}, {"source": "2", "target": "3"}, {"source": "3", "target": "2"},
+    ]}) == ["Cycle between nodes: 2, 3"]
+    # Problems inside a map node's sub flow are reported too
+    nested = {"id": "m", "type": "mapNode", "data": {"items": "input.xs"}}
+    orphan = dict(action("x"), parentNode="m")
+    looped = [dict(action("y"), parentNode="m"), dict(action("z"), parentNode="m")]
+    errors = validate_graph({"nodes": [trigger, nested, orphan] + looped, "edges": [
+        {"source": "1", "target": "m"}, {"source": "y", "target": "z"}, {"source": "z", "target": "y"},
+    ]})
+    assert errors == ["Map m: Nodes not reachable from the trigger: y, z"]
+    # An edge into (or out of) a sub flow would be dropped by compile_plan, so it is rejected
+    inner = dict(action("c1"), parentNode="m")
+    assert validate_graph({"nodes": [trigger, nested, inner, action("a")], "edges": [
+        {"source": "1", "target": "m"}, {"source": "m", "target": "a"}, {"source": "1", "target": "c1"},
+    ]}) == ["Edge 1 -> c1 crosses a map boundary"]
+
+    steps_data = {
+        "nodes": [
+            dict(trigger, position={"x": 0, "y": 0}, selected=True),
+            {"id": "2", "type": "conditionNode", "data": {"condition": "input.ok"}},
+            action("3"),
+            nested,
+            dict(action("x"), parentNode="m"),
+        ],
+        "edges": [
+            {"source": "1", "target": "2"},
+            {"source": "2", "target": "3", "sourceHandle": "true"},
+            {"source": "2", "target": "m", "sourceHandle": "false"},
+        ],
+        "max_concurrency": 2,
+    }
+    plan = compile_plan(7, steps_data)
+    stored = json.loads(json.dumps(plan_to_dict(plan)))
+    assert "position" not in stored["nodes"]["1"]["node"]
+    loaded = plan_from_dict(7, stored)
+    for field in ("start_node_id", "order", "cyclic_nodes", "max_concurrency"):
+        assert getattr(loaded, field) == getattr(plan, field)
+    assert dict(loaded.successors) == dict(plan.successors)
+    assert dict(loaded.join_counts) == dict(plan.join_counts)
+    assert loaded.nodes["m"].subplan.order == plan.nodes["m"].subplan.order
+
+    # The engine uses the stored plan and never touches the editor payload
+    from app.domain.workflow.models import WorkflowVersion
+    workflow = Workflow(name="Compiled", owner_id=1, steps=[{"nodes": [], "edges": []}])
+    db.add(workflow)
+    db.commit()
+    version = WorkflowVersion(workflow_id=workflow.id, version=1, steps=[{"nodes": [], "edges": []}], compiled_graph=stored)
+    db.add(version)
+    db.commit()
+    plan = WorkflowEngine()._compile_version(db, workflow.id, version.id)
+    assert plan.order == loaded.order and plan.workflow_id == workflow.id
+
+def test_delay_node_parks_run_until_timer_fires(db, fake_redis):
+    import time
+    from app.domain.workflow.models import StepRun
+    from app.repositories.workflow_run_repo import WorkflowRunRepository
+    from app.services.workflow_timers import RunTimers, resume_due_runs
+
+    steps_data = {
+        "nodes": [
+            {"id": "1", "type": "triggerNode", "data": {}},
+            {"id": "wait", "type": "delayNode", "data": {"seconds": 300}},
+            {"id": "recheck", "type": "actionNode", "data": {"actionType": "noop"}},
+            {"id": "notify", "type": "actionNode", "data": {"actionType": "noop"}},
+        ],
+        "edges": [
+            {"source": "1", "target": "wait"},
+            {"source": "wait", "target": "recheck"},
+            {"source": "1", "target": "notify"},
+        ],
+    }
+    workflow = Workflow(name="Wait and recheck", owner_id=1, steps=[steps_data])
+    db.add(workflow)
+    db.commit()
+    run = WorkflowRunRepository().create(db, workflow.id)
+
+    executed_steps = []
+    engine = _recording_engine(executed_steps)
+    engine.timers = RunTimers(fake_redis)
+    started = time.time()
+    engine.execute_workflow(db, workflow.id, run_id=run.id)
+
+    # The other branch ran; the run returned without sleeping and waits on the timer
+    db.refresh(run)
+    assert run.status == "waiting" and run.resume_at is not None
+    assert executed_steps == ["1", "notify"]
+    waiting_step = db.query(StepRun).filter(StepRun.run_id == run.id, StepRun.node_id == "wait").one()
+    resume_at = waiting_step.result["resume_at"]
+    assert waiting_step.status == "waiting" and 299 <= resume_at - started <= 301
+
+    class Dispatcher:
+        def __init__(self):
+            self.queued = []
+        def enqueue(self, owner_id, runs, plan=None):
+            self.queued.extend(runs)
+        def dispatch(self):
+            pass
+
+    dispatcher = Dispatcher()
+    assert resume_due_runs(db, engine.timers, dispatcher, now=resume_at - 1) == 0
+    assert resume_due_runs(db, engine.timers, dispatcher, now=resume_at + 1) == 1
+    assert dispatcher.queued == [(workflow.id, run.id)]
+    assert len(engine.timers) == 0
+
+    # A resume that arrives early parks again without duplicating the waiting step
+    engine.timers.schedule(run.id, 0)
+    engine.execute_workflow(db, workflow.id, run_id=run.id)
+    db.refresh(run)
+    assert run.status == "waiting" and executed_steps == ["1", "notify"]
+
+    # Once the delay is over the run carries on after it
+    waiting_step.result = {"resume_at": time.time() - 1}
+    db.commit()
+    engine.execute_workflow(db, workflow.id, run_id=run.id)
+    db.refresh(run)
+    assert run.status == "succeeded" and run.resume_at is None
+    assert executed_steps == ["1", "notify", "recheck"]
+    assert db.query(StepRun).filter(StepRun.run_id == run.id, StepRun.node_id == "wait").one().status == "success"
+
+def test_action_registry_resolves_handlers_once_per_plan(monkeypatch):
+    from app.services import workflow_actions
+    from app.services.workflow_actions import ActionHandler, register
+    from app.services.workflow_plan import compile_plan
+
+    calls = []
+    @register("actionNode:test-page")
+    class PageHandler(ActionHandler):
+        def run(self, data, context):
+            calls.append(workflow_actions.render_template(data["service"], context))
+            return None, {"paged": True}
+
+    steps_data = {
+        "nodes": [
+            {"id": "1", "type": "triggerNode", "data": {}},
+            {"id": "2", "type": "actionNode", "data": {"actionType": "test-page", "service": "{{ input.service }}"}},
+            {"id": "3", "type": "actionNode", "data": {"actionType": "not-registered"}},
+        ],
+        "edges": [{"source": "1", "target": "2"}, {"source": "2", "target": "3"}],
+    }
+    try:
+        plan = compile_plan(999, steps_data)
+        assert isinstance(plan.nodes["2"].handler, PageHandler)
+        assert plan.nodes["1"].handler.key == "triggerNode"
+
+        # Running the plan never goes back to the registry
+        lookups = []
+        monkeypatch.setattr(app.services.workflow_engine, "resolve_handler", lambda node: lookups.append(node) or None)
+        outcomes = {}
+        WorkflowEngine()._run_plan(plan, 999, 2, checkpoint=lambda node_id, *args: outcomes.setdefault(node_id, args[1]), run_input={"service": "api"})
+        assert lookups == []
+        assert calls == ["api"]
+        assert outcomes["2"].result == {"paged": True}
+        # Unknown action types still run as no-ops
+        assert outcomes["3"].status == "success"
+    finally:
+        workflow_actions._HANDLERS.pop("actionNode:test-page", None)
@@ -0,0 +1,239 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.api.deps import get_current_user
+from app.main import app
+from app.domain.user.models import User
+from app.domain.workflow.models import Workflow, WorkflowRun, WorkflowVersion, StepRun
+from app.services.workflow_service import WorkflowService
+
+mock_user = User(id=1, email="test@example.com", is_active=True, role="user")
+
+@pytest.fixture
+def auth_client(client):
+    app.dependency_overrides[get_current_user] = lambda: mock_user
+    yield client
+
+@pytest.fixture
+def workflow_with_runs(db):
+    workflow = Workflow(name="Restart API", owner_id=1, steps=[{"nodes": [], "edges": []}])
+    db.add(workflow)
+    db.commit()
+
+    now = datetime.now(timezone.utc)
+    runs = []
+    for i in range(5):
+        run = WorkflowRun(
+            workflow_id=workflow.id,
+            status="succeeded",
+            attempts=1,
+            started_at=now - timedelta(minutes=5 - i),
+            finished_at=now - timedelta(minutes=5 - i) + timedelta(seconds=2),
+            duration_ms=2000,
+        )
+        db.add(run)
+        runs.append(run)
+    db.commit()
+    db.add(StepRun(run_id=runs[-1].id, node_id="1", step_index=0, status="success", result={"status_code": 200}))
+    db.commit()
+    return workflow, runs
+
+def test_list_workflow_runs_keyset_pagination(auth_client, workflow_with_runs):
+    workflow, runs = workflow_with_runs
+
+    response = auth_client.get(f"/api/v1/workflows/{workflow.id}/runs?limit=2")
+    assert response.status_code == 200
+    page = response.json()
+    # Newest first
+    assert [item["id"] for item in page["items"]] == [runs[4].id, runs[3].id]
+    assert page["next_cursor"] == runs[3].id
+
+    response = auth_client.get(f"/api/v1/workflows/{workflow.id}/runs?limit=2&before={page['next_cursor']}")
+    page = response.json()
+    assert [item["id"] for item in page["items"]] == [runs[2].id, runs[1].id]
+
+    response = auth_client.get(f"/api/v1/workflows/{workflow.id}/runs?limit=2&before={page['next_cursor']}")
+    page = response.json()
+    assert [item["id"] for item in page["items"]] == [runs[0].id]
+    assert page["next_cursor"] is None
+
+def test_read_workflow_run_with_steps(auth_client, workflow_with_runs):
+    workflow, runs = workflow_with_runs
+
+    response = auth_client.get(f"/api/v1/workflows/{workflow.id}/runs/{runs[-1].id}")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["duration_ms"] == 2000
+    assert data["steps"][0]["result"] == {"status_code": 200}
+
+    response = auth_client.get(f"/api/v1/workflows/{workflow.id}/runs/999999")
+    assert response.status_code == 404
+
+def test_prune_old_runs(db, workflow_with_runs):
+    from app.repositories.workflow_run_repo import WorkflowRunRepository
+
+    workflow, runs = workflow_with_runs
+    cutoff = runs[2].started_at
+    deleted = WorkflowRunRepository().delete_older_than(db, cutoff)
+
+    assert deleted == 2
+    remaining = db.query(WorkflowRun).filter(WorkflowRun.workflow_id == workflow.id).count()
+    assert remaining == 3
+
+def test_bulk_run_dispatches_one_group(auth_client, db, monkeypatch, fake_redis):
+    import app.api.v1.routes.workflows as workflow_routes
+    from app.services.workflow_dispatch import WorkflowDispatcher
+
+    dispatched = []
+    dispatcher = WorkflowDispatcher(fake_redis, dispatched.append)
+    monkeypatch.setattr(workflow_routes, "get_dispatcher", lambda: dispatcher)
+
+    mine = Workflow(name="Restart pod", owner_id=1, steps=[{"nodes": [], "edges": []}])
+    theirs = Workflow(name="Someone else's", owner_id=2, steps=[{"nodes": [], "edges": []}])
+    db.add_all([mine, theirs])
+    db.commit()
+
+    response = auth_client.post("/api/v1/workflows/bulk-run", json={"runs": [
+        {"workflow_id": mine.id, "input": {"service": "api"}},
+        {"workflow_id": theirs.id},
+    ]})
+    assert response.status_code == 403
+    assert dispatched == []
+
+    response = auth_client.post("/api/v1/workflows/bulk-run", json={"runs": [
+        {"workflow_id": mine.id, "input": {"service": f"svc-{i}"}} for i in range(3)
+    ]})
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data["run_ids"]) == 3
+    assert len(dispatched) == 1
+    assert dispatched[0] == [(mine.id, run_id, 1) for run_id in data["run_ids"]]
+
+    run = db.query(WorkflowRun).filter(WorkflowRun.id == data["run_ids"][1]).first()
+    assert run.input == {"service": "svc-1"}
+
+    response = auth_client.get(f"/api/v1/workflows/batches/{data['batch_id']}")
+    assert response.status_code == 200
+    assert response.json() == {"batch_id": data["batch_id"], "total": 3, "counts": {"queued": 3}, "finished": False}
+
+@pytest.fixture
+def inline_executor(monkeypatch, fake_redis):
+    import app.api.v1.routes.workflows as workflow_routes
+    from app.services.workflow_dispatch import WorkflowDispatcher
+    from app.services.workflow_engine import WorkflowEngine
+    from app.services.workflow_inline import InlineExecutor
+
+    engine = WorkflowEngine()
+    engine.events.redis = fake_redis
+    queued = []
+    dispatcher = WorkflowDispatcher(fake_redis, lambda batch: None, max_per_owner=1)
+    executor = InlineExecutor(
+        engine=engine, max_nodes=3, time_budget=5.0, enqueue=lambda wf, run_id: queued.append(run_id), dispatcher=dispatcher
+    )
+    executor.queued = queued
+    monkeypatch.setattr(workflow_routes, "get_inline_executor", lambda: executor)
+    return executor
+
+def _webhook_url(auth_client, db, node_count):
+    nodes = [{"id": "1", "type": "triggerNode", "data": {}}]
+    nodes += [{"id": str(i), "type": "actionNode", "data": {"actionType": "noop"}} for i in range(2, node_count + 1)]
+    edges = [{"source": str(i), "target": str(i + 1)} for i in range(1, node_count)]
+    workflow = Workflow(name="Alert remediation", owner_id=1, steps=[{"nodes": nodes, "edges": edges}])
+    db.add(workflow)
+    db.commit()
+    response = auth_client.post(f"/api/v1/workflows/{workflow.id}/webhook-token")
+    assert response.status_code == 200
+    return response.json()["webhook_url"]
+
+def test_webhook_runs_small_workflow_inline(auth_client, db, inline_executor):
+    url = _webhook_url(auth_client, db, 3)
+
+    response = auth_client.post(url, json={"alert": "HighLatency"})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["mode"] == "inline" and data["status"] == "succeeded"
+    assert inline_executor.queued == []
+
+    run = db.query(WorkflowRun).filter(WorkflowRun.id == data["run_id"]).first()
+    assert run.input == {"alert": "HighLatency"}
+    assert len(run.steps) == 3
+
+    assert auth_client.post("/api/v1/workflows/hooks/not-a-token", json={}).status_code == 404
+
+def test_webhook_runs_count_against_the_owner_cap(auth_client, db, inline_executor, fake_redis):
+    url = _webhook_url(auth_client, db, 3)
+    # The owner's one slot is taken by a dispatched run
+    assert inline_executor.dispatcher.try_acquire(1, 12345, 999)
+
+    data = auth_client.post(url, json={}).json()
+    assert data["mode"] == "queued" and inline_executor.queued == [data["run_id"]]
+
+    inline_executor.dispatcher.release(1, 12345, 999)
+    data = auth_client.post(url, json={}).json()
+    assert data["mode"] == "inline" and data["status"] == "succeeded"
+    # ...and gives the slot back when it's done
+    assert fake_redis.zcard("wf:running:owner:1") == 0
+
+def test_webhook_queues_workflow_over_budget(auth_client, db, inline_executor):
+    url = _webhook_url(auth_client, db, 5)
+
+    response = auth_client.post(url, json={"alert": "DiskFull"})
+    assert response.status_code == 202
+    data = response.json()
+    assert data["mode"] == "queued" and data["status"] == "queued"
+    assert inline_executor.queued == [data["run_id"]]
+
+def test_save_validates_graph_and_stores_compiled_plan(auth_client, db):
+    nodes = [{"id": "1", "type": "triggerNode", "data": {}}, {"id": "2", "type": "actionNode", "data": {"actionType": "noop"}}]
+    cyclic = {"nodes": nodes, "edges": [{"source": "1", "target": "2"}, {"source": "2", "target": "2"}]}
+    response = auth_client.post("/api/v1/workflows/", json={"name": "Broken", "steps": [cyclic]})
+    assert response.status_code == 400
+    assert "Cycle" in response.json()["detail"]
+
+    response = auth_client.post("/api/v1/workflows/", json={"name": "Draft"})
+    assert response.status_code == 200
+    workflow_id = response.json()["id"]
+
+    graph = {"nodes": nodes, "edges": [{"source": "1", "target": "2"}]}
+    response = auth_client.put(f"/api/v1/workflows/{workflow_id}", json={"name": "Ready", "steps": [graph]})
+    assert response.status_code == 200
+    version = db.query(WorkflowVersion).filter(WorkflowVersion.id == response.json()["current_version_id"]).first()
+    assert version.compiled_graph["order"] == ["1", "2"]
+    assert "compiled_graph" not in response.json()
+
+def test_runs_execute_the_version_they_were_created_with(auth_client, db, monkeypatch, fake_redis):
+    from app.services.workflow_engine import WorkflowEngine
+
+    def graph(action_id):
+        return {
+            "nodes": [{"id": "1", "type": "triggerNode", "data": {}}, {"id": action_id, "type": "actionNode", "data": {"actionType": "noop"}}],
+            "edges": [{"source": "1", "target": action_id}],
+        }
+
+    response = auth_client.post("/api/v1/workflows/", json={"name": "Versioned", "steps": [graph("old")]})
+    workflow_id, v1 = response.json()["id"], response.json()["current_version_id"]
+    service = WorkflowService()
+    queued = service.create_run(db, workflow_id)
+    assert queued.version_id == v1
+
+    # Edited while the first run is still queued
+    response = auth_client.put(f"/api/v1/workflows/{workflow_id}", json={"name": "Versioned", "steps": [graph("new")]})
+    v2 = response.json()["current_version_id"]
+    assert v2 != v1
+    # Renaming alone doesn't create a version
+    response = auth_client.put(f"/api/v1/workflows/{workflow_id}", json={"name": "Renamed"})
+    assert response.json()["current_version_id"] == v2
+
+    engine = WorkflowEngine()
+    engine.events.redis = fake_redis
+    engine.execute_workflow(db, workflow_id, run_id=queued.id)
+    later = service.create_run(db, workflow_id)
+    engine.execute_workflow(db, workflow_id, run_id=later.id)
+    assert [step.node_id for step in queued.steps] == ["1", "old"]
+    assert [step.node_id for step in later.steps] == ["1", "new"]
+    assert later.version_id == v2
+
+    versions = auth_client.get(f"/api/v1/workflows/{workflow_id}/versions").json()
+    assert [v["version"] for v in versions] == [2, 1]
+    assert versions[1]["steps"] == [graph("old")]
@@ -0,0 +1,134 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.api.deps import get_current_user
+from app.main import app
+from app.domain.user.models import User
+from app.domain.workflow.models import Workflow, WorkflowRun, WorkflowSchedule
+from app.services.workflow_cron import CronError, parse_cron
+from app.services.workflow_scheduler import ScheduleHeap, WorkflowScheduler
+
+NOW = datetime(2026, 3, 2, 12, 0, 30, tzinfo=timezone.utc)  # a Monday
+
+mock_user = User(id=1, email="test@example.com", is_active=True, role="user")
+
+@pytest.fixture
+def auth_client(client):
+    app.dependency_overrides[get_current_user] = lambda: mock_user
+    yield client
+
+
+def test_cron_next_after():
+    assert parse_cron("*/15 * * * *").next_after(NOW) == NOW.replace(minute=15, second=0)
+    assert parse_cron("@daily").next_after(NOW) == datetime(2026, 3, 3, tzinfo=timezone.utc)
+    assert parse_cron("30 9 * * mon-fri").next_after(NOW) == datetime(2026, 3, 3, 9, 30, tzinfo=timezone.utc)
+    # Day of month and day of week both restricted: either one matches
+    assert parse_cron("0 0 13 * fri").next_after(NOW) == datetime(2026, 3, 6, tzinfo=timezone.utc)
+    assert parse_cron("0 0 29 2 *").next_after(NOW) == datetime(2028, 2, 29, tzinfo=timezone.utc)
+    # A day field spelled to cover its whole range is still unrestricted, so the other one decides alone
+    assert parse_cron("0 0 13 * */1").next_after(NOW) == datetime(2026, 3, 13, tzinfo=timezone.utc)
+    assert parse_cron("0 0 1-31 * fri").next_after(NOW) == datetime(2026, 3, 6, tzinfo=timezone.utc)
+    for bad in ("* * * *", "61 * * * *", "*/0 * * * *", "0 0 30 2 *"):
+        with pytest.raises(CronError):
+            parse_cron(bad).next_after(NOW)
+
+
+def test_heap_skips_stale_entries():
+    heap = ScheduleHeap()
+    heap.load([(1, 10.0), (2, 20.0), (3, 30.0)])
+    heap.push(1, 25.0)  # rescheduled later
+    heap.remove(2)
+    assert heap.peek() == 25.0
+    assert heap.pop_due(26.0) == [1]
+    assert heap.pop_due(100.0) == [3]
+    assert len(heap) == 0
+
+
+@pytest.fixture
+def schedules(db):
+    workflow = Workflow(name="Nightly cleanup", owner_id=1, steps=[{"nodes": [], "edges": []}])
+    db.add(workflow)
+    db.commit()
+    due_cron = WorkflowSchedule(workflow_id=workflow.id, cron="*/5 * * * *", next_run_at=NOW - timedelta(minutes=1))
+    # Missed three intervals while nothing was running: fires once, stays on its grid
+    due_interval = WorkflowSchedule(
+        workflow_id=workflow.id, interval_seconds=600, input={"mode": "full"}, next_run_at=NOW - timedelta(minutes=25)
+    )
+    later = WorkflowSchedule(workflow_id=workflow.id, interval_seconds=3600, next_run_at=NOW + timedelta(hours=1))
+    db.add_all([due_cron, due_interval, later])
+    db.commit()
+    return workflow, due_cron, due_interval, later
+
+
+def _scheduler(fake_redis, fired, clock=lambda: NOW):
+    return WorkflowScheduler(fake_redis, lambda *args: fired.append(args), clock=clock)
+
+
+def test_scheduler_fires_due_schedules_once(db, fake_redis, schedules):
+    workflow, due_cron, due_interval, later = schedules
+    fired = []
+    scheduler = _scheduler(fake_redis, fired)
+
+    assert scheduler.tick(db) == 2
+    assert sorted(args[2] for args in fired) == sorted(run.id for run in db.query(WorkflowRun).all())
+    assert {args[:2] for args in fired} == {(1, workflow.id)}
+
+    db.expire_all()
+    assert due_cron.next_run_at.replace(tzinfo=timezone.utc) == NOW.replace(minute=5, second=0)
+    assert due_interval.next_run_at.replace(tzinfo=timezone.utc) == NOW + timedelta(minutes=5)
+    run_inputs = [run.input for run in db.query(WorkflowRun).all()]
+    assert {"mode": "full"} in run_inputs
+
+    # Nothing is due again until the next occurrence
+    assert scheduler.tick(db) == 0
+    assert len(fired) == 2
+
+
+def test_standby_scheduler_does_not_fire(db, fake_redis, schedules):
+    leader_fired, standby_fired = [], []
+    leader = _scheduler(fake_redis, leader_fired)
+    standby = _scheduler(fake_redis, standby_fired)
+
+    assert leader.tick(db) == 2
+    assert standby.tick(db) == 0 and not standby.is_leader
+
+    # Even a scheduler that wrongly believes it leads can't fire a claimed occurrence
+    rogue = _scheduler({}, [])
+    rogue.lease.acquire_or_renew = lambda: True
+    assert rogue.tick(db) == 0
+    assert db.query(WorkflowRun).count() == 2
+
+    leader.lease.release()
+    assert standby.tick(db) == 0 and standby.is_leader
+
+
+def test_scheduler_picks_up_new_schedules(db, fake_redis, schedules):
+    workflow = schedules[0]
+    clock = [NOW]
+    fired = []
+    scheduler = _scheduler(fake_redis, fired, clock=lambda: clock[0])
+    scheduler.tick(db)
+
+    db.add(WorkflowSchedule(workflow_id=workflow.id, interval_seconds=60, next_run_at=NOW + timedelta(seconds=10)))
+    db.commit()
+    clock[0] = NOW + timedelta(seconds=scheduler.sync_interval + 10)
+    assert scheduler.tick(db) == 1
+
+
+def test_schedule_api(auth_client, db):
+    workflow = Workflow(name="Report", owner_id=mock_user.id, steps=[{"nodes": [], "edges": []}])
+    db.add(workflow)
+    db.commit()
+    url = f"/api/v1/workflows/{workflow.id}/schedules"
+
+    response = auth_client.post(url, json={"cron": "0 9 * * mon"})
+    assert response.status_code == 200
+    schedule_id = response.json()["id"]
+    assert auth_client.post(url, json={"cron": "0 25 * * *"}).status_code == 400
+    assert auth_client.post(url, json={"interval_seconds": 1}).status_code == 400
+    assert auth_client.post(url, json={"cron": "@hourly", "interval_seconds": 3600}).status_code == 400
+
+    assert [item["id"] for item in auth_client.get(url).json()] == [schedule_id]
+    assert auth_client.delete(f"{url}/{schedule_id}").status_code == 200
+    assert auth_client.delete(f"{url}/{schedule_id}").status_code == 404